@@ -0,0 +1,171 @@
+"""
+Benchmark for the agent's hot journal/goal queries.
+
+Builds synthetic databases of increasing journal size and times, once without
+the secondary indexes and once with the indexes shipped by the schema
+migrations:
+  - the AgentThread._get_active_goals query
+  - PromptBuilder.context_for in steady state (what every agent step reads)
+  - JournalTableModel paging: the tail page after a reload (refresh_journal),
+    a cold page in the middle of the journal and the page next to it
+The app code runs against the synthetic database through the global DB
+manager. With the indexes in place latency should stay flat as the journal grows.
+
+Usage:
+    python -m benchmarks.bench_journal_queries [--sizes 1000 10000 100000] [--repeat 200]
+"""
+import argparse
+import json
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from src.persistence.models import SCHEMA_SQL
+from src.persistence.migrations import apply_migrations
+
+QUERIES = {
+    "active_goals": ("SELECT * FROM goals WHERE status = 'active' ORDER BY priority DESC, created_at", ()),
+}
+
+# Goals sampled for the prompt context timings (each is warmed up once, see time_app_paths)
+CONTEXT_GOALS = 20
+
+def build_database(path: Path, journal_rows: int, goals: int = 500, indexed: bool = True) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    for statement in [s.strip() for s in SCHEMA_SQL.split(';') if s.strip()]:
+        conn.execute(statement)
+    conn.commit()
+    apply_migrations(conn)
+    if not indexed:
+        # Baseline: migrated columns, but none of the secondary indexes
+        for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'").fetchall():
+            conn.execute(f"DROP INDEX {name}")
+        conn.commit()
+
+    rng = random.Random(42)
+    conn.executemany(
+        "INSERT INTO goals (description, status, created_at) VALUES (?, ?, datetime('now', ?))",
+        [(f"goal {i}", rng.choice(["completed", "failed", "completed", "active"]), f"-{goals - i} minutes")
+         for i in range(goals)]
+    )
+    batch = []
+    for i in range(journal_rows):
+        batch.append((f"-{journal_rows - i} seconds", rng.randint(1, goals), "Used read_file", "read_file",
+                      "x" * rng.randint(20, 200), "success"))
+        if len(batch) >= 10000:
+            conn.executemany(
+                "INSERT INTO journal (timestamp, goal_id, action, tool_used, result, status) "
+                "VALUES (datetime('now', ?), ?, ?, ?, ?, ?)", batch)
+            batch.clear()
+    if batch:
+        conn.executemany(
+            "INSERT INTO journal (timestamp, goal_id, action, tool_used, result, status) "
+            "VALUES (datetime('now', ?), ?, ?, ?, ?, ?)", batch)
+    conn.commit()
+    conn.execute("ANALYZE")
+    return conn
+
+def _summarize(samples) -> dict:
+    samples = sorted(samples)
+    return {
+        "p50_us": round(samples[len(samples) // 2] * 1e6, 1),
+        "p95_us": round(samples[max(0, int(len(samples) * 0.95) - 1)] * 1e6, 1),
+    }
+
+def time_queries(conn: sqlite3.Connection, repeat: int, goals: int = 500) -> dict:
+    rng = random.Random(7)
+    results = {}
+    for name, (sql, params) in QUERIES.items():
+        samples = []
+        for _ in range(repeat):
+            args = params if params is not None else (rng.randint(1, goals),)
+            start = time.perf_counter()
+            conn.execute(sql, args).fetchall()
+            samples.append(time.perf_counter() - start)
+        results[name] = _summarize(samples)
+    return results
+
+def time_app_paths(path: Path, repeat: int, goals: int = 500) -> dict:
+    """Time PromptBuilder.context_for and JournalTableModel paging against the database at `path`."""
+    from src.agent.prompt import prompt_builder
+    from src.persistence.database import db
+    from src.ui.journal_model import JournalTableModel
+
+    previous_path = db.db_path
+    db.close_all() # Pooled connections still point at the previous database
+    db.db_path = path
+    try:
+        rng = random.Random(11)
+        sampled = rng.sample(range(1, goals + 1), CONTEXT_GOALS)
+        for goal_id in sampled:
+            prompt_builder.context_for(goal_id) # First call folds the goal's history into its summary
+        context = []
+        for _ in range(repeat):
+            goal_id = rng.choice(sampled)
+            start = time.perf_counter()
+            prompt_builder.context_for(goal_id)
+            context.append(time.perf_counter() - start)
+
+        model = JournalTableModel()
+        pages = max(1, (model.rowCount() + model.PAGE_SIZE - 1) // model.PAGE_SIZE)
+        reload, tail, deep, next_page = [], [], [], []
+        for _ in range(max(1, repeat // 10)):
+            start = time.perf_counter()
+            model.reload()
+            reload.append(time.perf_counter() - start)
+            # refresh_journal scrolls to the bottom right after reloading
+            start = time.perf_counter()
+            model._load_page(pages - 1)
+            tail.append(time.perf_counter() - start)
+
+            model.reload()
+            start = time.perf_counter()
+            model._load_page(pages // 2) # Cold jump, e.g. to a search hit
+            deep.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            model._load_page(pages // 2 + 1) # Scrolling on from there
+            next_page.append(time.perf_counter() - start)
+        return {
+            "prompt_context": _summarize(context),
+            "view_reload": _summarize(reload),
+            "view_tail_page": _summarize(tail),
+            "view_deep_page": _summarize(deep),
+            "view_next_page": _summarize(next_page),
+        }
+    finally:
+        db.close_all()
+        db.db_path = previous_path
+
+def run(sizes, repeat):
+    report = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            for indexed in (False, True):
+                path = Path(tmp) / f"bench_{size}_{int(indexed)}.db"
+                conn = build_database(path, size, indexed=indexed)
+                queries = time_queries(conn, repeat)
+                conn.close()
+                queries.update(time_app_paths(path, repeat))
+                report.append({
+                    "journal_rows": size,
+                    "indexed": indexed,
+                    "queries": queries,
+                })
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.repeat)
+    for entry in report:
+        cells = "  ".join(f"{name}={q['p50_us']}us" for name, q in entry["queries"].items())
+        print(f"rows={entry['journal_rows']:>8} indexed={str(entry['indexed']):<5} {cells}")
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+End-to-end benchmark suite for the agent's hot paths, fully offline.
+
+Measures:
+  - agent loop: AgentThread.agent_cycle driven headlessly with the scripted LLM
+    backend (no latency) and a no-op tool, so step time is pure loop overhead;
+    reports steps/sec and step/phase percentiles
+  - latency of the agent's and the journal view's DB paths (active goals,
+    prompt context, journal paging) against synthetic journals (10k and 1M
+    rows by default, see bench_journal_queries)
+  - registry lookup cost (get_tool / get_all_tools)
+  - register_builtin_tools startup time, cold (empty DB) and warm
+
+Results are written as flat JSON ({"metrics": {name: value}}) and compared
+against a stored baseline; the exit status is 1 if any metric regressed by more
+than the tolerance (and by more than the noise floor for its unit). Baselines
+are machine specific: regenerate with --update-baseline on the machine that
+runs the comparison.
+
+Usage:
+    python -m benchmarks.bench_suite [--quick] [--output bench_results.json]
+                                     [--baseline benchmarks/baseline.json] [--tolerance 0.5]
+                                     [--rounds 1] [--update-baseline]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_journal_queries import build_database, time_app_paths, time_queries
+from src.utils.config import Config
+from src.utils.logger import logger
+
+DEFAULT_BASELINE = Path(__file__).with_name("baseline.json")
+
+# Metrics where a larger value is better; everything else is a latency
+HIGHER_IS_BETTER = {"agent.steps_per_sec"}
+
+# Differences below these (by unit suffix) are timer/scheduler noise, whatever the relative change
+NOISE_FLOORS = {"_us": 50.0, "_ns": 300.0, "_ms": 0.5}
+
+STUB_TOOL = "bench_noop"
+STUB_ARGS = {"value": 1}
+
+async def bench_noop(value: int = 0) -> str:
+    """Stub tool: returns immediately."""
+    return f"ok {value}"
+
+def _percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[max(0, int(round(q * len(ordered))) - 1)]
+
+def bench_agent_loop(steps: int, goals: int = 3) -> dict:
+    """Run agent_cycle until `steps` steps have completed and report throughput and overhead."""
+    from src.agent.backends import ScriptedBackend
+    from src.agent.llm_client import llm_client
+    from src.agent.loop import AgentThread
+    from src.persistence.database import db
+    from src.persistence.journal import journal_writer
+    from src.tools.registry import registry
+    from src.utils.metrics import metrics
+
+    registry.register(STUB_TOOL, "Benchmark stub tool.", bench_noop)
+    llm_client.backend = ScriptedBackend([{
+        "action": "tool_use",
+        "tool_calls": [{"tool_name": STUB_TOOL, "tool_args": STUB_ARGS, "independent": True}],
+        "reasoning": "benchmark",
+    }])
+    llm_client.plan_cache = None # Every step must go through the planner
+
+    # Pre-approve the stub call so goals never park waiting for confirmation
+    action_desc = f"{STUB_TOOL}:{json.dumps(STUB_ARGS, sort_keys=True)}"
+    db.execute_query(
+        "INSERT OR REPLACE INTO confirmations (action_hash, goal_id, action_description, approved, expiry) "
+        "VALUES (?, NULL, ?, 1, NULL)",
+        (hashlib.sha256(action_desc.encode()).hexdigest(), action_desc)
+    )
+    db.execute_query("UPDATE goals SET status = 'completed' WHERE status = 'active'")
+    db.execute_many("INSERT INTO goals (description, status) VALUES (?, 'active')",
+                    [(f"benchmark goal {i}",) for i in range(goals)])
+
+    def completed_steps():
+        return next((c["value"] for c in metrics.snapshot()["counters"] if c["name"] == "agent_steps_total"), 0)
+
+    async def drive(target):
+        agent = AgentThread()
+        agent.is_running = True
+        agent._loop = asyncio.get_running_loop()
+        cycle = asyncio.create_task(agent.agent_cycle())
+        deadline = time.perf_counter() + 120
+        while completed_steps() < target and time.perf_counter() < deadline and not cycle.done():
+            await asyncio.sleep(0.005)
+        agent.is_running = False
+        agent.notify()
+        await cycle
+
+    asyncio.run(drive(min(20, steps))) # Warm-up: imports, prepared statements, caches
+    metrics.reset()
+    start = time.perf_counter()
+    asyncio.run(drive(steps))
+    elapsed = time.perf_counter() - start
+    journal_writer.flush()
+
+    snapshot = metrics.snapshot()
+    done = completed_steps()
+    result = {"agent.steps": done, "agent.steps_per_sec": round(done / elapsed, 1)}
+    for h in snapshot["histograms"]:
+        if h["name"] == "agent_step_seconds":
+            result["agent.step_p50_ms"] = round(h["p50"] * 1000, 3)
+            result["agent.step_p95_ms"] = round(h["p95"] * 1000, 3)
+        elif h["name"] == "agent_phase_seconds":
+            result[f"agent.phase_{h['labels']['phase']}_p50_ms"] = round(h["p50"] * 1000, 3)
+    return result
+
+def bench_db_queries(sizes, repeat: int) -> dict:
+    result = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            path = Path(tmp) / f"bench_{size}.db"
+            conn = build_database(path, size, indexed=True)
+            timings = time_queries(conn, repeat)
+            conn.close()
+            timings.update(time_app_paths(path, repeat))
+            for name, timing in timings.items():
+                result[f"db.{size}.{name}_p50_us"] = timing["p50_us"]
+                result[f"db.{size}.{name}_p95_us"] = timing["p95_us"]
+    return result
+
+def bench_registry(lookups: int) -> dict:
+    from src.tools.registry import registry
+
+    registry.get_tool("read_file") # Load the snapshot
+    start = time.perf_counter()
+    for _ in range(lookups):
+        registry.get_tool("read_file")
+    get_tool = (time.perf_counter() - start) / lookups
+
+    start = time.perf_counter()
+    for _ in range(lookups // 10):
+        registry.get_all_tools()
+    get_all = (time.perf_counter() - start) / (lookups // 10)
+    return {"registry.get_tool_ns": round(get_tool * 1e9), "registry.get_all_tools_ns": round(get_all * 1e9)}
+
+def bench_startup(repeat: int) -> dict:
+    from src.tools.builtin import register_builtin_tools
+
+    start = time.perf_counter()
+    register_builtin_tools() # Empty DB: inserts every tool
+    cold = time.perf_counter() - start
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        register_builtin_tools() # Fingerprint matches: no DB writes
+        samples.append(time.perf_counter() - start)
+    return {
+        "startup.register_builtin_tools_cold_ms": round(cold * 1000, 3),
+        "startup.register_builtin_tools_warm_ms": round(_percentile(samples, 0.5) * 1000, 3),
+    }
+
+def run(quick: bool = False, rounds: int = 1) -> dict:
+    """Run the suite `rounds` times and report the per-metric median, which damps machine noise."""
+    results = [run_once(quick) for _ in range(rounds)]
+    report = results[-1]
+    report["meta"]["rounds"] = rounds
+    report["metrics"] = {
+        name: sorted(r["metrics"][name] for r in results)[len(results) // 2] for name in report["metrics"]
+    }
+    return report
+
+def run_once(quick: bool = False) -> dict:
+    sizes = [10000, 100000] if quick else [10000, 1000000]
+    metrics = {}
+    # Per-call INFO logs would flood the console and dominate the loop timings
+    logger.setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Everything that goes through the global DB manager uses a scratch database
+        Config.DB_PATH = Path(tmp) / "bench_suite.db"
+        Config.RETENTION_ENABLED = False
+        Config.METRICS_ENABLED = False
+        # Offline backend, and no client-side rate limiting: the loop itself is what's measured
+        Config.LLM_BACKEND = "scripted"
+        Config.LLM_REQUESTS_PER_MINUTE = 1e9
+        Config.LLM_TOKENS_PER_MINUTE = 1e12
+
+        from src.persistence.database import db
+        # The manager is a process-wide singleton: re-point it when running several rounds
+        db.db_path = Config.DB_PATH
+        db.init_db()
+        metrics.update(bench_startup(repeat=20 if quick else 100))
+        metrics.update(bench_registry(lookups=20000 if quick else 200000))
+        metrics.update(bench_agent_loop(steps=200 if quick else 2000))
+
+        from src.persistence.journal import journal_writer
+        journal_writer.close()
+        db.close_all()
+    metrics.update(bench_db_queries(sizes, repeat=50 if quick else 200))
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "quick": quick,
+        },
+        "metrics": metrics,
+    }
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Return (name, baseline, current, change, regressed) for every metric present in both."""
+    rows = []
+    for name, base in sorted(baseline.items()):
+        value = current.get(name)
+        if value is None or not base or name == "agent.steps":
+            continue
+        change = (value - base) / base
+        floor = next((v for suffix, v in NOISE_FLOORS.items() if name.endswith(suffix)), 0.0)
+        if name in HIGHER_IS_BETTER:
+            regressed = change < -tolerance
+        else:
+            regressed = change > tolerance and value - base > floor
+        rows.append((name, base, value, change, regressed))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="smaller journals and fewer steps")
+    parser.add_argument("--output", type=Path, default=Path("bench_results.json"))
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--rounds", type=int, default=1, help="repeat the suite and take per-metric medians")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative slowdown")
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the baseline")
+    args = parser.parse_args()
+
+    report = run(args.quick, args.rounds)
+    args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Results written to {args.output}")
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one.")
+        return 0
+
+    stored = json.loads(args.baseline.read_text(encoding="utf-8"))
+    if stored["meta"].get("quick") != report["meta"]["quick"]:
+        print("Warning: baseline and this run differ in --quick; sample counts are not comparable.")
+    rows = compare(report["metrics"], stored["metrics"], args.tolerance)
+    print(f"{'Metric':<48}{'baseline':>14}{'current':>14}{'change':>10}")
+    for name, base, value, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<48}{base:>14}{value:>14}{change:>+10.1%}{flag}")
+    regressions = [row for row in rows if row[4]]
+    if regressions:
+        print(f"{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}.")
+        return 1
+    print("No regressions.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+import asyncio
+import hashlib
+import json
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from src.utils.config import Config
+from src.utils.logger import logger
+
+class LLMBackend(ABC):
+    """Interface between LLMClient and a text-generation service."""
+
+    model_name: str = "unknown"
+    supports_streaming: bool = False
+
+    @abstractmethod
+    async def generate(self, prompt: str) -> str:
+        """Return the complete response text for a prompt."""
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """Yield the response text in chunks. Defaults to a single chunk."""
+        yield await self.generate(prompt)
+
+    async def generate_batch(self, prompts: Sequence[str]) -> List[str]:
+        """Generate responses for several prompts. Backends with a batch API override this."""
+        return list(await asyncio.gather(*(self.generate(p) for p in prompts)))
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini via google.generativeai (imported on first construction)."""
+
+    supports_streaming = True
+
+    def __init__(self, model_name: str = None, api_key: str = None):
+        import google.generativeai as genai
+
+        self.model_name = model_name or Config.GEMINI_MODEL_NAME
+        genai.configure(api_key=api_key or Config.GEMINI_API_KEY)
+        self.model = genai.GenerativeModel(self.model_name)
+
+    async def generate(self, prompt: str) -> str:
+        response = await self.model.generate_content_async(prompt)
+        return response.text
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        response = await self.model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            yield chunk.text
+
+class ScriptedBackend(LLMBackend):
+    """
+    Deterministic offline backend for tests, benchmarks and load tests.
+
+    Responses come from a list or a JSONL file. Lines may carry a
+    "prompt_hash" (SHA-256 of the prompt) to replay a recorded answer for that
+    exact prompt; the remaining lines are served in order, cycling when
+    exhausted. An optional `latency` simulates network time per call.
+    """
+
+    supports_streaming = True
+
+    def __init__(self, responses: Optional[Sequence] = None, script_path: Optional[Path] = None,
+                 latency: float = 0.0, chunk_size: int = 0, model_name: str = "scripted"):
+        self.model_name = model_name
+        self.latency = latency
+        self.chunk_size = chunk_size # 0 = stream the whole response as one chunk
+        self.replay: Dict[str, str] = {}
+        self.sequence: List[str] = []
+        self.calls = 0
+
+        entries = list(responses or [])
+        if script_path:
+            with open(script_path, encoding="utf-8") as f:
+                entries += [json.loads(line) for line in f if line.strip()]
+        for entry in entries:
+            if isinstance(entry, dict) and "prompt_hash" in entry:
+                self.replay[entry["prompt_hash"]] = self._as_text(entry["response"])
+            elif isinstance(entry, dict) and "response" in entry:
+                self.sequence.append(self._as_text(entry["response"]))
+            else:
+                self.sequence.append(self._as_text(entry))
+        if not self.sequence and not self.replay:
+            self.sequence.append(json.dumps({"action": "finish", "reasoning": "Scripted backend has no responses."}))
+
+    @staticmethod
+    def _as_text(response) -> str:
+        return response if isinstance(response, str) else json.dumps(response)
+
+    async def generate(self, prompt: str) -> str:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        recorded = self.replay.get(hashlib.sha256(prompt.encode()).hexdigest())
+        if recorded is not None:
+            self.calls += 1
+            return recorded
+        if not self.sequence:
+            self.calls += 1
+            return json.dumps({"action": "fail", "reasoning": "No recorded response for this prompt."})
+        response = self.sequence[self.calls % len(self.sequence)]
+        self.calls += 1
+        return response
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        text = await self.generate(prompt)
+        size = self.chunk_size or len(text) or 1
+        for i in range(0, len(text), size):
+            yield text[i:i + size]
+
+class CoalescingBackend(LLMBackend):
+    """
+    Wraps a backend so concurrent goals share work.
+
+    Identical prompts that are in flight at the same time are sent once and
+    share the result. With `batch_window` > 0, distinct prompts arriving within
+    that window are collected and sent through one generate_batch() call;
+    batching turns streaming off, since a batch only completes as a whole.
+    Otherwise identical streamed prompts are coalesced too: the first caller's
+    stream is buffered and later callers replay the buffer, then follow along.
+    """
+
+    def __init__(self, inner: LLMBackend, batch_window: float = 0.0, max_batch: int = 8):
+        self.inner = inner
+        self.model_name = inner.model_name
+        self.supports_streaming = inner.supports_streaming and batch_window <= 0
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._streams: Dict[str, _SharedStream] = {}
+        self._queue: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle = None
+        self.stats = {"requests": 0, "coalesced": 0, "batches": 0}
+
+    async def generate(self, prompt: str) -> str:
+        self.stats["requests"] += 1
+        shared = self._in_flight.get(prompt)
+        if shared is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(shared)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._in_flight[prompt] = future
+        try:
+            if self.batch_window > 0:
+                self._enqueue(prompt, future)
+            else:
+                asyncio.ensure_future(self._resolve([(prompt, future)]))
+            return await asyncio.shield(future)
+        finally:
+            self._in_flight.pop(prompt, None)
+
+    def _enqueue(self, prompt: str, future: asyncio.Future):
+        self._queue.append((prompt, future))
+        if len(self._queue) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.batch_window, self._flush)
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._queue = self._queue, []
+        if batch:
+            asyncio.ensure_future(self._resolve(batch))
+
+    async def _resolve(self, batch: List[Tuple[str, asyncio.Future]]):
+        self.stats["batches"] += 1
+        try:
+            if len(batch) == 1:
+                results = [await self.inner.generate(batch[0][0])]
+            else:
+                results = await self.inner.generate_batch([prompt for prompt, _ in batch])
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        self.stats["requests"] += 1
+        shared = self._streams.get(prompt)
+        if shared is not None:
+            self.stats["coalesced"] += 1
+        else:
+            # The inner stream runs in its own task so that a caller giving up
+            # does not cut off the others reading the same buffer
+            shared = self._streams[prompt] = _SharedStream()
+            asyncio.ensure_future(self._pump(prompt, shared))
+        async for chunk in shared.read():
+            yield chunk
+
+    async def _pump(self, prompt: str, shared: "_SharedStream"):
+        try:
+            async for chunk in self.inner.stream(prompt):
+                shared.push(chunk)
+        except Exception as e:
+            shared.close(e)
+        else:
+            shared.close()
+        finally:
+            if self._streams.get(prompt) is shared:
+                del self._streams[prompt]
+
+class _SharedStream:
+    """Chunks of one in-flight stream, readable from the start by any number of callers."""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._changed = asyncio.Event()
+
+    def push(self, chunk: str):
+        self.chunks.append(chunk)
+        self._notify()
+
+    def close(self, error: Optional[BaseException] = None):
+        self.done = True
+        self.error = error
+        self._notify()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def read(self) -> AsyncIterator[str]:
+        i = 0
+        while True:
+            changed = self._changed
+            while i < len(self.chunks):
+                yield self.chunks[i]
+                i += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await changed.wait()
+
+def create_backend(name: str = None) -> Optional[LLMBackend]:
+    """Build the backend selected by LLM_BACKEND ("gemini" or "scripted")."""
+    name = (name or Config.LLM_BACKEND).lower()
+    try:
+        if name == "scripted":
+            path = Path(Config.LLM_SCRIPT_PATH) if Config.LLM_SCRIPT_PATH else None
+            backend = ScriptedBackend(script_path=path, latency=Config.LLM_SCRIPTED_LATENCY)
+        elif name == "gemini":
+            backend = GeminiBackend()
+        else:
+            raise ValueError(f"Unknown LLM backend: {name}")
+    except Exception as e:
+        logger.error(f"Failed to initialize {name} LLM backend: {e}")
+        return None
+    return CoalescingBackend(backend, batch_window=Config.LLM_BATCH_WINDOW)
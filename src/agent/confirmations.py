@@ -0,0 +1,150 @@
+import hashlib
+import json
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from src.utils.config import Config
+from src.utils.logger import logger
+from src.persistence.database import db
+
+# Read-only tools run without asking; everything else (writes, commands) needs approval
+SAFE_TOOLS = {"read_file", "list_files", "web_get", "search_journal", "read_journal_entry"}
+
+EXPIRY_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+def requires_confirmation(tool_name: str) -> bool:
+    return tool_name not in SAFE_TOOLS
+
+def action_hash(tool_name: str, tool_args: Dict[str, Any]) -> str:
+    """Identity of a tool call for approvals: same tool and arguments, same hash."""
+    action_desc = f"{tool_name}:{json.dumps(tool_args, sort_keys=True)}"
+    return hashlib.sha256(action_desc.encode()).hexdigest()
+
+class ConfirmationStore:
+    """
+    Approval decisions and actions waiting for them.
+
+    Decisions live in the `confirmations` table and are cached in memory by
+    action hash, so checking an approved call does not hit the DB. Approvals
+    expire after CONFIRMATION_TTL seconds (0 = never); expired entries are
+    dropped from the cache and treated as undecided.
+
+    When a plan needs approval, the calls from the first unapproved one on are
+    saved in `pending_actions` with the plan's reasoning. Once every call is
+    approved the agent runs them directly instead of asking the LLM again,
+    including after a restart.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._decisions: Dict[str, Tuple[bool, Optional[datetime]]] = {} # Hash -> (approved, expiry)
+        self.stats = {"hits": 0, "misses": 0, "expired": 0}
+
+    # --- Decisions ---
+
+    def status(self, tool_name: str, tool_args: Dict[str, Any]) -> Optional[bool]:
+        """True if approved and not expired, False if rejected, None if undecided."""
+        key = action_hash(tool_name, tool_args)
+        with self._lock:
+            decision = self._decisions.get(key)
+        if decision is None:
+            self.stats["misses"] += 1
+            row = db.fetch_one("SELECT approved, expiry FROM confirmations WHERE action_hash = ?", (key,))
+            if row is None:
+                return None
+            expiry = datetime.strptime(row['expiry'], EXPIRY_FORMAT) if row['expiry'] else None
+            decision = (bool(row['approved']), expiry)
+            with self._lock:
+                self._decisions[key] = decision
+        else:
+            self.stats["hits"] += 1
+
+        approved, expiry = decision
+        if approved and expiry and datetime.now() > expiry:
+            with self._lock:
+                self._decisions.pop(key, None)
+            self.stats["expired"] += 1
+            return None
+        return approved
+
+    def is_approved(self, tool_name: str, tool_args: Dict[str, Any]) -> bool:
+        return self.status(tool_name, tool_args) is True
+
+    def approve(self, goal_id: Optional[int], tool_name: str, tool_args: Dict[str, Any],
+                ttl: Optional[float] = None):
+        ttl = Config.CONFIRMATION_TTL if ttl is None else ttl
+        expiry = datetime.now().replace(microsecond=0) + timedelta(seconds=ttl) if ttl > 0 else None
+        self._record(goal_id, tool_name, tool_args, True, expiry)
+
+    def reject(self, goal_id: Optional[int], tool_name: str, tool_args: Dict[str, Any]):
+        self._record(goal_id, tool_name, tool_args, False, None)
+
+    def _record(self, goal_id, tool_name, tool_args, approved: bool, expiry: Optional[datetime]):
+        key = action_hash(tool_name, tool_args)
+        db.execute_query(
+            "INSERT OR REPLACE INTO confirmations (action_hash, goal_id, action_description, approved, expiry) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, goal_id, f"{tool_name}:{json.dumps(tool_args, sort_keys=True)}", approved,
+             expiry.strftime(EXPIRY_FORMAT) if expiry else None)
+        )
+        with self._lock:
+            self._decisions[key] = (approved, expiry)
+
+    def invalidate(self):
+        """Forget cached decisions, e.g. after the confirmations table was edited externally."""
+        with self._lock:
+            self._decisions.clear()
+
+    # --- Pending actions ---
+
+    def save_pending(self, goal_id: int, calls: List[Dict[str, Any]], reasoning: Optional[str]):
+        db.execute_query(
+            "INSERT OR REPLACE INTO pending_actions (goal_id, calls, reasoning, created_at) "
+            "VALUES (?, ?, ?, CURRENT_TIMESTAMP)",
+            (goal_id, json.dumps(calls), reasoning)
+        )
+
+    def load_pending(self, goal_id: int) -> Optional[Dict[str, Any]]:
+        row = db.fetch_one("SELECT goal_id, calls, reasoning FROM pending_actions WHERE goal_id = ?", (goal_id,))
+        return self._decode(row) if row else None
+
+    def all_pending(self) -> List[Dict[str, Any]]:
+        rows = db.fetch_all(
+            "SELECT p.goal_id, p.calls, p.reasoning FROM pending_actions p "
+            "JOIN goals g ON g.id = p.goal_id WHERE g.status = 'active' ORDER BY p.created_at"
+        )
+        return [pending for pending in map(self._decode, rows) if pending]
+
+    def clear_pending(self, goal_id: int):
+        db.execute_query("DELETE FROM pending_actions WHERE goal_id = ?", (goal_id,))
+
+    def pending_state(self, pending: Dict[str, Any]) -> str:
+        """'approved' when every call needing approval has it, 'rejected' if any was rejected, else 'waiting'."""
+        state = "approved"
+        for call in pending['calls']:
+            if not requires_confirmation(call['tool_name']):
+                continue
+            status = self.status(call['tool_name'], call['tool_args'])
+            if status is False:
+                return "rejected"
+            if status is None:
+                state = "waiting"
+        return state
+
+    def waiting_calls(self, pending: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Calls of a pending action that still need a decision."""
+        return [
+            call for call in pending['calls']
+            if requires_confirmation(call['tool_name']) and self.status(call['tool_name'], call['tool_args']) is None
+        ]
+
+    @staticmethod
+    def _decode(row) -> Optional[Dict[str, Any]]:
+        try:
+            return {"goal_id": row['goal_id'], "calls": json.loads(row['calls']), "reasoning": row['reasoning']}
+        except (TypeError, ValueError) as e:
+            logger.error(f"Corrupt pending action for goal {row['goal_id']}: {e}")
+            return None
+
+# Global confirmation store, shared by the agent thread and the UI
+confirmation_store = ConfirmationStore()
@@ -0,0 +1,139 @@
+import json
+from typing import Any, Dict, List, Optional
+
+class IncrementalJSONObjectParser:
+    """
+    Incremental parser for a single top-level JSON object arriving in chunks.
+
+    Text before the opening brace (e.g. a markdown ``` fence) is ignored. After
+    each feed(), `fields` holds every top-level member whose value is complete,
+    partial_string(key) returns the decoded prefix of a string member that is
+    still being streamed, and items(key) returns the elements of an array
+    member completed so far, each as soon as its closing bracket arrives.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+        self._pos = 0 # Next character to scan
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key: Optional[str] = None # Key of the member currently being read
+        self._token_start: Optional[int] = None # Start of the current key or value
+        self._expect_key = True
+        self._current_value_start: Optional[int] = None
+        self._items: Dict[str, List[Any]] = {} # Array member -> elements completed so far
+        self._array_key: Optional[str] = None # Array member currently being read
+        self._item_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> Dict[str, Any]:
+        """Consume a chunk and return the fields completed so far."""
+        self.buffer += chunk
+        text = self.buffer
+        while self._pos < len(text) and not self.done:
+            ch = text[self._pos]
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._depth = 1
+                self._pos += 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expect_key:
+                        self._key = json.loads(text[self._token_start:self._pos + 1])
+                        self._token_start = None
+                self._pos += 1
+                continue
+
+            in_array = self._array_key is not None and self._depth == 2
+            if in_array and self._item_start is None and not ch.isspace() and ch not in ",]":
+                self._item_start = self._pos # First character of the next element
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect_key:
+                    self._token_start = self._pos
+                elif self._depth == 1 and self._current_value_start is None:
+                    self._current_value_start = self._pos
+            elif ch == ":" and self._depth == 1:
+                self._expect_key = False
+            elif ch in "{[":
+                if self._depth == 1 and self._current_value_start is None:
+                    self._current_value_start = self._pos
+                    if ch == "[":
+                        self._array_key = self._key
+                        self._items[self._key] = []
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 2 and self._array_key is not None:
+                    self._complete_item(text, self._pos + 1) # Object or array element closed
+                elif self._depth == 1 and self._array_key is not None:
+                    self._complete_item(text, self._pos) # Scalar before the closing bracket
+                    self._array_key = None
+                if self._depth == 0:
+                    self._complete_member(text, self._pos)
+                    self.done = True
+            elif ch == "," and self._depth == 1:
+                self._complete_member(text, self._pos)
+            elif ch == "," and self._depth == 2 and self._array_key is not None:
+                self._complete_item(text, self._pos)
+            elif self._depth == 1 and not self._expect_key and self._current_value_start is None and not ch.isspace():
+                self._current_value_start = self._pos # Number, true, false, null
+            self._pos += 1
+        return self.fields
+
+    def _complete_member(self, text: str, end: int):
+        if self._key is not None and self._current_value_start is not None:
+            raw = text[self._current_value_start:end].strip()
+            try:
+                self.fields[self._key] = json.loads(raw)
+            except json.JSONDecodeError:
+                pass # Malformed member; the caller falls back to parsing the whole response
+        self._key = None
+        self._current_value_start = None
+        self._expect_key = True
+
+    def _complete_item(self, text: str, end: int):
+        if self._item_start is not None:
+            try:
+                self._items[self._array_key].append(json.loads(text[self._item_start:end]))
+            except json.JSONDecodeError:
+                pass # Left to the whole-member parse
+        self._item_start = None
+
+    def items(self, key: str) -> List[Any]:
+        """Elements of the array member `key` completed so far (the live list while it streams)."""
+        if key in self._items:
+            return self._items[key]
+        value = self.fields.get(key)
+        return value if isinstance(value, list) else []
+
+    def partial_string(self, key: str) -> Optional[str]:
+        """Decoded prefix of the string value of `key` while it is still streaming."""
+        if key in self.fields:
+            value = self.fields[key]
+            return value if isinstance(value, str) else None
+        if self._key != key or self._current_value_start is None or self._depth != 1:
+            return None
+        raw = self.buffer[self._current_value_start:self._pos]
+        if not raw.startswith('"'):
+            return None
+        body = raw[1:]
+        # Drop a dangling escape so the prefix decodes
+        if body.endswith("\\") and not body.endswith("\\\\"):
+            body = body[:-1]
+        try:
+            return json.loads(f'"{body}"')
+        except json.JSONDecodeError:
+            return None
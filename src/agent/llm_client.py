@@ -1,90 +1,327 @@
-import google.generativeai as genai
+import asyncio
 import json
 import logging
-from typing import Dict, List, Any
+import time
+from typing import AsyncIterator, Callable, Dict, List, Any, Optional
 from src.utils.config import Config
-from src.utils.logger import logger
+from src.utils.logger import logger, truncate
+from src.utils.lazy import LazyProxy
+from src.utils.metrics import metrics
+from src.agent.plan_cache import PlanCache
+from src.agent.prompt import prompt_builder, estimate_tokens
+from src.agent.rate_limit import LLMGuard, is_retryable, backoff_delay
+from src.agent.json_stream import IncrementalJSONObjectParser
+from src.agent.backends import LLMBackend, create_backend
+from src.agent.confirmations import requires_confirmation
+
+# Numeric encoding of CircuitBreaker.state for the llm_breaker_state gauge
+BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
 
 class LLMClient:
-    """Client for interacting with the Gemini API."""
+    """Plans agent actions through a pluggable LLM backend (Gemini by default, see LLM_BACKEND)."""
 
-    def __init__(self):
-        try:
-            genai.configure(api_key=Config.GEMINI_API_KEY)
-            self.model = genai.GenerativeModel(Config.GEMINI_MODEL_NAME)
-        except Exception as e:
-            logger.error(f"Failed to initialize Gemini client: {e}")
-            self.model = None
+    def __init__(self, backend: Optional[LLMBackend] = None):
+        self.backend = backend if backend is not None else create_backend()
+        self.plan_cache = PlanCache() if Config.PLAN_CACHE_ENABLED else None
+        self.guard = LLMGuard()
+        self._background = set() # Streams still being drained after an early dispatch
+        self._call_feeds: Dict[int, "_CallFeed"] = {} # id(plan) -> feed, while its calls still stream
 
-    async def plan_action(self, goal: str, history: List[Dict], tools: Dict[str, str]) -> Dict[str, Any]:
+    async def plan_action(self, goal: str, history: List[Dict], tools: Dict[str, str], summary: str = "",
+                          on_reasoning: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
         """
-        Generates the next action based on the goal and history.
+        Generates the next action based on the goal, recent history and the
+        running summary of earlier steps.
+
+        With LLM_STREAMING enabled the response is parsed incrementally: a
+        tool_use plan is returned as soon as its first tool call is complete
+        (and, for calls that need confirmation, its reasoning), and
+        `on_reasoning` receives the reasoning text as it streams in. Calls
+        still streaming at that point are picked up with iter_tool_calls().
         
+        Calls are rate limited (requests and tokens per minute) and transient
+        errors are retried with exponential backoff. If the API stays
+        unhealthy the circuit breaker opens and the "wait" action is returned
+        with "retry_after" seconds, so the caller keeps the goal active.
+
         Returns:
             A dictionary containing the action:
             {
-                "action": "tool_use" | "finish" | "fail",
-                "tool_name": "name_of_tool" (if action is tool_use),
-                "tool_args": { ... } (if action is tool_use),
+                "action": "tool_use" | "finish" | "fail" | "wait",
+                "tool_calls": [ (if action is tool_use)
+                    {"tool_name": "name_of_tool", "tool_args": { ... }, "independent": bool}
+                ],
+                "reasoning": "Silent reasoning string"
+            }
+            Single-call plans using top-level "tool_name"/"tool_args" are also accepted:
+            {
+                "action": "tool_use",
+                "tool_name": "name_of_tool",
+                "tool_args": { ... },
                 "reasoning": "Silent reasoning string"
             }
         """
-        if not self.model:
+        if not self.backend:
              return {"action": "fail", "reasoning": "LLM client not initialized."}
 
         # Construct the prompt
-        prompt = self._construct_prompt(goal, history, tools)
+        prompt = self._construct_prompt(goal, history, tools, summary)
+
+        # Identical prompt for the same model -> replay the stored plan
+        cache_key = PlanCache.make_key(self.backend.model_name, prompt)
+        if self.plan_cache:
+            cached = self.plan_cache.get(cache_key)
+            if cached is not None:
+                metrics.inc("llm_plan_cache_hits_total")
+                return cached
+        
+        try:
+            return await self._plan_with_retries(prompt, cache_key, on_reasoning)
+        finally:
+            self.publish_limiter_state()
+
+    async def _plan_with_retries(self, prompt: str, cache_key: str, on_reasoning) -> Dict[str, Any]:
+        estimated_tokens = estimate_tokens(prompt) + Config.LLM_EXPECTED_OUTPUT_TOKENS
+        breaker = self.guard.breaker
+        for attempt in range(1, self.guard.max_attempts + 1):
+            trial = breaker.state == "half_open"
+            if not breaker.allow():
+                return self._wait_plan("LLM API unavailable (circuit open).", breaker.retry_after())
+
+            start = time.perf_counter()
+            try:
+                with metrics.timer("llm_rate_limit_wait_seconds"):
+                    await self.guard.acquire(estimated_tokens)
+                start = time.perf_counter()
+                if Config.LLM_STREAMING and self.backend.supports_streaming:
+                    plan = await self._plan_streaming(prompt, cache_key, on_reasoning)
+                else:
+                    # Generate content
+                    text = await self.backend.generate(prompt)
+                    plan = self._parse_response(text, cache_key)
+                breaker.record_success()
+                # Time until a dispatchable plan; with streaming the rest is read in the background
+                metrics.observe("llm_request_seconds", time.perf_counter() - start, outcome="ok")
+                return plan
+
+            except Exception as e:
+                metrics.observe("llm_request_seconds", time.perf_counter() - start, outcome="error")
+                if not is_retryable(e):
+                    logger.error(f"LLM generation failed: {e}")
+                    return {"action": "fail", "reasoning": str(e)}
+
+                breaker.record_failure()
+                self.guard.stats["failures"] += 1
+                if attempt == self.guard.max_attempts or breaker.state != "closed":
+                    logger.warning(f"LLM call failed after {attempt} attempt(s): {e}")
+                    return self._wait_plan(f"LLM API error: {e}", max(breaker.retry_after(), backoff_delay(attempt)))
+
+                delay = backoff_delay(attempt)
+                self.guard.stats["retries"] += 1
+                logger.warning(f"Transient LLM error ({e}); retry {attempt}/{self.guard.max_attempts - 1} in {delay:.1f}s")
+            finally:
+                if trial:
+                    # No-op after record_success/record_failure; frees the trial if the call was
+                    # cancelled or failed with a non-retryable error
+                    breaker.end_trial()
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _wait_plan(reason: str, retry_after: float) -> Dict[str, Any]:
+        """Plan telling the agent to keep the goal active and try again later."""
+        return {"action": "wait", "reasoning": reason, "retry_after": max(1.0, retry_after)}
+
+    def limiter_state(self) -> Dict[str, Any]:
+        """Rate limiter, retry and circuit breaker state, for monitoring."""
+        return self.guard.state()
+
+    def publish_limiter_state(self):
+        """Publish limiter_state() as metrics gauges (metrics panel, `metrics` table, Prometheus export)."""
+        state = self.limiter_state()
+        metrics.set_gauge("llm_breaker_state", BREAKER_STATES[state["breaker"]])
+        metrics.set_gauge("llm_breaker_retry_after_seconds", state["breaker_retry_after_s"])
+        metrics.set_gauge("llm_breaker_trips", state["breaker_trips"])
+        for bucket in ("requests_per_minute", "tokens_per_minute"):
+            if state[bucket]["available"] is not None: # No level to report for an unlimited bucket
+                metrics.set_gauge("llm_bucket_available", state[bucket]["available"], bucket=bucket)
+                metrics.set_gauge("llm_bucket_capacity", state[bucket]["capacity"], bucket=bucket)
+            metrics.set_gauge("llm_bucket_waited_seconds", state[bucket]["waited_s"], bucket=bucket)
+        for name in ("calls", "retries", "failures"):
+            metrics.set_gauge(f"llm_{name}", state[name])
+
+    def _parse_response(self, text: str, cache_key: str) -> Dict[str, Any]:
+        # Parse JSON from response (expecting markdown code block or raw json)
+        # Simple heuristic cleaning
+        clean_text = text.replace("```json", "").replace("```", "").strip()
         
         try:
-            # Generate content
-            response = await self.model.generate_content_async(prompt)
-            text = response.text
-            
-            # Parse JSON from response (expecting markdown code block or raw json)
-            # Simple heuristic cleaning
-            clean_text = text.replace("```json", "").replace("```", "").strip()
-            
+            action_plan = json.loads(clean_text)
+            self._store_plan(cache_key, action_plan)
+            return action_plan
+        except json.JSONDecodeError:
+            logger.error(f"Failed to parse LLM response: {truncate(text, 2000)}")
+            return {"action": "fail", "reasoning": "Invalid JSON response from LLM."}
+
+    def _store_plan(self, cache_key: str, plan: Dict[str, Any]):
+        if self.plan_cache and plan.get("action") != "fail":
+            self.plan_cache.put(cache_key, self.backend.model_name, plan)
+
+    @staticmethod
+    def _is_dispatchable(fields: Dict[str, Any], streamed_calls: List[Any] = ()) -> bool:
+        """
+        True once a streamed tool_use plan has everything needed to start executing.
+        `streamed_calls` are the calls completed so far of a tool_calls array still streaming.
+        """
+        if fields.get("action") != "tool_use":
+            return False # finish/fail need the complete reasoning anyway
+        if "tool_calls" in fields:
+            calls = fields["tool_calls"] if isinstance(fields["tool_calls"], list) else []
+        elif "tool_name" in fields and "tool_args" in fields:
+            calls = [fields]
+        elif streamed_calls:
+            calls = streamed_calls
+        else:
+            return False
+        # The user is shown the reasoning when asked to approve a call, so it must be complete
+        needs_approval = any(isinstance(call, dict) and requires_confirmation(call.get("tool_name")) for call in calls)
+        return "reasoning" in fields or not needs_approval
+
+    async def _plan_streaming(self, prompt: str, cache_key: str, on_reasoning) -> Dict[str, Any]:
+        """Stream the response and return the plan as early as possible."""
+        chunks = self.backend.stream(prompt).__aiter__()
+        parser = IncrementalJSONObjectParser()
+        reported = [None] # Last reasoning prefix sent to on_reasoning
+
+        while not parser.done:
             try:
-                action_plan = json.loads(clean_text)
-                return action_plan
-            except json.JSONDecodeError:
-                logger.error(f"Failed to parse LLM response: {text}")
-                return {"action": "fail", "reasoning": "Invalid JSON response from LLM."}
+                chunk = await chunks.__anext__()
+            except StopAsyncIteration:
+                break
+            parser.feed(chunk)
+            self._report_reasoning(parser, reported, on_reasoning)
+            if self._is_dispatchable(parser.fields, parser.items("tool_calls")):
+                break
+
+        if not parser.done and self._is_dispatchable(parser.fields, parser.items("tool_calls")):
+            # Dispatch now; finish reading the stream in the background for reasoning, later calls and the cache
+            plan = dict(parser.fields)
+            if "tool_calls" not in plan and parser.items("tool_calls"):
+                # The parser keeps appending to this list as further calls complete
+                plan["tool_calls"] = parser.items("tool_calls")
+                self._call_feeds[id(plan)] = _CallFeed()
+            task = asyncio.ensure_future(self._drain_stream(chunks, parser, plan, cache_key, reported, on_reasoning))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+            return plan
+
+        if parser.done and "action" in parser.fields:
+            plan = dict(parser.fields)
+            self._store_plan(cache_key, plan)
+            return plan
 
+        # Stream ended without a well-formed object: fall back to whole-text parsing
+        return self._parse_response(parser.buffer, cache_key)
+
+    async def _drain_stream(self, chunks, parser, plan, cache_key, reported, on_reasoning):
+        feed = self._call_feeds.get(id(plan))
+        try:
+            async for chunk in chunks:
+                calls = len(parser.items("tool_calls"))
+                parser.feed(chunk)
+                self._report_reasoning(parser, reported, on_reasoning)
+                if feed and len(parser.items("tool_calls")) > calls:
+                    feed.notify()
+                if parser.done:
+                    break
+            # The caller already holds `plan`; fill in what arrived after dispatch
+            for key, value in parser.fields.items():
+                plan.setdefault(key, value)
+            if parser.done:
+                self._store_plan(cache_key, plan)
         except Exception as e:
-            logger.error(f"LLM generation failed: {e}")
-            return {"action": "fail", "reasoning": str(e)}
+            logger.warning(f"Failed to finish reading LLM stream: {e}")
+        finally:
+            # Plan complete (reasoning included): let iter_tool_calls() finish
+            if self._call_feeds.pop(id(plan), None):
+                feed.notify()
 
-    def _construct_prompt(self, goal: str, history: List[Dict], tools: Dict[str, str]) -> str:
-        tool_desc = "\n".join([f"- {name}: {desc}" for name, desc in tools.items()])
+    async def iter_tool_calls(self, plan: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield the raw tool calls of a plan. For a plan dispatched while its
+        tool_calls array was still streaming, calls are yielded as they
+        complete; iteration ends once the response has been read to the end.
+        """
+        calls = plan.get("tool_calls")
+        if not calls and plan.get("tool_name"):
+            yield {"tool_name": plan.get("tool_name"), "tool_args": plan.get("tool_args", {}), "independent": False}
+            return
+        if not isinstance(calls, list):
+            return
+        i = 0
+        while True:
+            feed = self._call_feeds.get(id(plan))
+            changed = feed.changed if feed else None
+            while i < len(calls):
+                yield calls[i]
+                i += 1
+            if feed is None:
+                return
+            await changed.wait()
+
+    @staticmethod
+    def _report_reasoning(parser, reported, on_reasoning):
+        if not on_reasoning:
+            return
+        reasoning = parser.partial_string("reasoning")
+        if reasoning and reasoning != reported[0]:
+            reported[0] = reasoning
+            on_reasoning(reasoning)
+
+    def _construct_prompt(self, goal: str, history: List[Dict], tools: Dict[str, str], summary: str = "") -> str:
+        tool_desc = prompt_builder.render_tools(tools)
         
-        history_str = ""
-        for entry in history[-5:]: # Keep context manageable
-            history_str += f"- {entry.get('action')} -> {entry.get('result')} (Status: {entry.get('status')})\n"
+        # Bounded: last PROMPT_RECENT_ENTRIES entries, each result truncated to a token budget
+        history_str = prompt_builder.render_history(history)
+
+        summary_str = f"\nSummary of Earlier Steps:\n{summary}\n" if summary else ""
 
         prompt = f"""
 You are an autonomous agent. Your goal is: "{goal}"
 
 Available Tools:
 {tool_desc}
-
+{summary_str}
 Recent History:
 {history_str}
 
 Decide the next step. You must respond with a valid JSON object only. No other text.
 The JSON schema is:
 {{
+  "reasoning": "Brief explanation of why this action is chosen.",
   "action": "tool_use" or "finish" or "fail",
-  "tool_name": "name_of_tool_to_use",
-  "tool_args": {{ "arg_name": "arg_value" }},
-  "reasoning": "Brief explanation of why this action is chosen."
+  "tool_calls": [
+    {{ "tool_name": "name_of_tool_to_use", "tool_args": {{ "arg_name": "arg_value" }}, "independent": true }}
+  ]
 }}
+Write "reasoning" first.
 
 If the goal is achieved, set action to "finish".
 If the goal is impossible, set action to "fail".
-If you need to perform an action, set action to "tool_use" and specify the tool and arguments.
+If you need to perform an action, set action to "tool_use" and list one or more tool calls in "tool_calls".
+Set "independent" to true only when a call does not depend on the result of any other call in the list;
+independent calls are run concurrently, the others run in the order given.
 """
         return prompt
 
-# Global LLM client
-llm_client = LLMClient()
+class _CallFeed:
+    """Wakes iter_tool_calls() when a streamed plan gains a call or finishes."""
+
+    def __init__(self):
+        self.changed = asyncio.Event()
+
+    def notify(self):
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+# Global LLM client; the backend (and its SDK import) is only built on first use
+llm_client = LazyProxy(LLMClient)
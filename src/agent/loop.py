@@ -1,14 +1,20 @@
 import asyncio
-import hashlib
-import json
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
 from PyQt6.QtCore import QThread, pyqtSignal, QObject
 
 from src.persistence.database import db
+from src.persistence.journal import journal_writer
 from src.tools.registry import registry
+from src.tools.web import http_client
+from src.tools.context import ToolContext, set_tool_context, reset_tool_context
 from src.agent.llm_client import llm_client
+from src.agent.confirmations import confirmation_store, requires_confirmation
+from src.agent.scheduler import GoalScheduler
+from src.agent.prompt import prompt_builder
+from src.utils.config import Config
 from src.utils.logger import logger
+from src.utils.metrics import metrics
 
 class AgentSignals(QObject):
     """Signals for the agent thread."""
@@ -16,6 +22,7 @@ class AgentSignals(QObject):
     status_changed = pyqtSignal(str) # Status message
     confirmation_required = pyqtSignal(dict) # Confirmation details
     goal_updated = pyqtSignal(dict) # Goal status
+    tool_progress = pyqtSignal(dict) # Progress of a running tool
 
 class AgentThread(QThread):
     """
@@ -26,8 +33,10 @@ class AgentThread(QThread):
     def __init__(self):
         super().__init__()
         self.signals = AgentSignals()
+        self.scheduler = GoalScheduler()
         self.is_running = False
         self._loop = None
+        self._wakeup = None # asyncio.Event, created on the agent loop
 
     def run(self):
         """Entry point for QThread."""
@@ -44,102 +53,324 @@ class AgentThread(QThread):
             logger.error(f"Agent loop crashed: {e}")
             self.signals.status_changed.emit(f"Error: {e}")
         finally:
+            # The shared HTTP session belongs to this loop
+            self._loop.run_until_complete(http_client.close())
             self._loop.close()
+            journal_writer.flush()
+            db.close_connection()
             self.is_running = False
             self.signals.status_changed.emit("Agent Stopped")
 
     def stop(self):
         """Stops the agent loop safely."""
         self.is_running = False
+        # Queued journal entries are flushed by run() as the agent thread exits
+        self.notify()
+
+    def notify(self):
+        """Wake the agent loop because there may be new work. Safe to call from any thread."""
+        loop, wakeup = self._loop, self._wakeup
+        if loop is None or wakeup is None or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(wakeup.set)
+        except RuntimeError:
+            pass # Loop closed between the check and the call
 
     async def agent_cycle(self):
-        """Continuous agent loop."""
-        while self.is_running:
-            # 1. SENSE: Get active goal
-            goal = self._get_active_goal()
-            if not goal:
-                self.signals.status_changed.emit("Idle - No Active Goal")
-                await asyncio.sleep(2)
-                continue
+        """
+        Continuous agent loop.
 
-            self.signals.status_changed.emit(f"Planning for Goal: {goal['id']}")
-            
-            # Get recent history
-            history = self._get_recent_history(goal['id'])
+        Every active goal selected by the scheduler runs one Sense -> Plan ->
+        Act -> Evaluate step as its own task, so a goal blocked on a slow LLM
+        call or waiting for approval does not hold up the others.
+        """
+        self.scheduler.reset()
+        self._wakeup = asyncio.Event()
+        tasks = {} # Goal id -> step task
+        idle_status = None
+        try:
+            while self.is_running:
+                self._wakeup.clear()
+
+                # 1. SENSE: Get active goals and start steps for the ones the scheduler picks
+                goals = self._get_active_goals()
+                for goal in self.scheduler.select(goals, tasks.keys()):
+                    tasks[goal['id']] = asyncio.create_task(self._run_goal_step(goal))
+
+                metrics.set_gauge("active_goals", len(goals))
+                metrics.set_gauge("running_steps", len(tasks))
+                metrics.set_gauge("parked_goals", len(self.scheduler.parked()))
+                metrics.set_gauge("journal_queue_depth", journal_writer.pending_count())
+                llm_client.publish_limiter_state() # Buckets refill and the breaker half-opens between calls
+
+                # Sleep until a step finishes, a throttled goal becomes eligible or notify() is called
+                timeout = self.scheduler.seconds_until_ready(goals)
+                if not tasks:
+                    status = "Waiting for Approval" if self.scheduler.parked() else "Idle - No Active Goal"
+                    if timeout is None and status != idle_status:
+                        self.signals.status_changed.emit(status)
+                        idle_status = status
+                    timeout = Config.IDLE_POLL_INTERVAL if timeout is None else timeout
+                else:
+                    idle_status = None
+
+                done = await self._wait_for_work(tasks.values(), timeout)
+                for goal_id, task in list(tasks.items()):
+                    if task in done:
+                        del tasks[goal_id]
+                        if task.exception():
+                            logger.error(f"Step for goal {goal_id} crashed: {task.exception()}")
+                            self.scheduler.record_step(goal_id, ok=False)
+        finally:
+            # Let in-flight steps finish so their results are journaled
+            if tasks:
+                await asyncio.gather(*tasks.values(), return_exceptions=True)
+            self._wakeup = None
+
+    async def _wait_for_work(self, tasks, timeout):
+        """Wait for the first of: a task finishing, the wakeup event, or the timeout. Returns finished tasks."""
+        waiter = asyncio.ensure_future(self._wakeup.wait())
+        try:
+            done, _ = await asyncio.wait([*tasks, waiter], timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            if not waiter.done():
+                waiter.cancel()
+        return done
+
+    async def _run_goal_step(self, goal):
+        """Run one Sense -> Plan -> Act -> Evaluate step for a single goal."""
+        with metrics.timer("agent_step_seconds"):
+            await self._timed_goal_step(goal)
+        metrics.inc("agent_steps_total")
+        metrics.mark("agent_steps")
+
+    async def _timed_goal_step(self, goal):
+        # An action saved while waiting for approval runs as stored once approved: no new LLM call
+        pending = confirmation_store.load_pending(goal['id'])
+        if pending is not None:
+            state = confirmation_store.pending_state(pending)
+            if state == "waiting":
+                self._request_confirmations(goal['id'], pending['calls'], pending['reasoning'])
+                self.scheduler.park(goal['id'], "Waiting for Approval")
+                return
+            confirmation_store.clear_pending(goal['id'])
+            if state == "approved":
+                metrics.inc("confirmations_resumed_total")
+                self.signals.status_changed.emit(f"Resuming approved action for Goal: {goal['id']}")
+                plan = {"action": "tool_use", "tool_calls": pending['calls'], "reasoning": pending['reasoning']}
+                with metrics.timer("agent_phase_seconds", phase="act"):
+                    completed, statuses = await self._execute_tool_calls(goal['id'], plan)
+                if not completed:
+                    self.scheduler.park(goal['id'], "Waiting for Approval")
+                    return
+                self.scheduler.record_step(goal['id'], ok="error" not in statuses)
+                return
+            # Rejected: plan again; the rejection is in the journal
+
+        self.signals.status_changed.emit(f"Planning for Goal: {goal['id']}")
+        
+        with metrics.timer("agent_phase_seconds", phase="sense"):
+            # Get recent history and the running summary of older steps
+            context = await self._get_recent_history(goal['id'])
             
             # Get available tools
             tools = registry.get_all_tools()
 
-            # 2. PLAN: Call LLM
-            plan = await llm_client.plan_action(goal['description'], history, tools)
-            
-            if plan.get("action") == "finish":
-                self._update_goal_status(goal['id'], "completed")
-                self._log_journal(goal['id'], "Finished", "None", "Goal Completed", "success")
-                self.signals.status_changed.emit("Goal Completed")
-                continue # Or stop?
-            
-            if plan.get("action") == "fail":
-                self._update_goal_status(goal['id'], "failed")
-                self._log_journal(goal['id'], "Failed", "None", plan.get("reasoning", "Unknown"), "failed")
-                self.signals.status_changed.emit("Goal Failed")
+        # 2. PLAN: Call LLM
+        with metrics.timer("agent_phase_seconds", phase="plan"):
+            async with self.scheduler.llm_slot():
+                plan = await llm_client.plan_action(
+                    goal['description'], context.recent, tools, summary=context.summary,
+                    on_reasoning=lambda text: self.signals.status_changed.emit(f"Goal {goal['id']}: {text[-120:]}")
+                )
+        metrics.inc("agent_plans_total", action=plan.get("action", "unknown"))
+        
+        if plan.get("action") == "finish":
+            self._update_goal_status(goal['id'], "completed")
+            self._log_journal(goal['id'], "Finished", "None", "Goal Completed", "success")
+            self.signals.status_changed.emit("Goal Completed")
+            return
+        
+        if plan.get("action") == "wait":
+            # Transient LLM trouble: keep the goal active and try again later
+            retry_after = float(plan.get("retry_after", 5))
+            self.scheduler.defer(goal['id'], retry_after)
+            self.signals.status_changed.emit(f"Goal {goal['id']} waiting {retry_after:.0f}s: {plan.get('reasoning')}")
+            return
+
+        if plan.get("action") == "fail":
+            self._update_goal_status(goal['id'], "failed")
+            self._log_journal(goal['id'], "Failed", "None", plan.get("reasoning", "Unknown"), "failed")
+            self.signals.status_changed.emit("Goal Failed")
+            return
+
+        # 3. ACT: Execute Tool(s)
+        statuses = []
+        if plan.get("action") == "tool_use":
+            with metrics.timer("agent_phase_seconds", phase="act"):
+                completed, statuses = await self._execute_tool_calls(goal['id'], plan)
+            if not completed:
+                # Park this goal until the user responds; other goals keep running
+                self.scheduler.park(goal['id'], "Waiting for Approval")
+                return
+        
+        # Throttle adaptively: back off while steps keep erroring
+        self.scheduler.record_step(goal['id'], ok="error" not in statuses)
+
+    def add_goal(self, description, priority=0):
+        """Create an active goal; higher `priority` goals are scheduled first. Returns its id."""
+        goal_id = db.execute_query(
+            "INSERT INTO goals (description, status, priority) VALUES (?, ?, ?)",
+            (description, "active", int(priority))
+        )
+        self.notify()
+        return goal_id
+
+    def resume_goal(self, goal_id=None):
+        """Unpark a goal (or all goals) after the user responded to a confirmation. Thread-safe."""
+        if goal_id is None:
+            self.scheduler.unpark_all()
+        else:
+            self.scheduler.unpark(goal_id)
+        self.notify()
+
+    def _normalize_call(self, call):
+        """A tool call with every field present (the LLM may leave some out)."""
+        call = call if isinstance(call, dict) else {}
+        return {
+            "tool_name": call.get("tool_name"),
+            "tool_args": call.get("tool_args") or {},
+            "independent": bool(call.get("independent", False)),
+        }
+
+    async def _execute_tool_calls(self, goal_id, plan):
+        """
+        Execute the tool calls of a plan.
+
+        Calls start as they arrive: a plan dispatched while the LLM is still
+        streaming its tool_calls runs the first calls while later ones are
+        being generated. Consecutive independent calls run concurrently
+        (bounded by MAX_PARALLEL_TOOL_CALLS); dependent calls wait for the
+        calls before them and run alone, in plan order. Calls that need
+        approval are sent for confirmation and nothing from that point on is
+        executed.
+
+        Returns:
+            (completed, statuses): completed is False if execution paused
+            waiting for user approval; statuses lists the status of every
+            call that ran.
+        """
+        semaphore = asyncio.Semaphore(Config.MAX_PARALLEL_TOOL_CALLS)
+        calls = []
+        statuses = []
+        batch = [] # Tasks of the independent calls started since the last dependent one
+        first_pending = None
+        try:
+            async for call in llm_client.iter_tool_calls(plan):
+                call = self._normalize_call(call)
+                calls.append(call)
+                if first_pending is not None:
+                    continue # Only collecting the rest of the plan
+                if (self._requires_confirmation(call['tool_name'])
+                        and not self._check_confirmation(goal_id, call['tool_name'], call['tool_args'])):
+                    first_pending = len(calls) - 1
+                    continue
+                if call['independent']:
+                    batch.append(asyncio.ensure_future(self._run_tool_call(goal_id, call, semaphore)))
+                    continue
+                statuses += await self._run_batch(batch)
+                batch = []
+                statuses.append(await self._run_tool_call(goal_id, call, semaphore))
+            statuses += await self._run_batch(batch)
+        except BaseException:
+            for task in batch:
+                task.cancel()
+            raise
+
+        if first_pending is not None:
+            pending = [
+                call for call in calls[first_pending:]
+                if self._requires_confirmation(call['tool_name'])
+                and not self._check_confirmation(goal_id, call['tool_name'], call['tool_args'])
+            ]
+            # Pause and wait for user; the rest of the plan is kept so approval can resume it directly
+            remaining = calls[first_pending:]
+            confirmation_store.save_pending(goal_id, remaining, plan.get("reasoning"))
+            self.signals.status_changed.emit("Waiting for Approval")
+            self._request_confirmations(goal_id, pending, plan.get("reasoning"))
+            return False, statuses
+        return True, statuses
+
+    def _request_confirmations(self, goal_id, calls, reasoning):
+        """Ask the UI to confirm every call not approved yet (the UI ignores duplicates)."""
+        for call in calls:
+            if not self._requires_confirmation(call['tool_name']):
+                continue
+            if confirmation_store.is_approved(call['tool_name'], call['tool_args']):
                 continue
+            self.signals.confirmation_required.emit({
+                "goal_id": goal_id,
+                "tool_name": call['tool_name'],
+                "tool_args": call['tool_args'],
+                "reasoning": reasoning
+            })
 
-            # 3. ACT: Execute Tool
-            if plan.get("action") == "tool_use":
-                tool_name = plan.get("tool_name")
-                tool_args = plan.get("tool_args", {})
-                
-                # Confirmation Check
-                if self._requires_confirmation(tool_name):
-                    approved = self._check_confirmation(goal['id'], tool_name, tool_args)
-                    if not approved:
-                        # Pause and wait for user
-                        self.signals.status_changed.emit("Waiting for Approval")
-                        self.signals.confirmation_required.emit({
-                            "goal_id": goal['id'],
-                            "tool_name": tool_name,
-                            "tool_args": tool_args,
-                            "reasoning": plan.get("reasoning")
-                        })
-                        self.is_running = False # Stop loop to wait for user
-                        break
-                
-                # Execute
-                self.signals.status_changed.emit(f"Executing {tool_name}...")
-                try:
-                    result = await registry.execute(tool_name, **tool_args)
-                    status = "success"
-                except Exception as e:
-                    result = f"Error: {e}"
-                    status = "error"
-
-                # 4. EVALUATE: Log result
-                self._log_journal(goal['id'], f"Used {tool_name}", tool_name, str(result), status)
-            
-            # Throttle slightly
-            await asyncio.sleep(1)
+    async def _run_batch(self, tasks):
+        if not tasks:
+            return []
+        return list(await asyncio.gather(*tasks))
+
+    async def _run_tool_call(self, goal_id, call, semaphore):
+        tool_name = call['tool_name']
+        async with semaphore, self.scheduler.tool_slot(tool_name):
+            self.signals.status_changed.emit(f"Executing {tool_name}...")
+            token = set_tool_context(ToolContext(goal_id=goal_id, on_progress=self._make_progress_reporter(goal_id)))
+            start = time.perf_counter()
+            try:
+                result = await registry.execute(tool_name, **call['tool_args'])
+                status = "success"
+            except Exception as e:
+                result = f"Error: {e}"
+                status = "error"
+            finally:
+                reset_tool_context(token)
+                metrics.observe("tool_seconds", time.perf_counter() - start, tool=tool_name)
+            metrics.inc("tool_calls_total", tool=tool_name, status=status)
+
+        # 4. EVALUATE: Log result
+        with metrics.timer("agent_phase_seconds", phase="evaluate"):
+            self._log_journal(goal_id, f"Used {tool_name}", tool_name, str(result), status)
+        return status
 
-    def _get_active_goal(self):
-        return db.fetch_one("SELECT * FROM goals WHERE status = 'active' ORDER BY created_at DESC LIMIT 1")
+    def _make_progress_reporter(self, goal_id):
+        def report(tool_name, message):
+            self.signals.tool_progress.emit({"goal_id": goal_id, "tool": tool_name, "message": message})
+        return report
 
-    def _get_recent_history(self, goal_id):
-        rows = db.fetch_all("SELECT * FROM journal WHERE goal_id = ? ORDER BY timestamp DESC LIMIT 10", (goal_id,))
-        # Convert to list of dicts and reverse to chronological order
-        history = [dict(row) for row in rows]
-        return history[::-1]
+    def _get_active_goals(self):
+        return db.fetch_all("SELECT * FROM goals WHERE status = 'active' ORDER BY priority DESC, created_at")
+
+    async def _get_recent_history(self, goal_id):
+        # Entries still queued in the write-behind buffer must be visible; the
+        # batched insert and commit run off the event loop so other goals keep going
+        await asyncio.get_running_loop().run_in_executor(None, journal_writer.flush)
+        return prompt_builder.context_for(goal_id)
 
     def _update_goal_status(self, goal_id, status):
         db.execute_query("UPDATE goals SET status = ? WHERE id = ?", (status, goal_id))
+        if status != "active":
+            self.scheduler.forget(goal_id)
+            confirmation_store.clear_pending(goal_id)
+            registry.memo.forget_goal(goal_id)
         self.signals.goal_updated.emit({"id": goal_id, "status": status})
 
     def _log_journal(self, goal_id, action, tool_used, result, status):
-        db.execute_query(
-            "INSERT INTO journal (goal_id, action, tool_used, result, status) VALUES (?, ?, ?, ?, ?)",
-            (goal_id, action, tool_used, str(result), status)
-        )
+        # Queued for a batched background write; the UI is notified right away
+        seq = journal_writer.write(goal_id, action, tool_used, result, status)
         # Emit signal for UI update
         entry = {
+            "seq": seq, # Lets the journal view skip entries already in its DB snapshot
             "timestamp": datetime.now().strftime("%H:%M:%S"),
             "action": action,
             "tool": tool_used,
@@ -150,29 +381,8 @@ class AgentThread(QThread):
 
     def _requires_confirmation(self, tool_name):
         # All tools except read-only ones require confirmation for safety in this version
-        # Or maybe just high-risk ones. Let's say all write/exec tools.
-        safe_tools = ["read_file", "list_files", "web_get"]
-        return tool_name not in safe_tools
+        return requires_confirmation(tool_name)
 
     def _check_confirmation(self, goal_id, tool_name, tool_args):
-        # Generate hash
-        action_desc = f"{tool_name}:{json.dumps(tool_args, sort_keys=True)}"
-        action_hash = hashlib.sha256(action_desc.encode()).hexdigest()
-        
-        # Check DB
-        row = db.fetch_one("SELECT approved, expiry FROM confirmations WHERE action_hash = ?", (action_hash,))
-        
-        if row:
-            if row['approved']:
-                # Check expiry (if we implement expiry logic)
-                # For now, assume permanent until restart if persisted? 
-                # Prompt says "confirmation state persisting across application restarts"
-                # But also "expiry DATETIME". 
-                expiry = datetime.strptime(row['expiry'], "%Y-%m-%d %H:%M:%S") if row['expiry'] else None
-                if expiry and datetime.now() > expiry:
-                    return False
-                return True
-            else:
-                return False # Explicitly rejected previously
-        
-        return False # Not found
+        # Cached in memory; approvals past their expiry count as undecided
+        return confirmation_store.is_approved(tool_name, tool_args)
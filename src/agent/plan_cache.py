@@ -0,0 +1,76 @@
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Dict, Optional
+from src.utils.config import Config
+from src.utils.logger import logger
+from src.persistence.database import db
+
+class PlanCache:
+    """
+    Content-addressed cache of LLM plans.
+
+    Plans are keyed on a hash of the model name and the full prompt, so a step
+    whose goal, history window and tool set are identical to an earlier one is
+    answered from SQLite instead of the API. Entries expire after `ttl` seconds
+    and the least recently used ones are evicted beyond `max_entries`.
+    """
+
+    def __init__(self, ttl: float = Config.PLAN_CACHE_TTL, max_entries: int = Config.PLAN_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    @staticmethod
+    def make_key(model_name: str, prompt: str) -> str:
+        return hashlib.sha256(f"{model_name}\0{prompt}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached plan for `key`, or None on a miss or expired entry."""
+        now = time.time()
+        row = db.fetch_one("SELECT plan, created_at FROM plan_cache WHERE key = ?", (key,))
+        if row is None or now - row['created_at'] > self.ttl:
+            if row is not None:
+                db.execute_query("DELETE FROM plan_cache WHERE key = ?", (key,))
+            self._count("misses")
+            return None
+
+        db.execute_query("UPDATE plan_cache SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key))
+        self._count("hits")
+        return json.loads(row['plan'])
+
+    def put(self, key: str, model_name: str, plan: Dict[str, Any]):
+        """Store a plan and evict least recently used entries over the limit."""
+        now = time.time()
+        try:
+            db.execute_query(
+                "INSERT OR REPLACE INTO plan_cache (key, model, plan, created_at, last_used, hits) VALUES (?, ?, ?, ?, ?, 0)",
+                (key, model_name, json.dumps(plan), now, now)
+            )
+            self._count("stores")
+            self._evict()
+        except Exception as e:
+            logger.warning(f"Failed to store plan in cache: {e}")
+
+    def _evict(self):
+        count = db.fetch_one("SELECT COUNT(*) AS n FROM plan_cache")['n']
+        excess = count - self.max_entries
+        if excess > 0:
+            db.execute_query(
+                "DELETE FROM plan_cache WHERE key IN (SELECT key FROM plan_cache ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+            self._count("evictions", excess)
+
+    def clear(self):
+        db.execute_query("DELETE FROM plan_cache")
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
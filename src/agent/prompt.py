@@ -0,0 +1,114 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+from src.utils.config import Config
+from src.utils.logger import logger
+from src.persistence.database import db
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (characters / PROMPT_CHARS_PER_TOKEN)."""
+    return len(text) // Config.PROMPT_CHARS_PER_TOKEN + 1
+
+def truncate_to_tokens(text: str, budget: int, total_length: int = None) -> str:
+    """
+    Cut `text` to roughly `budget` tokens, keeping the head and noting what was dropped.
+    `total_length` is the original length when `text` is already a prefix of it.
+    """
+    text = str(text)
+    total_length = max(total_length or 0, len(text))
+    limit = budget * Config.PROMPT_CHARS_PER_TOKEN
+    if total_length <= limit:
+        return text
+    return f"{text[:limit]} ...[truncated, {total_length} chars total]"
+
+@dataclass
+class GoalContext:
+    """The slice of a goal's journal that goes into a prompt."""
+    summary: str = ""
+    recent: List[Dict] = field(default_factory=list)
+
+class PromptBuilder:
+    """
+    Keeps a bounded, rolling context per goal.
+
+    The last PROMPT_RECENT_ENTRIES journal entries are included with their
+    results truncated to PROMPT_RESULT_TOKENS. Older entries are folded into
+    a running summary, one short line per step, which is stored in the
+    goal_context table and capped at PROMPT_SUMMARY_TOKENS by dropping its
+    oldest lines. Each step only reads the journal rows added since the last
+    fold, so prompt size and build cost stay flat however long a goal runs.
+    """
+
+    SUMMARY_LINE_CHARS = 160
+
+    def __init__(self):
+        self._tool_block_cache: Dict[Tuple, str] = {}
+
+    def context_for(self, goal_id: int) -> GoalContext:
+        """Return the summary and recent entries for a goal, folding older entries into the summary."""
+        state = db.fetch_one("SELECT summary, last_entry_id, omitted FROM goal_context WHERE goal_id = ?", (goal_id,))
+        summary, last_id, omitted = (state['summary'], state['last_entry_id'], state['omitted']) if state else ("", 0, 0)
+
+        # Never pull more result text out of the DB than could end up in the prompt
+        max_chars = Config.PROMPT_RESULT_TOKENS * Config.PROMPT_CHARS_PER_TOKEN
+        rows = db.fetch_all(
+            "SELECT id, timestamp, action, tool_used, substr(result, 1, ?) AS result, length(result) AS result_length, status "
+            "FROM journal WHERE goal_id = ? AND id > ? ORDER BY id",
+            (max_chars, goal_id, last_id)
+        )
+        entries = [dict(row) for row in rows]
+
+        window = Config.PROMPT_RECENT_ENTRIES
+        if len(entries) > window:
+            older, entries = entries[:-window], entries[-window:]
+            summary, omitted = self._fold(summary, omitted, older)
+            last_id = older[-1]['id']
+            try:
+                db.execute_query(
+                    "INSERT OR REPLACE INTO goal_context (goal_id, summary, last_entry_id, omitted, updated_at) "
+                    "VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)",
+                    (goal_id, summary, last_id, omitted)
+                )
+            except Exception as e:
+                logger.warning(f"Failed to store context summary for goal {goal_id}: {e}")
+
+        if omitted:
+            summary_text = f"({omitted} earlier steps omitted)\n{summary}"
+        else:
+            summary_text = summary
+        return GoalContext(summary=summary_text, recent=entries)
+
+    def _fold(self, summary: str, omitted: int, entries: List[Dict]) -> Tuple[str, int]:
+        """Append one line per entry to the summary and trim it to the token budget."""
+        lines = summary.splitlines() if summary else []
+        for entry in entries:
+            result = " ".join(str(entry.get('result') or "").split())
+            line = f"- {entry.get('action')} -> {result} (Status: {entry.get('status')})"
+            if len(line) > self.SUMMARY_LINE_CHARS:
+                line = line[:self.SUMMARY_LINE_CHARS - 3] + "..."
+            lines.append(line)
+
+        while lines and estimate_tokens("\n".join(lines)) > Config.PROMPT_SUMMARY_TOKENS:
+            lines.pop(0)
+            omitted += 1
+        return "\n".join(lines), omitted
+
+    def render_tools(self, tools: Dict[str, str]) -> str:
+        """Tool description block, cached per tool set."""
+        key = tuple(tools.items())
+        block = self._tool_block_cache.get(key)
+        if block is None:
+            block = "\n".join([f"- {name}: {desc}" for name, desc in tools.items()])
+            if len(self._tool_block_cache) > 32:
+                self._tool_block_cache.clear()
+            self._tool_block_cache[key] = block
+        return block
+
+    def render_history(self, history: List[Dict]) -> str:
+        lines = []
+        for entry in history[-Config.PROMPT_RECENT_ENTRIES:]:
+            result = truncate_to_tokens(entry.get('result') or "", Config.PROMPT_RESULT_TOKENS, entry.get('result_length'))
+            lines.append(f"- {entry.get('action')} -> {result} (Status: {entry.get('status')})\n")
+        return "".join(lines)
+
+# Global prompt builder
+prompt_builder = PromptBuilder()
@@ -0,0 +1,152 @@
+import asyncio
+import random
+import time
+from typing import Any, Dict, Optional
+from src.utils.config import Config
+
+class TokenBucket:
+    """
+    Client-side token bucket refilled continuously at `per_minute` tokens per
+    minute. A `per_minute` of zero or less means unlimited: acquire() never waits.
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.unlimited = per_minute <= 0
+        self.rate = max(per_minute, 0) / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self.waited = 0.0 # Total seconds callers spent waiting
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        """Wait until `amount` tokens are available, then take them."""
+        if self.unlimited:
+            return
+        amount = min(amount, self.capacity)
+        while True:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return
+            delay = (amount - self.tokens) / self.rate
+            self.waited += delay
+            await asyncio.sleep(delay)
+
+    def state(self) -> Dict[str, Any]:
+        self._refill()
+        return {
+            "available": None if self.unlimited else round(self.tokens, 1),
+            "capacity": None if self.unlimited else self.capacity,
+            "waited_s": round(self.waited, 2),
+        }
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `reset_timeout` seconds; then lets one trial call through (half-open).
+    Other callers are rejected until the trial is recorded as a success or a
+    failure, or abandoned with end_trial().
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trips = 0
+        self.trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """True if a call may go ahead; in half-open state this claims the single trial call."""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "open" or self.trial_in_flight:
+            return False
+        self.trial_in_flight = True
+        return True
+
+    def end_trial(self):
+        """Release the trial claimed by allow() when its call ended without a verdict (e.g. cancelled)."""
+        self.trial_in_flight = False
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.trial_in_flight = False
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                self.trips += 1
+            self.opened_at = time.monotonic()
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+RETRYABLE_NAMES = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "DeadlineExceeded",
+    "InternalServerError", "GatewayTimeout", "Aborted",
+}
+
+def is_retryable(error: BaseException) -> bool:
+    """Transient errors worth retrying: timeouts, connection errors, 429 and 5xx responses."""
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    if type(error).__name__ in RETRYABLE_NAMES:
+        return True
+    for attr in ("code", "status", "status_code"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int) and value in RETRYABLE_STATUS:
+            return True
+    return "429" in str(error) or "rate limit" in str(error).lower()
+
+def backoff_delay(attempt: int, base: float = None, cap: float = None) -> float:
+    """Exponential backoff with full jitter for the given 1-based attempt."""
+    base = Config.LLM_RETRY_BASE_DELAY if base is None else base
+    cap = Config.LLM_RETRY_MAX_DELAY if cap is None else cap
+    return random.uniform(0, min(cap, base * (2 ** (attempt - 1))))
+
+class LLMGuard:
+    """Rate limiter, retry policy and circuit breaker shared by all LLM calls."""
+
+    def __init__(self):
+        self.requests = TokenBucket(Config.LLM_REQUESTS_PER_MINUTE)
+        self.tokens = TokenBucket(Config.LLM_TOKENS_PER_MINUTE)
+        self.breaker = CircuitBreaker(Config.LLM_BREAKER_THRESHOLD, Config.LLM_BREAKER_RESET)
+        self.max_attempts = Config.LLM_MAX_ATTEMPTS
+        self.stats = {"calls": 0, "retries": 0, "failures": 0}
+
+    async def acquire(self, estimated_tokens: int):
+        await self.requests.acquire(1)
+        await self.tokens.acquire(estimated_tokens)
+        self.stats["calls"] += 1
+
+    def state(self) -> Dict[str, Any]:
+        """Snapshot of limiter and breaker state for monitoring."""
+        return {
+            "requests_per_minute": self.requests.state(),
+            "tokens_per_minute": self.tokens.state(),
+            "breaker": self.breaker.state,
+            "breaker_retry_after_s": round(self.breaker.retry_after(), 1),
+            "breaker_trips": self.breaker.trips,
+            **self.stats,
+        }
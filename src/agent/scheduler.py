@@ -0,0 +1,128 @@
+import asyncio
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+from src.utils.config import Config
+from src.utils.logger import logger
+
+class GoalScheduler:
+    """
+    Decides which active goals get to run their next step.
+
+    Each scheduled step runs as its own asyncio task on the agent loop, so up to
+    `max_concurrent_goals` goals make progress at the same time. Goals are
+    picked by priority (highest first) and, within a priority, round-robin by
+    the time they were last scheduled. Goals waiting for user approval are
+    parked and skipped until unparked. After each step a goal is held back
+    for an adaptive throttle delay that grows while its steps keep failing.
+    The scheduler also owns the semaphores that cap concurrent LLM calls and
+    concurrent executions per tool.
+    """
+
+    def __init__(self, max_concurrent_goals: int = Config.MAX_CONCURRENT_GOALS,
+                 llm_concurrency: int = Config.LLM_CONCURRENCY,
+                 tool_limits: Optional[Dict[str, int]] = None,
+                 default_tool_limit: int = Config.DEFAULT_TOOL_CONCURRENCY):
+        self.max_concurrent_goals = max_concurrent_goals
+        self.llm_concurrency = llm_concurrency
+        self.tool_limits = tool_limits if tool_limits is not None else Config.tool_concurrency_limits()
+        self.default_tool_limit = default_tool_limit
+        self._lock = threading.Lock() # Park/unpark is called from the UI thread
+        self._parked: Dict[int, str] = {} # Goal id -> reason
+        self._last_scheduled: Dict[int, float] = {}
+        self._not_before: Dict[int, float] = {} # Goal id -> monotonic time it may run again
+        self._error_streak: Dict[int, int] = {}
+        self._llm_semaphore: Optional[asyncio.Semaphore] = None
+        self._tool_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def select(self, goals: Iterable, running: Iterable[int]) -> List:
+        """Pick the goals to start next from the active `goals`, given the ids already `running`."""
+        running = set(running)
+        capacity = self.max_concurrent_goals - len(running)
+        if capacity <= 0:
+            return []
+
+        now = time.monotonic()
+        with self._lock:
+            candidates = [
+                g for g in goals
+                if g['id'] not in running and g['id'] not in self._parked
+                and self._not_before.get(g['id'], 0.0) <= now
+            ]
+        candidates.sort(key=lambda g: (-(g['priority'] or 0), self._last_scheduled.get(g['id'], 0.0), g['id']))
+
+        selected = candidates[:capacity]
+        for goal in selected:
+            self._last_scheduled[goal['id']] = now
+        return selected
+
+    def record_step(self, goal_id: int, ok: bool):
+        """Throttle a goal after a step: minimal delay on success, exponential backoff on errors."""
+        if ok:
+            self._error_streak.pop(goal_id, None)
+            delay = Config.STEP_THROTTLE_MIN
+        else:
+            streak = self._error_streak.get(goal_id, 0) + 1
+            self._error_streak[goal_id] = streak
+            delay = min(Config.STEP_THROTTLE_MAX, max(Config.STEP_THROTTLE_MIN, 0.5) * (2 ** (streak - 1)))
+        self._not_before[goal_id] = time.monotonic() + delay
+
+    def defer(self, goal_id: int, seconds: float):
+        """Hold a goal back for `seconds` (e.g. while the LLM API is unavailable)."""
+        self._not_before[goal_id] = time.monotonic() + seconds
+
+    def seconds_until_ready(self, goals: Iterable) -> Optional[float]:
+        """Seconds until the next throttled (but otherwise runnable) goal becomes eligible, or None."""
+        now = time.monotonic()
+        with self._lock:
+            waits = [
+                self._not_before[g['id']] - now for g in goals
+                if g['id'] in self._not_before and g['id'] not in self._parked
+            ]
+        waits = [w for w in waits if w > 0]
+        return min(waits) if waits else None
+
+    def park(self, goal_id: int, reason: str = ""):
+        """Exclude a goal from scheduling (e.g. while it waits for approval)."""
+        with self._lock:
+            self._parked[goal_id] = reason
+        logger.info(f"Goal {goal_id} parked: {reason}")
+
+    def unpark(self, goal_id: int):
+        with self._lock:
+            if self._parked.pop(goal_id, None) is not None:
+                logger.info(f"Goal {goal_id} unparked.")
+
+    def unpark_all(self):
+        with self._lock:
+            self._parked.clear()
+
+    def parked(self) -> Dict[int, str]:
+        with self._lock:
+            return dict(self._parked)
+
+    def forget(self, goal_id: int):
+        """Drop bookkeeping for a goal that is no longer active."""
+        self._last_scheduled.pop(goal_id, None)
+        self._not_before.pop(goal_id, None)
+        self._error_streak.pop(goal_id, None)
+        self.unpark(goal_id)
+
+    def llm_slot(self) -> asyncio.Semaphore:
+        """Semaphore bounding concurrent LLM planning calls. Must be used on the agent loop."""
+        if self._llm_semaphore is None:
+            self._llm_semaphore = asyncio.Semaphore(self.llm_concurrency)
+        return self._llm_semaphore
+
+    def tool_slot(self, tool_name: str) -> asyncio.Semaphore:
+        """Semaphore bounding concurrent executions of one tool. Must be used on the agent loop."""
+        semaphore = self._tool_semaphores.get(tool_name)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.tool_limits.get(tool_name, self.default_tool_limit))
+            self._tool_semaphores[tool_name] = semaphore
+        return semaphore
+
+    def reset(self):
+        """Drop loop-bound semaphores; call when the agent loop is recreated."""
+        self._llm_semaphore = None
+        self._tool_semaphores = {}
@@ -1,20 +1,72 @@
 import sys
-from PyQt6.QtWidgets import QApplication
+import time
 from src.utils.config import Config
 from src.utils.logger import logger
-from src.ui.main_window import MainWindow
-from src.ui.theme import apply_theme
-from src.tools.builtin import register_builtin_tools
+
+# Heavy third-party modules whose load state --profile-startup reports
+HEAVY_MODULES = ["PyQt6.QtWidgets", "aiohttp", "google.generativeai"]
+
+def profile_startup() -> int:
+    """
+    Run the startup path without entering the Qt event loop and report where
+    the time goes. Used by `python -m src.main --profile-startup`.
+    """
+    timings = []
+
+    def phase(name, func):
+        start = time.perf_counter()
+        result = func()
+        timings.append((name, time.perf_counter() - start))
+        return result
+
+    total_start = time.perf_counter()
+    phase("import src.tools.builtin", lambda: __import__("src.tools.builtin"))
+    phase("import src.ui.main_window", lambda: __import__("src.ui.main_window"))
+    phase("import src.ui.theme", lambda: __import__("src.ui.theme"))
+
+    from src.persistence.database import db
+    from src.tools.builtin import register_builtin_tools
+    phase("database init (schema/migrations)", lambda: db.schema_version)
+    phase("register_builtin_tools", register_builtin_tools)
+
+    from PyQt6.QtWidgets import QApplication
+    from src.ui.main_window import MainWindow
+    from src.ui.theme import apply_theme
+    app = phase("QApplication", lambda: QApplication(sys.argv))
+    phase("apply_theme", lambda: apply_theme(app))
+    window = phase("MainWindow()", MainWindow)
+    total = time.perf_counter() - total_start
+
+    print(f"{'Phase':<40}{'ms':>10}")
+    for name, seconds in timings:
+        print(f"{name:<40}{seconds * 1000:>10.1f}")
+    print(f"{'total':<40}{total * 1000:>10.1f}")
+    print()
+    for module in HEAVY_MODULES:
+        state = "loaded" if module in sys.modules else "deferred"
+        print(f"{module:<40}{state:>10}")
+
+    window.close()
+    return 0
 
 def main():
     """Main application entry point."""
+    if "--profile-startup" in sys.argv:
+        sys.exit(profile_startup())
+
     try:
         # Validate configuration
         Config.validate()
-        
+
         # Initialize Logging
         logger.info("Starting NJORO AI...")
 
+        # Deferred so that --profile-startup and config errors don't pay for them
+        from PyQt6.QtWidgets import QApplication
+        from src.ui.main_window import MainWindow
+        from src.ui.theme import apply_theme
+        from src.tools.builtin import register_builtin_tools
+
         # Initialize Tools
         register_builtin_tools()
         logger.info("Built-in tools registered.")
@@ -23,17 +75,17 @@ def main():
         app = QApplication(sys.argv)
         app.setApplicationName(Config.APP_NAME)
         app.setApplicationVersion(Config.APP_VERSION)
-        
+
         # Apply Theme
         apply_theme(app)
-        
+
         # Show Main Window
         window = MainWindow()
         window.show()
-        
+
         # Start Event Loop
         sys.exit(app.exec())
-        
+
     except Exception as e:
         logger.critical(f"Application crash: {e}", exc_info=True)
         sys.exit(1)
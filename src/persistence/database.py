@@ -2,12 +2,22 @@ import sqlite3
 import threading
 from pathlib import Path
 from contextlib import contextmanager
+from typing import Dict, Any
 from src.utils.config import Config
 from src.utils.logger import logger
+from src.utils.lazy import LazyProxy
 from src.persistence.models import SCHEMA_SQL
+from src.persistence.migrations import apply_migrations, get_schema_version, MIGRATIONS
 
 class DatabaseManager:
-    """Singleton database manager handling SQLite connections and schema initialization."""
+    """
+    Singleton database manager handling SQLite connections and schema initialization.
+
+    Connections are pooled per thread: each thread (agent loop, UI, background
+    workers) keeps one long-lived connection that is reused for every query.
+    Connections are opened in WAL mode so readers and the writer do not block
+    each other.
+    """
     
     _instance = None
     _lock = threading.Lock()
@@ -24,37 +34,120 @@ class DatabaseManager:
             return
             
         self.db_path = Config.DB_PATH
+        self._local = threading.local()
+        self._pool_lock = threading.Lock()
+        self._connections: Dict[int, sqlite3.Connection] = {} # Thread ident -> connection
+        self._stats = {"opened": 0, "reused": 0, "closed": 0}
         self.init_db()
         self._initialized = True
         logger.info(f"Database initialized at {self.db_path}")
 
     def init_db(self):
-        """Initialize the database schema."""
+        """Initialize the database schema and apply pending migrations."""
         try:
             with self.get_connection() as conn:
+                # Fully migrated databases already have every table; skip the DDL on startup
+                latest = max(m.version for m in MIGRATIONS)
+                if get_schema_version(conn) >= latest:
+                    self.schema_version = latest
+                    return
+
                 cursor = conn.cursor()
                 # Split schema by semicolon to execute multiple statements
                 statements = [s.strip() for s in SCHEMA_SQL.split(';') if s.strip()]
                 for statement in statements:
                     cursor.execute(statement)
                 conn.commit()
+                self.schema_version = apply_migrations(conn)
         except sqlite3.Error as e:
             logger.error(f"Failed to initialize database: {e}")
             raise
 
+    def _open_connection(self) -> sqlite3.Connection:
+        """Open a new connection and apply the tuning pragmas."""
+        conn = sqlite3.connect(self.db_path, timeout=Config.DB_BUSY_TIMEOUT, check_same_thread=False)
+        conn.row_factory = sqlite3.Row # Enable accessing columns by name
+        # Only takes effect on a brand-new database (before the WAL switch writes the header);
+        # lets the retention job return free pages with PRAGMA incremental_vacuum
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute(f"PRAGMA journal_mode = {Config.DB_JOURNAL_MODE}")
+        conn.execute(f"PRAGMA synchronous = {Config.DB_SYNCHRONOUS}")
+        # Negative cache_size is interpreted by SQLite as KiB rather than pages
+        conn.execute(f"PRAGMA cache_size = -{int(Config.DB_CACHE_SIZE_KB)}")
+        conn.execute(f"PRAGMA mmap_size = {int(Config.DB_MMAP_SIZE)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        """Return the calling thread's pooled connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            with self._pool_lock:
+                self._stats["reused"] += 1
+            return conn
+
+        conn = self._open_connection()
+        self._local.conn = conn
+        with self._pool_lock:
+            self._prune_dead_threads()
+            self._connections[threading.get_ident()] = conn
+            self._stats["opened"] += 1
+        return conn
+
+    def _prune_dead_threads(self):
+        """Close connections owned by threads that have exited. Caller holds _pool_lock."""
+        alive = {t.ident for t in threading.enumerate()}
+        for ident in [i for i in self._connections if i not in alive]:
+            try:
+                self._connections.pop(ident).close()
+                self._stats["closed"] += 1
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to close stale connection: {e}")
+
     @contextmanager
     def get_connection(self):
-        """Context manager for database connections."""
-        conn = sqlite3.connect(self.db_path, check_same_thread=False)
-        conn.row_factory = sqlite3.Row # Enable accessing columns by name
+        """Context manager yielding the calling thread's pooled connection."""
+        conn = self._acquire()
         try:
             yield conn
         except sqlite3.Error as e:
             conn.rollback()
             logger.error(f"Database error: {e}")
             raise
-        finally:
-            conn.close()
+
+    def close_connection(self):
+        """Close the calling thread's pooled connection (e.g. when a worker thread exits)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        self._local.conn = None
+        with self._pool_lock:
+            self._connections.pop(threading.get_ident(), None)
+            self._stats["closed"] += 1
+        conn.close()
+
+    def close_all(self):
+        """Close every pooled connection. Used on application shutdown."""
+        with self._pool_lock:
+            for conn in self._connections.values():
+                try:
+                    conn.close()
+                    self._stats["closed"] += 1
+                except sqlite3.Error as e:
+                    logger.warning(f"Failed to close connection: {e}")
+            self._connections.clear()
+        self._local = threading.local()
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Return connection pool statistics."""
+        with self._pool_lock:
+            return {
+                "connections": len(self._connections),
+                "opened": self._stats["opened"],
+                "reused": self._stats["reused"],
+                "closed": self._stats["closed"],
+                "journal_mode": Config.DB_JOURNAL_MODE,
+            }
 
     def execute_query(self, query: str, params: tuple = ()):
         """Execute a write query safely."""
@@ -64,6 +157,14 @@ class DatabaseManager:
             conn.commit()
             return cursor.lastrowid
 
+    def execute_many(self, query: str, seq_of_params):
+        """Execute a write query for every parameter tuple in a single transaction."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(query, seq_of_params)
+            conn.commit()
+            return cursor.rowcount
+
     def fetch_all(self, query: str, params: tuple = ()):
         """Fetch all results from a query."""
         with self.get_connection() as conn:
@@ -78,5 +179,5 @@ class DatabaseManager:
             cursor.execute(query, params)
             return cursor.fetchone()
 
-# Global database instance
-db = DatabaseManager()
+# Global database instance, created (and the schema initialized) on first use
+db = LazyProxy(DatabaseManager)
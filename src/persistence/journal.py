@@ -0,0 +1,121 @@
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional
+from src.utils.config import Config
+from src.utils.logger import logger
+from src.persistence.database import db
+
+class JournalWriter:
+    """
+    Write-behind sink for journal entries.
+
+    Entries are queued in memory and written by a background thread in batched
+    executemany transactions, either when the batch size is reached or when the
+    flush interval elapses. Callers that need to read the journal back call
+    flush() first; close() performs the final durable flush on shutdown.
+
+    Every entry gets a sequence number from write(). Entries are inserted in
+    sequence order, and `persisted_seq` is the highest one committed so far,
+    which lets the journal view match entries it was shown live against the
+    rows it reads back.
+    """
+
+    INSERT_SQL = (
+        "INSERT INTO journal (timestamp, goal_id, action, tool_used, result, status) "
+        "VALUES (?, ?, ?, ?, ?, ?)"
+    )
+
+    def __init__(self, batch_size: int = Config.JOURNAL_BATCH_SIZE,
+                 flush_interval: float = Config.JOURNAL_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: List[tuple] = [] # (sequence number, row)
+        self._seq = 0
+        self.persisted_seq = 0
+        self._lock = threading.Lock() # Guards _pending
+        self._flush_lock = threading.Lock() # Serializes writers so batches stay ordered
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._stats = {"queued": 0, "written": 0, "batches": 0}
+
+    def write(self, goal_id, action, tool_used, result, status) -> int:
+        """Queue a journal entry. Returns immediately, with the entry's sequence number."""
+        # Stamp at enqueue time (UTC, same format as CURRENT_TIMESTAMP) so batching does not skew ordering
+        timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+            self._pending.append((seq, (timestamp, goal_id, action, tool_used, str(result), status)))
+            self._stats["queued"] += 1
+            pending = len(self._pending)
+
+        self._ensure_started()
+        if pending >= self.batch_size:
+            self._wakeup.set()
+        return seq
+
+    def flush(self) -> int:
+        """Write all queued entries in a single transaction. Returns the number written."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            try:
+                db.execute_many(self.INSERT_SQL, [row for _, row in batch])
+            except Exception as e:
+                logger.error(f"Failed to flush {len(batch)} journal entries: {e}")
+                # Put the batch back in front so nothing is lost; the next flush retries it
+                with self._lock:
+                    self._pending = batch + self._pending
+                return 0
+            self.persisted_seq = batch[-1][0]
+            self._stats["written"] += len(batch)
+            self._stats["batches"] += 1
+            return len(batch)
+
+    @contextmanager
+    def snapshot(self):
+        """
+        Hold off flushes while the caller reads the journal. Yields `persisted_seq`,
+        which stays accurate for what the reads see until the block exits.
+        """
+        with self._flush_lock:
+            yield self.persisted_seq
+
+    def close(self):
+        """Stop the background thread and durably flush everything still queued."""
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join()
+        self._thread = None
+        self.flush()
+        self._stopping = False
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return writer statistics."""
+        return {**self._stats, "pending": self.pending_count()}
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="JournalWriter", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+        db.close_connection()
+
+# Global journal writer
+journal_writer = JournalWriter()
@@ -0,0 +1,196 @@
+import sqlite3
+from dataclasses import dataclass
+from typing import Callable, List, Sequence, Union
+from src.utils.logger import logger
+
+@dataclass
+class Migration:
+    """A single schema migration. `upgrade` is either SQL statements or a callable taking the connection."""
+    version: int
+    description: str
+    upgrade: Union[Sequence[str], Callable[[sqlite3.Connection], None]]
+
+def fts5_available(conn: sqlite3.Connection) -> bool:
+    """True if this SQLite build has the FTS5 extension."""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp.fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE temp.fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+def _create_journal_fts(conn: sqlite3.Connection):
+    """Full-text index over journal entries, kept in sync by triggers (see src/persistence/search.py)."""
+    if not fts5_available(conn):
+        # Searching falls back to LIKE scans; nothing else depends on the index
+        logger.warning("SQLite was built without FTS5; journal search will not be indexed.")
+        return
+    # External content table: the text lives only in `journal`, the index stores tokens
+    conn.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS journal_fts USING fts5("
+        "action, tool_used, result, content='journal', content_rowid='id', tokenize='porter unicode61')"
+    )
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS journal_fts_insert AFTER INSERT ON journal BEGIN
+        INSERT INTO journal_fts(rowid, action, tool_used, result) VALUES (new.id, new.action, new.tool_used, new.result);
+    END""")
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS journal_fts_delete AFTER DELETE ON journal BEGIN
+        INSERT INTO journal_fts(journal_fts, rowid, action, tool_used, result)
+        VALUES ('delete', old.id, old.action, old.tool_used, old.result);
+    END""")
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS journal_fts_update AFTER UPDATE OF action, tool_used, result ON journal BEGIN
+        INSERT INTO journal_fts(journal_fts, rowid, action, tool_used, result)
+        VALUES ('delete', old.id, old.action, old.tool_used, old.result);
+        INSERT INTO journal_fts(rowid, action, tool_used, result) VALUES (new.id, new.action, new.tool_used, new.result);
+    END""")
+    # Index the existing history
+    conn.execute("INSERT INTO journal_fts(journal_fts) VALUES ('rebuild')")
+
+# Ordered list of migrations. Never edit a released migration; append a new one instead.
+MIGRATIONS: List[Migration] = [
+    Migration(
+        version=1,
+        description="Indexes for active goal lookup, goal history and journal tail",
+        upgrade=(
+            # _get_active_goal: WHERE status = 'active' ORDER BY created_at
+            "CREATE INDEX IF NOT EXISTS idx_goals_status_created ON goals(status, created_at)",
+            # _get_recent_history: WHERE goal_id = ? ORDER BY timestamp DESC
+            "CREATE INDEX IF NOT EXISTS idx_journal_goal_timestamp ON journal(goal_id, timestamp)",
+            # refresh_journal: ORDER BY timestamp DESC LIMIT 50
+            "CREATE INDEX IF NOT EXISTS idx_journal_timestamp ON journal(timestamp)",
+        ),
+    ),
+    Migration(
+        version=2,
+        description="Goal priorities for the multi-goal scheduler",
+        upgrade=(
+            "ALTER TABLE goals ADD COLUMN priority INTEGER DEFAULT 0",
+            # _get_active_goals: WHERE status = 'active' ORDER BY priority DESC, created_at
+            "CREATE INDEX IF NOT EXISTS idx_goals_status_priority ON goals(status, priority, created_at)",
+        ),
+    ),
+    Migration(
+        version=3,
+        description="Plan cache for LLMClient.plan_action",
+        upgrade=(
+            """CREATE TABLE IF NOT EXISTS plan_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                plan TEXT,
+                created_at REAL,
+                last_used REAL,
+                hits INTEGER DEFAULT 0
+            )""",
+            "CREATE INDEX IF NOT EXISTS idx_plan_cache_last_used ON plan_cache(last_used)",
+        ),
+    ),
+    Migration(
+        version=4,
+        description="Rolling per-goal prompt context",
+        upgrade=(
+            """CREATE TABLE IF NOT EXISTS goal_context (
+                goal_id INTEGER PRIMARY KEY,
+                summary TEXT,
+                last_entry_id INTEGER DEFAULT 0,
+                omitted INTEGER DEFAULT 0,
+                updated_at DATETIME,
+                FOREIGN KEY(goal_id) REFERENCES goals(id)
+            )""",
+        ),
+    ),
+    Migration(
+        version=5,
+        description="Full-text search index over the journal",
+        upgrade=_create_journal_fts,
+    ),
+    Migration(
+        version=6,
+        description="Compressed journal results and goal archival",
+        upgrade=(
+            # Full result of compacted entries: zlib data inline, or the sha256 of a side file
+            "ALTER TABLE journal ADD COLUMN result_blob BLOB",
+            "ALTER TABLE journal ADD COLUMN result_ref TEXT",
+            "ALTER TABLE journal ADD COLUMN result_size INTEGER",
+            "ALTER TABLE goals ADD COLUMN archived_at DATETIME",
+        ),
+    ),
+    Migration(
+        version=7,
+        description="Rolling metrics history",
+        upgrade=(
+            """CREATE TABLE IF NOT EXISTS metrics (
+                ts REAL,
+                name TEXT,
+                labels TEXT,
+                kind TEXT,
+                count INTEGER,
+                value REAL,
+                p50 REAL,
+                p95 REAL,
+                p99 REAL
+            )""",
+            "CREATE INDEX IF NOT EXISTS idx_metrics_ts ON metrics(ts)",
+            "CREATE INDEX IF NOT EXISTS idx_metrics_name_ts ON metrics(name, ts)",
+        ),
+    ),
+    Migration(
+        version=8,
+        description="Persistent queue of actions waiting for approval",
+        upgrade=(
+            """CREATE TABLE IF NOT EXISTS pending_actions (
+                goal_id INTEGER PRIMARY KEY,
+                calls TEXT,
+                reasoning TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY(goal_id) REFERENCES goals(id)
+            )""",
+        ),
+    ),
+    Migration(
+        version=9,
+        description="Index for incremental per-goal prompt context",
+        upgrade=(
+            # PromptBuilder.context_for: WHERE goal_id = ? AND id > ? ORDER BY id
+            "CREATE INDEX IF NOT EXISTS idx_journal_goal_id ON journal(goal_id, id)",
+        ),
+    ),
+]
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Return the schema version recorded in the database header."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def apply_migrations(conn: sqlite3.Connection, migrations: List[Migration] = None) -> int:
+    """
+    Apply every migration newer than the recorded schema version, in order.
+
+    Each migration runs in its own transaction together with the version bump,
+    so a failure leaves the database at the last fully applied version.
+
+    Returns:
+        The schema version after migrating.
+    """
+    migrations = sorted(migrations if migrations is not None else MIGRATIONS, key=lambda m: m.version)
+    current = get_schema_version(conn)
+
+    for migration in migrations:
+        if migration.version <= current:
+            continue
+
+        logger.info(f"Applying schema migration {migration.version}: {migration.description}")
+        try:
+            conn.execute("BEGIN")
+            if callable(migration.upgrade):
+                migration.upgrade(conn)
+            else:
+                for statement in migration.upgrade:
+                    conn.execute(statement)
+            # PRAGMA does not accept bound parameters; version is always an int
+            conn.execute(f"PRAGMA user_version = {int(migration.version)}")
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.error(f"Schema migration {migration.version} failed: {e}")
+            raise
+        current = migration.version
+
+    return current
@@ -58,6 +58,7 @@ class Tool:
 class Goal:
     description: str
     status: str
+    priority: int = 0
     created_at: Optional[datetime] = None
     id: Optional[int] = None
 
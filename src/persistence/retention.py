@@ -0,0 +1,376 @@
+import hashlib
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from src.utils.config import Config
+from src.utils.logger import logger
+from src.persistence.database import db
+
+JOURNAL_COLUMNS = "id, timestamp, goal_id, action, tool_used, result, status, result_blob, result_ref, result_size"
+
+ARCHIVE_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS archive.journal (
+        id INTEGER PRIMARY KEY,
+        timestamp DATETIME,
+        goal_id INTEGER,
+        action TEXT,
+        tool_used TEXT,
+        result TEXT,
+        status TEXT,
+        result_blob BLOB,
+        result_ref TEXT,
+        result_size INTEGER
+    )""",
+    "CREATE INDEX IF NOT EXISTS archive.idx_journal_goal ON journal(goal_id, id)",
+    """CREATE TABLE IF NOT EXISTS archive.goals (
+        id INTEGER PRIMARY KEY,
+        description TEXT,
+        status TEXT,
+        created_at DATETIME,
+        archived_at DATETIME
+    )""",
+)
+
+def _blob_path(ref: str) -> Path:
+    return Config.RETENTION_BLOB_DIR / ref[:2] / f"{ref}.zlib"
+
+def load_entry(journal_id: int) -> Optional[Dict[str, Any]]:
+    """
+    A journal entry with its full result text, decompressed if the retention job compacted it.
+
+    Entries moved to the archive database are looked up there. The dict has
+    the journal columns (without the blob columns), "result" replaced by the
+    full text, and "archived".
+    """
+    columns = "id, timestamp, goal_id, action, tool_used, result, status, result_blob, result_ref"
+    row = db.fetch_one(f"SELECT {columns} FROM journal WHERE id = ?", (journal_id,))
+    archived = False
+    if row is None and Config.RETENTION_ARCHIVE_PATH and Path(Config.RETENTION_ARCHIVE_PATH).exists():
+        # Read-only and short-lived: the retention job attaches the archive for writing
+        uri = f"{Path(Config.RETENTION_ARCHIVE_PATH).resolve().as_uri()}?mode=ro"
+        try:
+            conn = sqlite3.connect(uri, uri=True, timeout=Config.DB_BUSY_TIMEOUT)
+            try:
+                conn.row_factory = sqlite3.Row
+                row = conn.execute(f"SELECT {columns} FROM journal WHERE id = ?", (journal_id,)).fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to read journal archive: {e}")
+        archived = row is not None
+    if row is None:
+        return None
+
+    entry = {key: row[key] for key in row.keys() if key not in ("result_blob", "result_ref")}
+    entry["archived"] = archived
+    if row['result_blob'] is not None:
+        entry["result"] = zlib.decompress(row['result_blob']).decode("utf-8")
+    elif row['result_ref']:
+        try:
+            entry["result"] = zlib.decompress(_blob_path(row['result_ref']).read_bytes()).decode("utf-8")
+        except OSError as e:
+            logger.warning(f"Side file for journal entry {journal_id} is missing: {e}")
+    return entry
+
+def load_result(journal_id: int) -> Optional[str]:
+    """Full result text of a journal entry (see load_entry)."""
+    entry = load_entry(journal_id)
+    return entry["result"] if entry else None
+
+class RetentionJob:
+    """
+    Background compaction of the journal, so the database stops growing without bound.
+
+    Each run:
+      1. compresses results over RETENTION_COMPRESS_MIN_BYTES into zlib blobs
+         (or content-addressed side files under RETENTION_BLOB_DIR when the
+         compressed data exceeds RETENTION_SIDE_FILE_BYTES). `result` keeps a
+         RETENTION_PREVIEW_CHARS preview, which prompts and the FTS index use;
+         load_result() returns the full text (the read_journal_entry tool and
+         the search hit view use it).
+      2. archives the journal of goals finished more than
+         RETENTION_ARCHIVE_AFTER_DAYS ago into RETENTION_ARCHIVE_PATH.
+      3. enforces the age, rows-per-goal and total-size limits, oldest entries
+         first (never rows of active goals for the age and size limits).
+         Removed rows go to the archive, or are deleted if it is disabled.
+      4. returns free pages with PRAGMA incremental_vacuum and drops side
+         files nothing references any more.
+
+    Work runs on the job's own thread and connection, in RETENTION_BATCH_ROWS
+    row transactions, so the agent's writes interleave with it.
+    """
+
+    WATERMARK_KEY = "retention_compress_watermark"
+
+    def __init__(self):
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._run_lock = threading.Lock()
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._warned_vacuum = False
+        self.last_report: Dict[str, Any] = {}
+
+    def add_listener(self, callback: Callable[[Dict[str, Any]], None]):
+        """Call `callback(report)` (from the job thread) after every run that removed rows."""
+        self._listeners.append(callback)
+
+    def start(self):
+        if not Config.RETENTION_ENABLED or (self._thread and self._thread.is_alive()):
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="RetentionJob", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Ask the job to stop; a run in progress stops after its current batch."""
+        self._stop_event.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        try:
+            if self._stop_event.wait(Config.RETENTION_INITIAL_DELAY):
+                return
+            while not self._stop_event.is_set():
+                try:
+                    self.run_once()
+                except Exception as e:
+                    logger.error(f"Retention run failed: {e}")
+                if self._stop_event.wait(Config.RETENTION_INTERVAL):
+                    return
+        finally:
+            db.close_connection()
+
+    def run_once(self) -> Dict[str, Any]:
+        """Run every retention step once, on the calling thread. Returns a report."""
+        with self._run_lock:
+            start = time.perf_counter()
+            report = {"compressed": 0, "bytes_saved": 0, "archived_goals": 0, "archived": 0, "deleted": 0,
+                      "vacuumed_pages": 0, "removed_files": 0}
+            with db.get_connection() as conn:
+                archive = self._attach_archive(conn)
+                try:
+                    self._compress(conn, report)
+                    self._archive_finished_goals(conn, archive, report)
+                    self._enforce_limits(conn, archive, report)
+                finally:
+                    if archive:
+                        conn.execute("DETACH DATABASE archive")
+                self._incremental_vacuum(conn, report)
+                self._collect_side_files(conn, report)
+
+            report["duration"] = round(time.perf_counter() - start, 3)
+            self.last_report = report
+            logger.info(f"Retention run finished: {report}")
+            if report["archived"] or report["deleted"]:
+                for callback in self._listeners:
+                    callback(report)
+            return report
+
+    # --- Steps ---
+
+    def _compress(self, conn: sqlite3.Connection, report: Dict[str, Any]):
+        row = conn.execute("SELECT value FROM state WHERE key = ?", (self.WATERMARK_KEY,)).fetchone()
+        watermark = int(row['value']) if row else 0
+        # Entries are appended in time order, so everything up to this id is old enough
+        cutoff = conn.execute(
+            "SELECT MAX(id) FROM journal WHERE timestamp < datetime('now', ?)",
+            (f"-{int(Config.RETENTION_COMPRESS_AFTER)} seconds",)
+        ).fetchone()[0]
+        if not cutoff or cutoff <= watermark:
+            return
+
+        while not self._stop_event.is_set():
+            rows = conn.execute(
+                "SELECT id, result FROM journal WHERE id > ? AND id <= ? AND result_blob IS NULL "
+                "AND result_ref IS NULL AND length(result) > ? ORDER BY id LIMIT ?",
+                (watermark, cutoff, Config.RETENTION_COMPRESS_MIN_BYTES, Config.RETENTION_BATCH_ROWS)
+            ).fetchall()
+            if not rows:
+                watermark = cutoff
+                break
+            updates = [self._compact_result(entry['id'], entry['result'], report) for entry in rows]
+            conn.executemany(
+                "UPDATE journal SET result = ?, result_blob = ?, result_ref = ?, result_size = ? WHERE id = ?",
+                updates
+            )
+            conn.commit()
+            watermark = rows[-1]['id']
+
+        conn.execute("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", (self.WATERMARK_KEY, str(watermark)))
+        conn.commit()
+
+    def _compact_result(self, journal_id: int, result: str, report: Dict[str, Any]) -> tuple:
+        raw = result.encode("utf-8")
+        packed = zlib.compress(raw, 6)
+        preview = result[:Config.RETENTION_PREVIEW_CHARS]
+        preview += f"\n[... {len(result) - len(preview)} more chars compressed; read_journal_entry({journal_id}) has the full result]"
+
+        blob, ref = packed, None
+        if len(packed) > Config.RETENTION_SIDE_FILE_BYTES:
+            # Content-addressed: identical outputs share one file
+            ref = hashlib.sha256(raw).hexdigest()
+            path = _blob_path(ref)
+            if not path.exists():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_suffix(".tmp")
+                tmp.write_bytes(packed)
+                tmp.replace(path)
+            blob = None
+
+        report["compressed"] += 1
+        report["bytes_saved"] += len(raw) - len(preview.encode("utf-8")) - (len(packed) if blob else 0)
+        return (preview, blob, ref, len(result), journal_id)
+
+    def _archive_finished_goals(self, conn: sqlite3.Connection, archive: bool, report: Dict[str, Any]):
+        if Config.RETENTION_ARCHIVE_AFTER_DAYS <= 0:
+            return
+        goals = conn.execute(
+            """SELECT g.id FROM goals g
+               WHERE g.status IN ('completed', 'failed') AND g.archived_at IS NULL
+               AND COALESCE((SELECT MAX(timestamp) FROM journal WHERE goal_id = g.id), g.created_at)
+                   < datetime('now', ?)""",
+            (f"-{Config.RETENTION_ARCHIVE_AFTER_DAYS} days",)
+        ).fetchall()
+        for goal in goals:
+            if self._stop_event.is_set():
+                return
+            self._remove_rows(conn, archive, "goal_id = ?", (goal['id'],), report)
+            conn.execute("UPDATE goals SET archived_at = CURRENT_TIMESTAMP WHERE id = ?", (goal['id'],))
+            if archive:
+                conn.execute(
+                    "INSERT OR REPLACE INTO archive.goals (id, description, status, created_at, archived_at) "
+                    "SELECT id, description, status, created_at, archived_at FROM main.goals WHERE id = ?",
+                    (goal['id'],)
+                )
+            conn.commit()
+            report["archived_goals"] += 1
+
+    def _enforce_limits(self, conn: sqlite3.Connection, archive: bool, report: Dict[str, Any]):
+        inactive = "(goal_id IS NULL OR goal_id NOT IN (SELECT id FROM goals WHERE status = 'active'))"
+
+        if Config.RETENTION_MAX_AGE_DAYS > 0:
+            self._remove_rows(
+                conn, archive, f"timestamp < datetime('now', ?) AND {inactive}",
+                (f"-{Config.RETENTION_MAX_AGE_DAYS} days",), report
+            )
+
+        if Config.RETENTION_MAX_ROWS_PER_GOAL > 0:
+            limit = Config.RETENTION_MAX_ROWS_PER_GOAL
+            over = conn.execute(
+                "SELECT goal_id FROM journal GROUP BY goal_id HAVING COUNT(*) > ?", (limit,)
+            ).fetchall()
+            for goal in over:
+                # Id of the oldest entry to keep
+                keep_from = conn.execute(
+                    "SELECT id FROM journal WHERE goal_id IS ? ORDER BY id DESC LIMIT 1 OFFSET ?",
+                    (goal['goal_id'], limit - 1)
+                ).fetchone()[0]
+                self._remove_rows(conn, archive, "goal_id IS ? AND id < ?", (goal['goal_id'], keep_from), report)
+
+        if Config.RETENTION_MAX_DB_BYTES > 0:
+            while self._used_bytes(conn) > Config.RETENTION_MAX_DB_BYTES and not self._stop_event.is_set():
+                # Freed pages only count once the batch is gone, so go one batch at a time
+                if not self._remove_rows(conn, archive, inactive, (), report, max_batches=1):
+                    logger.warning("Journal exceeds RETENTION_MAX_DB_BYTES but only active goals remain.")
+                    break
+
+    def _remove_rows(self, conn: sqlite3.Connection, archive: bool, where: str, params: tuple,
+                     report: Dict[str, Any], max_batches: Optional[int] = None) -> int:
+        """Move (or delete) journal rows matching `where`, oldest first, in short transactions."""
+        removed, batches = 0, 0
+        while not self._stop_event.is_set() and (max_batches is None or batches < max_batches):
+            ids = [row[0] for row in conn.execute(
+                f"SELECT id FROM journal WHERE {where} ORDER BY id LIMIT ?", (*params, Config.RETENTION_BATCH_ROWS)
+            ).fetchall()]
+            if not ids:
+                break
+            placeholders = ",".join("?" * len(ids))
+            if archive:
+                conn.execute(
+                    f"INSERT OR IGNORE INTO archive.journal ({JOURNAL_COLUMNS}) "
+                    f"SELECT {JOURNAL_COLUMNS} FROM main.journal WHERE id IN ({placeholders})", ids
+                )
+            conn.execute(f"DELETE FROM main.journal WHERE id IN ({placeholders})", ids)
+            conn.commit()
+            removed += len(ids)
+            batches += 1
+        report["archived" if archive else "deleted"] += removed
+        return removed
+
+    def _incremental_vacuum(self, conn: sqlite3.Connection, report: Dict[str, Any]):
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            if not self._warned_vacuum:
+                self._warned_vacuum = True
+                logger.info("Database was created without incremental auto_vacuum; "
+                            "run `python -m src.persistence.retention --full-vacuum` once to enable it.")
+            return
+        while not self._stop_event.is_set():
+            free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if not free:
+                break
+            # execute() only steps this pragma once (one page); executescript runs it to completion
+            conn.executescript(f"PRAGMA incremental_vacuum({int(min(free, Config.RETENTION_VACUUM_PAGES))})")
+            freed = free - conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if freed <= 0:
+                break
+            report["vacuumed_pages"] += freed
+
+    def _collect_side_files(self, conn: sqlite3.Connection, report: Dict[str, Any]):
+        blob_dir = Config.RETENTION_BLOB_DIR
+        if not blob_dir.exists():
+            return
+        referenced = {row[0] for row in conn.execute("SELECT DISTINCT result_ref FROM journal WHERE result_ref IS NOT NULL")}
+        archive = self._attach_archive(conn)
+        if archive:
+            referenced |= {row[0] for row in conn.execute(
+                "SELECT DISTINCT result_ref FROM archive.journal WHERE result_ref IS NOT NULL"
+            )}
+            conn.execute("DETACH DATABASE archive")
+        for path in blob_dir.glob("*/*.zlib"):
+            if path.stem not in referenced:
+                path.unlink(missing_ok=True)
+                report["removed_files"] += 1
+
+    # --- Helpers ---
+
+    @staticmethod
+    def _attach_archive(conn: sqlite3.Connection) -> bool:
+        if not Config.RETENTION_ARCHIVE_PATH:
+            return False
+        conn.execute("ATTACH DATABASE ? AS archive", (str(Config.RETENTION_ARCHIVE_PATH),))
+        for statement in ARCHIVE_SCHEMA:
+            conn.execute(statement)
+        conn.commit()
+        return True
+
+    @staticmethod
+    def _used_bytes(conn: sqlite3.Connection) -> int:
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        pages = conn.execute("PRAGMA page_count").fetchone()[0]
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return (pages - free) * page_size
+
+    def full_vacuum(self):
+        """Rebuild the database with incremental auto_vacuum enabled. Blocks writers; run while the app is closed."""
+        with self._run_lock, db.get_connection() as conn:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        logger.info("Database vacuumed; incremental auto_vacuum enabled.")
+
+# Global retention job; started by the main window
+retention_job = RetentionJob()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run journal retention once.")
+    parser.add_argument("--full-vacuum", action="store_true", help="rebuild the database (app must be closed)")
+    args = parser.parse_args()
+    if args.full_vacuum:
+        retention_job.full_vacuum()
+    print(retention_job.run_once())
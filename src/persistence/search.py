@@ -0,0 +1,86 @@
+import re
+from typing import Dict, List, Optional
+from src.persistence.database import db
+
+# Column weights for bm25(): action, tool_used, result
+BM25_WEIGHTS = (2.0, 1.0, 1.0)
+SNIPPET_TOKENS = 12
+
+_TERM_RE = re.compile(r'"[^"]*"|\S+')
+
+def fts_enabled() -> bool:
+    """True if the journal_fts index exists (migration 5 on an FTS5-capable SQLite)."""
+    return db.fetch_one("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'journal_fts'") is not None
+
+def build_match_query(text: str) -> str:
+    """
+    Turn free text into a safe FTS5 MATCH expression.
+
+    Every word (or "quoted phrase") becomes a quoted term, so punctuation in
+    paths, URLs or error messages is never parsed as FTS syntax. Terms are
+    ANDed; a trailing * on a word makes it a prefix search.
+    """
+    terms = []
+    for term in _TERM_RE.findall(text):
+        prefix = term.endswith("*") and not term.startswith('"')
+        term = term.strip('"').rstrip("*")
+        if not term:
+            continue
+        quoted = '"' + term.replace('"', '""') + '"'
+        terms.append(quoted + ("*" if prefix else ""))
+    return " ".join(terms)
+
+def search_journal(query: str, limit: int = 20, offset: int = 0, goal_id: Optional[int] = None) -> List[Dict]:
+    """
+    Search journal entries, best matches first.
+
+    Returns dicts with id, timestamp, goal_id, action, tool_used, status,
+    snippet (result text around the match, hits in [brackets]) and rank
+    (lower is better). Without FTS5 this falls back to a substring scan
+    ordered newest first.
+    """
+    match = build_match_query(query)
+    if not match:
+        return []
+    goal_filter, goal_params = ("AND j.goal_id = ?", (goal_id,)) if goal_id is not None else ("", ())
+
+    if fts_enabled():
+        rows = db.fetch_all(
+            f"""SELECT j.id, j.timestamp, j.goal_id, j.action, j.tool_used, j.status,
+                       snippet(journal_fts, 2, '[', ']', '...', {SNIPPET_TOKENS}) AS snippet,
+                       bm25(journal_fts, {', '.join(map(str, BM25_WEIGHTS))}) AS rank
+                FROM journal_fts JOIN journal j ON j.id = journal_fts.rowid
+                WHERE journal_fts MATCH ? {goal_filter}
+                ORDER BY rank LIMIT ? OFFSET ?""",
+            (match, *goal_params, limit, offset)
+        )
+    else:
+        rows = db.fetch_all(
+            f"""SELECT j.id, j.timestamp, j.goal_id, j.action, j.tool_used, j.status,
+                       substr(j.result, 1, 200) AS snippet, 0 AS rank
+                FROM journal j
+                WHERE (j.result LIKE ? OR j.action LIKE ?) {goal_filter}
+                ORDER BY j.id DESC LIMIT ? OFFSET ?""",
+            (f"%{query}%", f"%{query}%", *goal_params, limit, offset)
+        )
+    return [dict(row) for row in rows]
+
+def count_matches(query: str, goal_id: Optional[int] = None) -> int:
+    """Total number of journal entries matching `query`, for paging."""
+    match = build_match_query(query)
+    if not match:
+        return 0
+    goal_filter, goal_params = ("AND j.goal_id = ?", (goal_id,)) if goal_id is not None else ("", ())
+
+    if fts_enabled():
+        row = db.fetch_one(
+            f"""SELECT COUNT(*) FROM journal_fts JOIN journal j ON j.id = journal_fts.rowid
+                WHERE journal_fts MATCH ? {goal_filter}""",
+            (match, *goal_params)
+        )
+    else:
+        row = db.fetch_one(
+            f"SELECT COUNT(*) FROM journal j WHERE (j.result LIKE ? OR j.action LIKE ?) {goal_filter}",
+            (f"%{query}%", f"%{query}%", *goal_params)
+        )
+    return row[0]
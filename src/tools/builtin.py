@@ -1,14 +1,128 @@
 import asyncio
+import mmap
 import os
-import aiohttp
+import signal
+import subprocess
 from pathlib import Path
+from typing import Optional
 from src.tools.registry import registry
+from src.tools.context import report_progress
+from src.tools.web import http_client
+from src.persistence import search as journal_search
+from src.persistence.retention import load_entry
+from src.persistence.database import db
+from src.utils.config import Config
 from src.utils.logger import logger
 
 # --- File Operations ---
 
-async def read_file(path: str) -> str:
-    """Reads the content of a file."""
+def _find_line_offset(data, line: int) -> int:
+    """Byte offset where 1-based `line` starts in `data` (bytes or mmap); len(data) if past the end."""
+    pos = 0
+    for _ in range(line - 1):
+        pos = data.find(b"\n", pos)
+        if pos == -1:
+            return len(data)
+        pos += 1
+    return pos
+
+def _tail_offset(data, lines: int) -> int:
+    """Byte offset where the last `lines` lines of `data` start."""
+    end = len(data)
+    if end and data[end - 1:end] == b"\n":
+        end -= 1 # Ignore the trailing newline
+    for _ in range(lines):
+        end = data.rfind(b"\n", 0, end)
+        if end == -1:
+            return 0
+    return end + 1
+
+def _read_chunk(file_path: Path, offset: int, length: Optional[int], start_line: Optional[int],
+                end_line: Optional[int], tail: Optional[int]) -> str:
+    """Blocking part of read_file; runs in an executor."""
+    size = file_path.stat().st_size
+    max_bytes = Config.READ_FILE_MAX_BYTES
+    ranged = any(v is not None for v in (length, start_line, end_line, tail)) or offset > 0
+
+    with open(file_path, "rb") as f:
+        sample = f.read(8192)
+        if b"\0" in sample:
+            return f"Error: {file_path} appears to be a binary file ({size} bytes)."
+        if size == 0:
+            return ""
+
+        # Large files are mapped instead of read, so only the pages we touch are loaded
+        if size >= Config.READ_FILE_MMAP_THRESHOLD:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            f.seek(0)
+            data = f.read()
+
+        try:
+            if tail is not None:
+                start = _tail_offset(data, max(0, tail))
+                end = size
+                start = max(start, end - max_bytes) # Keep the newest bytes if the tail is too long
+            elif start_line is not None or end_line is not None:
+                start = _find_line_offset(data, max(1, start_line or 1))
+                end = _find_line_offset(data, end_line + 1) if end_line is not None else size
+            else:
+                start = min(max(0, offset), size)
+                end = size if length is None else min(size, start + max(0, length))
+            end = min(end, start + max_bytes)
+            chunk = data[start:end]
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+    text = chunk.decode("utf-8", errors="replace")
+    if not ranged and end == size:
+        return text # Whole file fits: plain content, as before
+
+    header = f"[{file_path}: bytes {start}-{end} of {size}"
+    if end < size:
+        header += f"; more available, continue with offset={end}"
+    return f"{header}]\n{text}"
+
+def _range_args(offset, length, start_line, end_line, tail):
+    """Coerce read_file's range arguments to ints (LLM JSON often sends "10"); ValueError if unusable."""
+    names = ("offset", "length", "start_line", "end_line", "tail")
+    values = {}
+    for name, value in zip(names, (offset or 0, length, start_line, end_line, tail)):
+        try:
+            values[name] = None if value is None else int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{name} must be a whole number, got {value!r}.")
+
+    for name in ("offset", "length", "tail"):
+        if values[name] is not None and values[name] < 0:
+            raise ValueError(f"{name} must not be negative, got {values[name]}.")
+    for name in ("start_line", "end_line"):
+        if values[name] is not None and values[name] < 1:
+            raise ValueError(f"{name} is 1-based, got {values[name]}.")
+    if values["start_line"] is not None and values["end_line"] is not None and values["end_line"] < values["start_line"]:
+        raise ValueError(f"end_line ({values['end_line']}) is before start_line ({values['start_line']}).")
+    return tuple(values[name] for name in names)
+
+async def read_file(path: str, offset: int = 0, length: Optional[int] = None,
+                    start_line: Optional[int] = None, end_line: Optional[int] = None,
+                    tail: Optional[int] = None) -> str:
+    """
+    Reads the content of a file, or a bounded chunk of it.
+
+    Args:
+        path: File to read.
+        offset, length: Byte range to read.
+        start_line, end_line: 1-based inclusive line range (takes precedence over offset).
+        tail: Read the last N lines (takes precedence over everything else).
+
+    At most READ_FILE_MAX_BYTES are returned. Partial reads are prefixed with a
+    header giving the byte range, the total size and the offset to continue from.
+    """
+    try:
+        offset, length, start_line, end_line, tail = _range_args(offset, length, start_line, end_line, tail)
+    except ValueError as e:
+        return f"Error: {e}"
     try:
         file_path = Path(path)
         if not file_path.exists():
@@ -18,13 +132,13 @@ async def read_file(path: str) -> str:
         if ".." in str(file_path):
              return "Error: Path traversal not allowed."
 
-        async with aiohttp.ClientSession() as session:
-            # Using aiofiles would be better but keeping deps minimal for now, 
-            # standard open is blocking but fast for small text files.
-            # For larger files or strict async, run in executor.
-            loop = asyncio.get_event_loop()
-            content = await loop.run_in_executor(None, file_path.read_text, "utf-8")
-            return content
+        if not file_path.is_file():
+            return f"Error: {path} is not a file."
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, _read_chunk, file_path, offset, length, start_line, end_line, tail
+        )
     except Exception as e:
         logger.error(f"read_file failed: {e}")
         return f"Error reading file: {e}"
@@ -58,41 +172,224 @@ async def list_files(path: str = ".") -> str:
         logger.error(f"list_files failed: {e}")
         return f"Error listing files: {e}"
 
+def _file_validity(path: str, **_) -> Optional[tuple]:
+    """read_file memo token: the file's mtime and size."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+def _dir_validity(path: str = ".") -> Optional[int]:
+    """list_files memo token: the directory's mtime (changes when entries are added or removed)."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
 # --- Web Operations ---
 
 async def web_get(url: str) -> str:
-    """Performs a GET request to a URL."""
+    """Performs a GET request to a URL using the shared, cached HTTP client."""
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    return await response.text()
-                else:
-                    return f"Error: Status code {response.status}"
+        response = await http_client.get(url)
+        if response.status != 200:
+            return f"Error: Status code {response.status}"
+        if response.truncated:
+            return f"{response.text}\n[Truncated at {Config.HTTP_MAX_BODY_BYTES} bytes]"
+        return response.text
+    except asyncio.TimeoutError:
+        logger.error(f"web_get timed out: {url}")
+        return f"Error fetching URL: timed out after {Config.HTTP_TOTAL_TIMEOUT}s"
     except Exception as e:
         logger.error(f"web_get failed: {e}")
         return f"Error fetching URL: {e}"
 
+# --- Journal ---
+
+async def search_journal(query: str, goal_id: Optional[int] = None, limit: int = 10, offset: int = 0) -> str:
+    """Full-text search over past journal entries, so earlier tool results can be reused instead of re-run."""
+    try:
+        limit, offset = max(1, min(int(limit), 50)), max(0, int(offset))
+        hits = journal_search.search_journal(query, limit=limit, offset=offset, goal_id=goal_id)
+        if not hits:
+            return f"No journal entries match '{query}'."
+        total = journal_search.count_matches(query, goal_id=goal_id)
+        lines = [f"{total} matching entries (showing {offset + 1}-{offset + len(hits)}):"]
+        for hit in hits:
+            lines.append(
+                f"#{hit['id']} [{hit['timestamp']}] goal {hit['goal_id']} {hit['action']} "
+                f"({hit['tool_used']}, {hit['status']}): {hit['snippet']}"
+            )
+        return "\n".join(lines)
+    except Exception as e:
+        logger.error(f"search_journal failed: {e}")
+        return f"Error searching journal: {e}"
+
+async def read_journal_entry(entry_id: int, offset: int = 0, length: Optional[int] = None) -> str:
+    """
+    Full result of a journal entry, including entries whose stored result was
+    compacted to a preview or moved to the archive. At most READ_FILE_MAX_BYTES
+    characters are returned per call, with a header giving the range and the
+    offset to continue from.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+        entry = await loop.run_in_executor(None, load_entry, int(entry_id))
+        if entry is None:
+            return f"Error: Journal entry {entry_id} does not exist."
+        result = str(entry['result'] or "")
+        start = min(max(0, int(offset)), len(result))
+        end = len(result) if length is None else min(len(result), start + max(0, int(length)))
+        end = min(end, start + Config.READ_FILE_MAX_BYTES)
+
+        header = (
+            f"[journal #{entry['id']} {entry['timestamp']} goal {entry['goal_id']} {entry['action']} "
+            f"({entry['tool_used']}, {entry['status']}{', archived' if entry['archived'] else ''}): "
+            f"chars {start}-{end} of {len(result)}"
+        )
+        if end < len(result):
+            header += f"; more available, continue with offset={end}"
+        return f"{header}]\n{result[start:end]}"
+    except (TypeError, ValueError) as e:
+        return f"Error: invalid argument: {e}"
+    except Exception as e:
+        logger.error(f"read_journal_entry failed: {e}")
+        return f"Error reading journal entry: {e}"
+
+def _journal_validity(query: str, **_) -> Optional[int]:
+    """search_journal memo token: the newest journal id (new entries can match)."""
+    row = db.fetch_one("SELECT COALESCE(MAX(id), 0) FROM journal")
+    return row[0] if row else None
+
 # --- System Operations ---
 
-async def run_command(command: str) -> str:
-    """Runs a shell command (sandboxed - no interactive commands)."""
+class _OutputBuffer:
+    """Keeps the first `head` and the last `tail` bytes of a stream, dropping the middle."""
+
+    def __init__(self, head: int, tail: int):
+        self.head_limit = head
+        self.tail_limit = tail
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+
+    def append(self, data: bytes):
+        self.total += len(data)
+        room = self.head_limit - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if data:
+            self.tail += data
+            if len(self.tail) > self.tail_limit:
+                del self.tail[:len(self.tail) - self.tail_limit]
+
+    def render(self) -> str:
+        text = self.head.decode("utf-8", errors="replace")
+        omitted = self.total - len(self.head) - len(self.tail)
+        if omitted > 0:
+            text += f"\n... [{omitted} bytes omitted] ...\n"
+        return (text + self.tail.decode("utf-8", errors="replace")).strip()
+
+async def _pump(stream, buffer: _OutputBuffer, label: str):
+    """Read a subprocess stream incrementally, reporting the latest line as progress."""
+    last_report = 0.0
+    loop = asyncio.get_running_loop()
+    while True:
+        data = await stream.read(64 * 1024)
+        if not data:
+            break
+        buffer.append(data)
+        now = loop.time()
+        if now - last_report >= Config.COMMAND_PROGRESS_INTERVAL:
+            last_report = now
+            lines = data.decode("utf-8", errors="replace").strip().splitlines()
+            if lines:
+                report_progress("run_command", f"[{label}] {lines[-1][:200]}")
+
+async def _kill_process_tree(process):
+    """Terminate the command and everything it spawned."""
+    if process.returncode is not None:
+        return
+    try:
+        if os.name == "nt":
+            killer = await asyncio.create_subprocess_exec(
+                "taskkill", "/F", "/T", "/PID", str(process.pid),
+                stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+            )
+            await killer.wait()
+        else:
+            # start_new_session=True made the shell a process group leader
+            os.killpg(process.pid, signal.SIGTERM)
+            try:
+                await asyncio.wait_for(process.wait(), timeout=2)
+            except asyncio.TimeoutError:
+                os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+async def run_command(command: str, timeout: Optional[float] = None) -> str:
+    """
+    Runs a shell command (sandboxed - no interactive commands).
+
+    Output is read incrementally and capped: only the first and last
+    COMMAND_OUTPUT_HEAD_BYTES/COMMAND_OUTPUT_TAIL_BYTES of each stream are kept.
+    The command and its children are killed after `timeout` seconds
+    (COMMAND_TIMEOUT by default).
+    """
     # comprehensive blacklist for safety
     blacklist = ["rm -rf", "format", "del /s", "mkfs"] 
     for banned in blacklist:
         if banned in command:
             return f"Error: Command '{banned}' is not allowed."
 
+    # Arguments come from LLM JSON: "5" must work, and junk must fail before anything is spawned
     try:
+        timeout = float(timeout) if timeout is not None else Config.COMMAND_TIMEOUT
+    except (TypeError, ValueError):
+        return f"Error: timeout must be a number of seconds, got {timeout!r}."
+    if timeout <= 0:
+        timeout = Config.COMMAND_TIMEOUT
+
+    try:
+        if os.name == "nt":
+            group_kwargs = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+        else:
+            group_kwargs = {"start_new_session": True}
         process = await asyncio.create_subprocess_shell(
             command,
             stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
+            stderr=asyncio.subprocess.PIPE,
+            **group_kwargs
         )
-        stdout, stderr = await process.communicate()
+    except Exception as e:
+        logger.error(f"run_command failed: {e}")
+        return f"Error running command: {e}"
+
+    stdout = _OutputBuffer(Config.COMMAND_OUTPUT_HEAD_BYTES, Config.COMMAND_OUTPUT_TAIL_BYTES)
+    stderr = _OutputBuffer(Config.COMMAND_OUTPUT_HEAD_BYTES, Config.COMMAND_OUTPUT_TAIL_BYTES)
+    pumps = []
+    try:
+        pumps = [
+            asyncio.create_task(_pump(process.stdout, stdout, "stdout")),
+            asyncio.create_task(_pump(process.stderr, stderr, "stderr")),
+        ]
+
+        _, pending = await asyncio.wait([*pumps, asyncio.create_task(process.wait())], timeout=timeout)
+        timed_out = bool(pending)
+        if timed_out:
+            await _kill_process_tree(process)
+            # A detached grandchild may still hold the pipes open; keep what we have
+            _, stuck = await asyncio.wait(pumps, timeout=2)
+            for task in stuck:
+                task.cancel()
+            await process.wait()
         
-        output = stdout.decode().strip()
-        error = stderr.decode().strip()
+        output = stdout.render()
+        error = stderr.render()
+        if timed_out:
+            error = (error + "\n" if error else "") + f"Command timed out after {timeout}s and was killed."
         
         if error:
             return f"Output: {output}\nError: {error}"
@@ -100,11 +397,40 @@ async def run_command(command: str) -> str:
     except Exception as e:
         logger.error(f"run_command failed: {e}")
         return f"Error running command: {e}"
+    finally:
+        # Also reached on cancellation: never leave the process group running detached
+        if process.returncode is None:
+            await _kill_process_tree(process)
+        for task in pumps:
+            task.cancel()
 
 def register_builtin_tools():
     """Registers all built-in tools."""
-    registry.register("read_file", "Reads a file from the local system.", read_file)
+    registry.register(
+        "read_file",
+        "Reads a file from the local system. Large files are returned in chunks; "
+        "optional args: offset/length (bytes), start_line/end_line, tail (last N lines).",
+        read_file, read_only=True, validity=_file_validity
+    )
     registry.register("write_file", "Writes content to a file.", write_file)
-    registry.register("list_files", "Lists files in a directory.", list_files)
-    registry.register("web_get", "Fetches content from a URL.", web_get)
-    registry.register("run_command", "Runs a shell command.", run_command)
+    registry.register("list_files", "Lists files in a directory.", list_files, read_only=True, validity=_dir_validity)
+    registry.register("web_get", "Fetches content from a URL.", web_get, read_only=True,
+                      validity=http_client.validity_token)
+    registry.register(
+        "search_journal",
+        "Searches results of earlier tool calls (all goals). Args: query (words, \"phrases\", prefix*); "
+        "optional goal_id, limit, offset. Check here before re-running expensive tools.",
+        search_journal, read_only=True, validity=_journal_validity
+    )
+    registry.register(
+        "read_journal_entry",
+        "Returns the full result of a journal entry by id (search_journal shows ids as #N), including results "
+        "stored compressed or archived. Optional args: offset, length (characters).",
+        read_journal_entry, read_only=True
+    )
+    registry.register(
+        "run_command",
+        "Runs a shell command. Optional arg: timeout (seconds). Long output is truncated to its head and tail.",
+        run_command
+    )
+    registry.sync()
@@ -0,0 +1,27 @@
+import contextvars
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+@dataclass
+class ToolContext:
+    """Per-call context made available to running tools by the agent loop."""
+    goal_id: Optional[int] = None
+    on_progress: Optional[Callable[[str, str], None]] = None # (tool_name, message)
+
+# Each tool call runs in its own asyncio task, so concurrent calls see their own context
+_tool_context: contextvars.ContextVar = contextvars.ContextVar("tool_context", default=ToolContext())
+
+def get_tool_context() -> ToolContext:
+    return _tool_context.get()
+
+def set_tool_context(context: ToolContext) -> contextvars.Token:
+    return _tool_context.set(context)
+
+def reset_tool_context(token: contextvars.Token):
+    _tool_context.reset(token)
+
+def report_progress(tool_name: str, message: str):
+    """Report progress of a long-running tool. No-op when nobody is listening."""
+    callback = get_tool_context().on_progress
+    if callback:
+        callback(tool_name, message)
@@ -1,45 +1,208 @@
 import inspect
 import asyncio
-from typing import Callable, Dict, Any, Optional
-from src.utils.logger import logger
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+from typing import Callable, Dict, Any, Optional, Tuple
+from src.utils.config import Config
+from src.utils.logger import logger, format_args
+from src.utils.metrics import metrics
 from src.persistence.database import db
+from src.tools.context import get_tool_context
+
+class ToolMemo:
+    """
+    Bounded LRU of read-only tool results, keyed by goal, tool name and arguments.
+
+    Each entry stores the validity token computed when the result was produced
+    (e.g. a file's mtime and size). A lookup recomputes the token and only
+    returns the stored result if it is unchanged.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[Any, Any]]" = OrderedDict() # Key -> (token, result)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0}
+
+    @staticmethod
+    def key(goal_id: Optional[int], name: str, kwargs: Dict[str, Any]) -> Tuple:
+        return goal_id, name, json.dumps(kwargs, sort_keys=True, default=str)
+
+    def get(self, key: Tuple, token: Any) -> Tuple[bool, Any]:
+        """(True, result) if a result with the same token is stored, else (False, None)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == token:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._entries[key]
+                self.stats["stale"] += 1
+            self.stats["misses"] += 1
+            return False, None
+
+    def put(self, key: Tuple, token: Any, result: Any):
+        with self._lock:
+            self._entries[key] = (token, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def forget_goal(self, goal_id: int):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == goal_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
 
 class ToolRegistry:
-    """Registry for managing available tools."""
+    """
+    Registry for managing available tools.
+
+    The enabled/disabled state from the `tools` table is kept in an in-memory
+    snapshot. It is refreshed when changed through set_enabled()/register(),
+    on invalidate(), or when PRAGMA data_version shows another connection has
+    committed (checked at most every TOOL_CACHE_CHECK_INTERVAL seconds).
+
+    register() only records tools in memory. They are written to the DB by
+    sync(), which is skipped entirely when the registered tools' fingerprint
+    matches the one stored by the previous sync.
+
+    Results of read-only tools are memoized per goal (see ToolMemo). Running
+    any other tool clears the memo, since it may have changed what the
+    read-only tools observe.
+    """
     
     def __init__(self):
         self._tools: Dict[str, Callable] = {}
         self._descriptions: Dict[str, str] = {}
+        self._enabled: Optional[Dict[str, bool]] = None # Snapshot of tools.enabled, None = not loaded
+        self._cache_lock = threading.Lock()
+        self._data_versions: Dict[int, int] = {} # Thread ident -> last seen data_version
+        self._last_check = 0.0
+        self._needs_sync = False
+        self._read_only: Dict[str, Optional[Callable]] = {} # Name -> validity function (None = pure)
+        self.memo = ToolMemo(Config.TOOL_MEMO_MAX_ENTRIES)
 
-    def register(self, name: str, description: str, func: Callable):
-        """Register a tool with the system."""
+    def register(self, name: str, description: str, func: Callable, read_only: bool = False,
+                 validity: Optional[Callable[..., Any]] = None):
+        """
+        Register a tool with the system.
+
+        read_only tools have no side effects, so repeated calls within a goal are
+        served from the memo. `validity` is called with the tool's arguments and
+        returns a token that changes whenever the result would (None = don't
+        memoize this call); without it the tool must be pure.
+        """
         if not asyncio.iscoroutinefunction(func):
             raise ValueError(f"Tool {name} must be an async function.")
             
         self._tools[name] = func
         self._descriptions[name] = description
-        
-        # Ensure tool exists in DB
+        if read_only:
+            self._read_only[name] = validity
+        else:
+            self._read_only.pop(name, None)
+        self._needs_sync = True
+
+    def is_read_only(self, name: str) -> bool:
+        return name in self._read_only
+
+    def _fingerprint(self) -> str:
+        """Cheap identity of the registered tools: names, descriptions and source file versions."""
+        digest = hashlib.sha256()
+        for name in sorted(self._tools):
+            code = self._tools[name].__code__
+            try:
+                mtime = os.stat(code.co_filename).st_mtime_ns
+            except OSError:
+                mtime = 0
+            digest.update(f"{name}\0{self._descriptions[name]}\0{code.co_filename}:{code.co_firstlineno}:{mtime}\n".encode())
+        return digest.hexdigest()
+
+    def sync(self):
+        """Write registered tools to the DB, skipping all work if nothing changed since the last sync."""
+        if not self._needs_sync:
+            return
+        self._needs_sync = False
         try:
-            existing = db.fetch_one("SELECT * FROM tools WHERE name = ?", (name,))
-            if not existing:
-                db.execute_query(
-                    "INSERT INTO tools (name, description, code, enabled) VALUES (?, ?, ?, ?)",
-                    (name, description, inspect.getsource(func), True)
-                )
-            else:
-                # Update description/code if changed (optional, but good for sync)
-                pass
+            fingerprint = self._fingerprint()
+            row = db.fetch_one("SELECT value FROM state WHERE key = 'tools_fingerprint'")
+            if row and row['value'] == fingerprint:
+                return
+
+            existing = {row['name'] for row in db.fetch_all("SELECT name FROM tools")}
+            # inspect.getsource reads source files, so it only runs when something changed
+            new, changed = [], []
+            for name, func in self._tools.items():
+                if name in existing:
+                    changed.append((self._descriptions[name], inspect.getsource(func), name))
+                else:
+                    new.append((name, self._descriptions[name], inspect.getsource(func), True))
+            if new:
+                db.execute_many("INSERT INTO tools (name, description, code, enabled) VALUES (?, ?, ?, ?)", new)
+            if changed:
+                db.execute_many("UPDATE tools SET description = ?, code = ? WHERE name = ?", changed)
+            db.execute_query("INSERT OR REPLACE INTO state (key, value) VALUES ('tools_fingerprint', ?)", (fingerprint,))
+            self.invalidate()
         except Exception as e:
-            logger.error(f"Failed to register tool {name} in DB: {e}")
+            self._needs_sync = True
+            logger.error(f"Failed to sync tools to DB: {e}")
+
+    def invalidate(self):
+        """Drop the enabled-state snapshot so the next lookup reloads it from the DB."""
+        with self._cache_lock:
+            self._enabled = None
+
+    def set_enabled(self, name: str, enabled: bool):
+        """Enable or disable a tool, updating both the DB and the in-memory snapshot."""
+        db.execute_query("UPDATE tools SET enabled = ? WHERE name = ?", (bool(enabled), name))
+        with self._cache_lock:
+            if self._enabled is not None and name in self._enabled:
+                self._enabled[name] = bool(enabled)
+        logger.info(f"Tool {name} {'enabled' if enabled else 'disabled'}.")
+
+    def _snapshot(self) -> Dict[str, bool]:
+        """Return the cached {name: enabled} map, reloading it if stale."""
+        self.sync()
+        now = time.monotonic()
+        if self._enabled is not None and now - self._last_check >= Config.TOOL_CACHE_CHECK_INTERVAL:
+            self._last_check = now
+            # data_version only moves when *another* connection commits, and is tracked per connection
+            ident = threading.get_ident()
+            version = db.fetch_one("PRAGMA data_version")[0]
+            previous = self._data_versions.get(ident)
+            self._data_versions[ident] = version
+            if previous is not None and previous != version:
+                self.invalidate()
+
+        with self._cache_lock:
+            if self._enabled is None:
+                rows = db.fetch_all("SELECT name, enabled FROM tools")
+                self._enabled = {row['name']: bool(row['enabled']) for row in rows}
+                self._data_versions[threading.get_ident()] = db.fetch_one("PRAGMA data_version")[0]
+                self._last_check = now
+            return self._enabled
 
     def get_tool(self, name: str) -> Optional[Callable]:
         """Retrieve a tool if it exists and is enabled."""
         try:
-            row = db.fetch_one("SELECT enabled FROM tools WHERE name = ?", (name,))
-            if row and row['enabled']:
+            enabled = self._snapshot().get(name)
+            if enabled:
                 return self._tools.get(name)
-            elif row and not row['enabled']:
+            elif enabled is not None:
                 logger.warning(f"Tool {name} is disabled.")
                 return None
             else:
@@ -52,20 +215,13 @@ class ToolRegistry:
     def get_all_tools(self) -> Dict[str, str]:
         """Get all registered tools and their descriptions."""
         # Return only enabled tools
-        enabled_tools = {}
         try:
-            rows = db.fetch_all("SELECT name FROM tools WHERE enabled = 1")
-            enabled_names = {row['name'] for row in rows}
-            
-            for name, desc in self._descriptions.items():
-                if name in enabled_names:
-                    enabled_tools[name] = desc
+            snapshot = self._snapshot()
+            return {name: desc for name, desc in self._descriptions.items() if snapshot.get(name)}
         except Exception as e:
             logger.error(f"Error fetching enabled tools: {e}")
             # Fallback to in-memory if DB fails
             return self._descriptions
-            
-        return enabled_tools
 
     async def execute(self, name: str, **kwargs) -> Any:
         """Execute a tool safely."""
@@ -73,8 +229,41 @@ class ToolRegistry:
         if not tool:
             raise ValueError(f"Tool {name} is not available.")
             
+        if name not in self._read_only:
+            self.memo.clear()
+        elif Config.TOOL_MEMO_ENABLED:
+            return await self._execute_memoized(name, tool, kwargs)
+        return await self._run(name, tool, kwargs)
+
+    async def _execute_memoized(self, name: str, tool: Callable, kwargs: Dict[str, Any]) -> Any:
+        validity = self._read_only[name]
+        try:
+            token = None
+            if validity:
+                # Validity checks stat files or read cache metadata: keep that I/O off the event loop
+                token = await asyncio.get_running_loop().run_in_executor(None, partial(validity, **kwargs))
+        except Exception as e:
+            logger.warning(f"Validity check for {name} failed, not memoizing: {e}")
+            token = None
+        if validity and token is None:
+            return await self._run(name, tool, kwargs)
+
+        key = ToolMemo.key(get_tool_context().goal_id, name, kwargs)
+        found, result = self.memo.get(key, token)
+        if found:
+            metrics.inc("tool_memo_hits_total", tool=name)
+            logger.info(f"Tool {name} served from memo")
+            return result
+        metrics.inc("tool_memo_misses_total", tool=name)
+        result = await self._run(name, tool, kwargs)
+        # Tools report failures as "Error..." strings; those are worth retrying
+        if not (isinstance(result, str) and result.startswith("Error")):
+            self.memo.put(key, token, result)
+        return result
+
+    async def _run(self, name: str, tool: Callable, kwargs: Dict[str, Any]) -> Any:
         try:
-            logger.info(f"Executing tool: {name} with args: {kwargs}")
+            logger.info(f"Executing tool: {name} with args: {format_args(kwargs)}")
             return await tool(**kwargs)
         except Exception as e:
             logger.error(f"Tool execution failed: {e}")
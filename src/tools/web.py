@@ -0,0 +1,240 @@
+import asyncio
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Optional
+from src.utils.config import Config
+from src.utils.logger import logger
+
+@dataclass
+class HttpResponse:
+    """Result of HttpClient.get(). Header names are lower-cased."""
+    url: str
+    status: int
+    text: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    truncated: bool = False
+    from_cache: bool = False
+
+class HttpCache:
+    """
+    Small on-disk HTTP cache honoring Cache-Control, ETag and Last-Modified.
+
+    Each URL is stored as two files named after the SHA-256 of the URL: a JSON
+    metadata file (status, validators, freshness lifetime) and the body.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return self.directory / f"{key}.json", self.directory / f"{key}.body"
+
+    def load(self, url: str) -> Optional[dict]:
+        meta_path, body_path = self._paths(url)
+        try:
+            meta = json.loads(meta_path.read_text("utf-8"))
+            meta["body"] = body_path.read_text("utf-8")
+            return meta
+        except (OSError, ValueError):
+            return None
+
+    def load_meta(self, url: str) -> Optional[dict]:
+        """Metadata only, without reading the body."""
+        meta_path, _ = self._paths(url)
+        try:
+            return json.loads(meta_path.read_text("utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def store(self, url: str, response: HttpResponse):
+        directives = parse_cache_control(response.headers.get("cache-control", ""))
+        if "no-store" in directives:
+            return
+        meta = {
+            "url": url,
+            "status": response.status,
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+            "max_age": freshness_lifetime(response.headers, directives),
+            "no_cache": "no-cache" in directives,
+            "stored_at": time.time(),
+        }
+        if not meta["etag"] and not meta["last_modified"] and not meta["max_age"]:
+            return # Nothing to validate or reuse
+        meta_path, body_path = self._paths(url)
+        try:
+            body_path.write_text(response.text, "utf-8")
+            meta_path.write_text(json.dumps(meta), "utf-8")
+        except OSError as e:
+            logger.warning(f"Failed to write HTTP cache entry for {url}: {e}")
+
+    def touch(self, url: str, entry: dict, headers: Dict[str, str]):
+        """Refresh an entry after a 304 Not Modified."""
+        directives = parse_cache_control(headers.get("cache-control", ""))
+        entry = {k: v for k, v in entry.items() if k != "body"}
+        entry["stored_at"] = time.time()
+        entry["max_age"] = freshness_lifetime(headers, directives) or entry.get("max_age")
+        entry["etag"] = headers.get("etag") or entry.get("etag")
+        meta_path, _ = self._paths(url)
+        try:
+            meta_path.write_text(json.dumps(entry), "utf-8")
+        except OSError as e:
+            logger.warning(f"Failed to refresh HTTP cache entry for {url}: {e}")
+
+    @staticmethod
+    def is_fresh(entry: dict) -> bool:
+        if entry.get("no_cache") or not entry.get("max_age"):
+            return False
+        return time.time() - entry["stored_at"] < entry["max_age"]
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "revalidated": self.revalidated, "misses": self.misses}
+
+def parse_cache_control(value: str) -> Dict[str, Optional[str]]:
+    directives = {}
+    for part in value.split(","):
+        part = part.strip().lower()
+        if not part:
+            continue
+        name, _, arg = part.partition("=")
+        directives[name.strip()] = arg.strip().strip('"') or None
+    return directives
+
+def freshness_lifetime(headers: Dict[str, str], directives: Dict[str, Optional[str]]) -> Optional[float]:
+    """Seconds a response may be reused without revalidation (max-age, else Expires)."""
+    if directives.get("max-age"):
+        try:
+            return float(directives["max-age"])
+        except ValueError:
+            return None
+    if headers.get("expires"):
+        try:
+            return max(0.0, parsedate_to_datetime(headers["expires"]).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+    return None
+
+class HttpClient:
+    """
+    Long-lived HTTP client shared by the web tools.
+
+    The aiohttp session (and with it keep-alive connections, the DNS cache and
+    TLS sessions) lives as long as the agent event loop; AgentThread closes it
+    on shutdown. Bodies are streamed and capped at HTTP_MAX_BODY_BYTES. Cache
+    files are read and written in the loop's executor, off the event loop.
+    """
+
+    def __init__(self):
+        self._session = None # aiohttp.ClientSession, created lazily on the agent loop
+        self._session_loop = None
+        self._cache: Optional[HttpCache] = None
+
+    @property
+    def cache(self) -> Optional[HttpCache]:
+        if self._cache is None and Config.HTTP_CACHE_ENABLED:
+            self._cache = HttpCache(Config.HTTP_CACHE_DIR)
+        return self._cache
+
+    async def get_session(self) -> "aiohttp.ClientSession":
+        """Return the shared session, creating it on the running loop if needed."""
+        import aiohttp # Deferred: only needed once a web tool actually runs
+
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=Config.HTTP_MAX_CONNECTIONS,
+                limit_per_host=Config.HTTP_MAX_CONNECTIONS_PER_HOST,
+                ttl_dns_cache=300,
+            )
+            timeout = aiohttp.ClientTimeout(
+                total=Config.HTTP_TOTAL_TIMEOUT,
+                connect=Config.HTTP_CONNECT_TIMEOUT,
+                sock_read=Config.HTTP_READ_TIMEOUT,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+            self._session_loop = loop
+        return self._session
+
+    async def close(self):
+        """Close the shared session. Must be called on the loop that created it."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+
+    def validity_token(self, url: str) -> Optional[tuple]:
+        """
+        Identity of the cached response for `url` while it is fresh, else None.
+
+        Used to memoize web_get: a stale or uncached URL has to go to the network.
+        Reads the metadata file; ToolRegistry calls it from an executor thread.
+        """
+        cache = self.cache
+        entry = cache.load_meta(url) if cache else None
+        if entry is None or not HttpCache.is_fresh(entry):
+            return None
+        return entry.get("etag"), entry.get("last_modified"), entry["stored_at"]
+
+    async def get(self, url: str, max_bytes: int = None) -> HttpResponse:
+        """GET a URL, serving it from the HTTP cache when allowed."""
+        max_bytes = max_bytes or Config.HTTP_MAX_BODY_BYTES
+        loop = asyncio.get_running_loop()
+        cache = self.cache
+        entry = await loop.run_in_executor(None, cache.load, url) if cache else None
+
+        if entry and HttpCache.is_fresh(entry):
+            cache.hits += 1
+            return HttpResponse(url, entry["status"], entry["body"], from_cache=True)
+
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        session = await self.get_session()
+        async with session.get(url, headers=headers) as response:
+            if response.status == 304 and entry:
+                cache.revalidated += 1
+                response_headers = {k.lower(): v for k, v in response.headers.items()}
+                await loop.run_in_executor(None, cache.touch, url, entry, response_headers)
+                return HttpResponse(url, entry["status"], entry["body"], response_headers, from_cache=True)
+
+            body, truncated = await self._read_capped(response, max_bytes)
+            text = body.decode(response.charset or "utf-8", errors="replace")
+            response_headers = {k.lower(): v for k, v in response.headers.items()}
+            result = HttpResponse(url, response.status, text, response_headers, truncated=truncated)
+
+        if cache:
+            cache.misses += 1
+            if result.status == 200 and not truncated:
+                await loop.run_in_executor(None, cache.store, url, result)
+        return result
+
+    @staticmethod
+    async def _read_capped(response: "aiohttp.ClientResponse", max_bytes: int):
+        """Stream the body, stopping after max_bytes. Returns (bytes, truncated)."""
+        chunks = []
+        size = 0
+        async for chunk in response.content.iter_chunked(64 * 1024):
+            remaining = max_bytes - size
+            # A body of exactly max_bytes is complete; only data past the cap is truncation
+            if len(chunk) > remaining:
+                chunks.append(chunk[:remaining])
+                return b"".join(chunks), True
+            chunks.append(chunk)
+            size += len(chunk)
+        return b"".join(chunks), False
+
+# Global HTTP client
+http_client = HttpClient()
@@ -0,0 +1,192 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+from src.persistence.database import db
+from src.persistence.journal import journal_writer
+
+Row = Tuple[str, str, str, str, str]
+
+class JournalTableModel(QAbstractTableModel):
+    """
+    Virtualized model over the whole `journal` table.
+
+    Rows persisted when the model was (re)loaded are read from SQLite a page
+    at a time as the view scrolls to them; only MAX_CACHED_PAGES pages are
+    kept. Pages are fetched by keyset: every loaded page leaves anchors (row
+    -> journal id) at its edges, and a page is read by seeking to the nearest
+    anchor and scanning from there, forwards or backwards. The end of the
+    snapshot is always an anchor, so the tail (where refresh_journal scrolls)
+    costs the same on a 1M-row journal as on an empty one.
+
+    Live entries from the agent arrive in batches (see CoalescingSignalBridge)
+    and are appended with one insert per batch. Each carries the sequence
+    number JournalWriter gave it; entries the DB snapshot already contains
+    are skipped, so nothing shows up twice. Once more than MAX_LIVE_ROWS have
+    accumulated, the persisted ones are folded into the snapshot (its row
+    count is kept up to date rather than re-counted), so memory stays bounded
+    however long the session runs.
+    """
+
+    COLUMNS = ["Time", "Action", "Tool", "Result", "Status"]
+    PAGE_SIZE = 200
+    MAX_CACHED_PAGES = 10
+    MAX_LIVE_ROWS = 500
+    RESULT_PREVIEW_CHARS = 100
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pages: "OrderedDict[int, List[Row]]" = OrderedDict()
+        self._db_count = 0 # Rows backed by the DB snapshot
+        self._snapshot_max_id = 0 # Highest journal id included in the snapshot
+        self._snapshot_seq = 0 # Every journal_writer entry up to this sequence number is in the snapshot
+        self._anchors: Dict[int, int] = {} # Row -> id such that rows from there on have id >= it
+        self._live: List[Tuple[Optional[int], Row]] = [] # (sequence number, row)
+        self.reload()
+
+    # --- Qt model interface ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._db_count + len(self._live)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role not in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole):
+            return None
+        row = index.row()
+        if row >= self._db_count:
+            entry = self._live[row - self._db_count][1]
+        else:
+            entry = self._db_row(row)
+        return entry[index.column()]
+
+    # --- Loading ---
+
+    def reload(self):
+        """Re-snapshot the journal and drop all cached rows. Live rows not persisted yet are kept."""
+        with journal_writer.snapshot() as seq:
+            row = db.fetch_one("SELECT COUNT(*) AS n, COALESCE(MAX(id), 0) AS max_id FROM journal")
+        self.beginResetModel()
+        self._db_count, self._snapshot_max_id, self._snapshot_seq = row['n'], row['max_id'], seq
+        self._pages.clear()
+        self._reset_anchors()
+        self._live = [(s, entry) for s, entry in self._live if s is not None and s > seq]
+        self.endResetModel()
+
+    def _reset_anchors(self):
+        # Journal ids are positive, so id >= 0 starts at row 0; nothing has id > MAX(id)
+        self._anchors = {0: 0, self._db_count: self._snapshot_max_id + 1}
+
+    def row_for_id(self, journal_id: int) -> int:
+        """Row showing the journal entry `journal_id`, or -1 if it is not in the snapshot."""
+        if journal_id > self._snapshot_max_id:
+            return -1
+        row = db.fetch_one("SELECT COUNT(*) FROM journal WHERE id < ?", (journal_id,))
+        return row[0]
+
+    def _db_row(self, row: int) -> Row:
+        page_index = row // self.PAGE_SIZE
+        page = self._pages.get(page_index)
+        if page is None:
+            page = self._load_page(page_index)
+        else:
+            self._pages.move_to_end(page_index)
+        offset = row - page_index * self.PAGE_SIZE
+        return page[offset] if offset < len(page) else ("",) * len(self.COLUMNS)
+
+    def _load_page(self, page_index: int) -> List[Row]:
+        start = page_index * self.PAGE_SIZE
+        limit = max(0, min(self.PAGE_SIZE, self._db_count - start))
+        columns = "id, timestamp, action, tool_used, substr(result, 1, ?) AS result, status"
+
+        # Nearest anchor at or before the page (scan forwards) or at or after its end (scan backwards)
+        anchor_row = min(
+            (row for row in self._anchors if row <= start or row >= start + limit),
+            key=lambda row: start - row if row <= start else row - start - limit
+        )
+        if anchor_row <= start:
+            rows = db.fetch_all(
+                f"SELECT {columns} FROM journal WHERE id >= ? AND id <= ? ORDER BY id LIMIT ? OFFSET ?",
+                (self.RESULT_PREVIEW_CHARS + 1, self._anchors[anchor_row], self._snapshot_max_id,
+                 limit, start - anchor_row)
+            )
+        else:
+            rows = db.fetch_all(
+                f"SELECT {columns} FROM journal WHERE id < ? ORDER BY id DESC LIMIT ? OFFSET ?",
+                (self.RESULT_PREVIEW_CHARS + 1, self._anchors[anchor_row], limit, anchor_row - start - limit)
+            )[::-1]
+
+        if len(rows) == limit and rows:
+            self._anchors[start] = rows[0]['id']
+            self._anchors[start + limit] = rows[-1]['id'] + 1
+        page = [
+            (str(r['timestamp']), r['action'], r['tool_used'], self._preview(r['result']), r['status'])
+            for r in rows
+        ]
+        self._pages[page_index] = page
+        while len(self._pages) > self.MAX_CACHED_PAGES:
+            self._pages.popitem(last=False)
+        return page
+
+    def _preview(self, text) -> str:
+        text = str(text or "")
+        if len(text) > self.RESULT_PREVIEW_CHARS:
+            return text[:self.RESULT_PREVIEW_CHARS] + "..."
+        return text
+
+    # --- Live entries ---
+
+    def append_entries(self, entries: List[dict]):
+        """Append live entries (as emitted by AgentSignals.log_updated) with a single row insert."""
+        # Entries persisted before the last snapshot are already among the DB rows
+        entries = [entry for entry in entries if entry.get('seq') is None or entry['seq'] > self._snapshot_seq]
+        if not entries:
+            return
+        first = self.rowCount()
+        self.beginInsertRows(QModelIndex(), first, first + len(entries) - 1)
+        self._live.extend(
+            (entry.get('seq'), (entry['timestamp'], entry['action'], entry['tool'], entry['result'], entry['status']))
+            for entry in entries
+        )
+        self.endInsertRows()
+        if len(self._live) > self.MAX_LIVE_ROWS:
+            self._fold_live_rows()
+
+    def _fold_live_rows(self):
+        """Re-point the live rows that have been persisted at their DB rows to keep memory bounded."""
+        # Foldable: the leading live rows that are exactly the next entries written after the snapshot
+        persisted = journal_writer.persisted_seq
+        folded = 0
+        for seq, _ in self._live:
+            if seq != self._snapshot_seq + folded + 1 or seq > persisted:
+                break
+            folded += 1
+        if not folded:
+            if len(self._live) > 2 * self.MAX_LIVE_ROWS:
+                self.reload() # Entries arrived out of order; start over
+            return
+
+        # Those entries are the next `folded` rows after the snapshot (a short index range scan)
+        row = db.fetch_one(
+            "SELECT id FROM journal WHERE id > ? ORDER BY id LIMIT 1 OFFSET ?", (self._snapshot_max_id, folded - 1)
+        )
+        if row is None:
+            self.reload() # Rows were removed meanwhile (e.g. by retention)
+            return
+        first = self._db_count
+        self._db_count += folded
+        self._snapshot_max_id = row['id']
+        self._snapshot_seq += folded
+        del self._live[:folded]
+        # Existing anchors stay valid; the new end of the snapshot is one more
+        self._anchors[self._db_count] = self._snapshot_max_id + 1
+        for page_index in [p for p in self._pages if p >= first // self.PAGE_SIZE]:
+            del self._pages[page_index] # The old tail page was cut short at the previous end
+        self.dataChanged.emit(self.index(first, 0), self.index(self._db_count - 1, len(self.COLUMNS) - 1))
@@ -1,18 +1,36 @@
 import json
-import hashlib
 from datetime import datetime
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-    QTextEdit, QPushButton, QTableWidget, QTableWidgetItem, 
-    QHeaderView, QListWidget, QListWidgetItem, QLabel, QMessageBox, QSplitter
+    QTextEdit, QPlainTextEdit, QPushButton, QTableView, QLineEdit, QTableWidget, QTableWidgetItem,
+    QHeaderView, QListWidget, QListWidgetItem, QLabel, QMessageBox, QSplitter, QSpinBox
 )
-from PyQt6.QtCore import Qt, pyqtSlot
+from PyQt6.QtCore import Qt, QThreadPool, QTimer, pyqtSignal, pyqtSlot
 
 from src.persistence.database import db
+from src.persistence.journal import journal_writer
+from src.persistence import search as journal_search
+from src.persistence.retention import retention_job, load_entry
 from src.agent.loop import AgentThread
+from src.agent.llm_client import BREAKER_STATES
+from src.agent.confirmations import confirmation_store, action_hash
 from src.ui.theme import CyberTheme
+from src.ui.journal_model import JournalTableModel
+from src.ui.signal_bridge import CoalescingSignalBridge
+from src.utils.config import Config
+from src.utils.logger import logger
+from src.utils.metrics import metrics, metrics_recorder
 
 class MainWindow(QMainWindow):
+    SEARCH_PAGE_SIZE = 20
+
+    # Emitted from the retention thread; queued to the GUI thread
+    retention_finished = pyqtSignal(dict)
+    # Emitted from a pool thread with (query, total matches)
+    search_counted = pyqtSignal(str, int)
+    # Emitted from a pool thread with (journal id, entry or None)
+    search_detail_loaded = pyqtSignal(int, object)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("NJORO AI - Autonomous Desktop Operator")
@@ -26,6 +44,20 @@ class MainWindow(QMainWindow):
         self.refresh_journal()
         self.refresh_confirmations()
 
+        # Background journal compaction; removed rows shift the journal view, so reload it afterwards
+        self.retention_finished.connect(self.handle_retention_finished)
+        self.search_counted.connect(self.handle_search_counted)
+        self.search_detail_loaded.connect(self.handle_search_detail_loaded)
+        retention_job.add_listener(self.retention_finished.emit)
+        retention_job.start()
+
+        # Metrics: persisted/exported in the background, shown live in the metrics panel
+        metrics_recorder.start()
+        self.metrics_timer = QTimer(self)
+        self.metrics_timer.setInterval(Config.METRICS_PANEL_INTERVAL_MS)
+        self.metrics_timer.timeout.connect(self.refresh_metrics)
+        self.metrics_timer.start()
+
     def setup_ui(self):
         # Main Layout
         central_widget = QWidget()
@@ -44,6 +76,15 @@ class MainWindow(QMainWindow):
         self.goal_input = QTextEdit()
         self.goal_input.setPlaceholderText("Enter your objective here...")
         left_layout.addWidget(self.goal_input)
+
+        priority_layout = QHBoxLayout()
+        priority_layout.addWidget(QLabel("Priority:"))
+        self.priority_input = QSpinBox()
+        self.priority_input.setRange(0, 10)
+        self.priority_input.setToolTip("Higher-priority goals get their steps scheduled first")
+        priority_layout.addWidget(self.priority_input)
+        priority_layout.addStretch()
+        left_layout.addLayout(priority_layout)
         
         self.start_btn = QPushButton("Start / Resume Agent")
         self.start_btn.clicked.connect(self.handle_start)
@@ -56,11 +97,54 @@ class MainWindow(QMainWindow):
         center_layout = QVBoxLayout(center_panel)
         
         center_layout.addWidget(QLabel("Execution Journal:"))
-        self.journal_table = QTableWidget()
-        self.journal_table.setColumnCount(5)
-        self.journal_table.setHorizontalHeaderLabels(["Time", "Action", "Tool", "Result", "Status"])
-        self.journal_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        # Virtualized: rows are paged from SQLite on demand
+        self.journal_model = JournalTableModel(self)
+        self.journal_table = QTableView()
+        self.journal_table.setModel(self.journal_model)
+        self.journal_table.setWordWrap(False)
+        self.journal_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.journal_table.verticalHeader().setDefaultSectionSize(22)
+        header = self.journal_table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        header.setSectionResizeMode(3, QHeaderView.ResizeMode.Stretch) # Result column
+        for column, width in ((0, 140), (1, 140), (2, 100), (4, 80)):
+            self.journal_table.setColumnWidth(column, width)
+        self.journal_model.rowsAboutToBeInserted.connect(self._remember_scroll_position)
+        self.journal_model.rowsInserted.connect(self._follow_journal_tail)
+        self._journal_at_bottom = True
         center_layout.addWidget(self.journal_table)
+
+        # Journal search: ranked results, SEARCH_PAGE_SIZE per page
+        search_layout = QHBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search journal...")
+        self.search_input.returnPressed.connect(self.handle_search)
+        self.search_prev_btn = QPushButton("< Prev")
+        self.search_prev_btn.clicked.connect(lambda: self.show_search_page(self.search_offset - self.SEARCH_PAGE_SIZE))
+        self.search_next_btn = QPushButton("Next >")
+        self.search_next_btn.clicked.connect(lambda: self.show_search_page(self.search_offset + self.SEARCH_PAGE_SIZE))
+        self.search_label = QLabel("")
+        search_layout.addWidget(self.search_input)
+        search_layout.addWidget(self.search_prev_btn)
+        search_layout.addWidget(self.search_next_btn)
+        search_layout.addWidget(self.search_label)
+        center_layout.addLayout(search_layout)
+
+        self.search_results = QListWidget()
+        self.search_results.itemDoubleClicked.connect(self.show_search_hit)
+        self.search_results.currentItemChanged.connect(self.show_search_detail)
+        self.search_results.hide()
+        center_layout.addWidget(self.search_results)
+
+        # Full result of the selected hit (the table only shows previews, compacted entries only 2000 chars)
+        self.search_detail = QPlainTextEdit()
+        self.search_detail.setReadOnly(True)
+        self.search_detail.hide()
+        center_layout.addWidget(self.search_detail)
+        self.search_query = ""
+        self.search_offset = 0
+        self.search_total = 0
+        self.update_search_buttons()
         
         splitter.addWidget(center_panel)
 
@@ -81,6 +165,17 @@ class MainWindow(QMainWindow):
         btn_layout.addWidget(self.approve_btn)
         btn_layout.addWidget(self.reject_btn)
         right_layout.addLayout(btn_layout)
+
+        right_layout.addWidget(QLabel("Metrics (ms):"))
+        self.metrics_table = QTableWidget(0, 5)
+        self.metrics_table.setHorizontalHeaderLabels(["Metric", "Count", "p50", "p95", "p99"])
+        self.metrics_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        self.metrics_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.metrics_table.verticalHeader().setVisible(False)
+        self.metrics_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        right_layout.addWidget(self.metrics_table)
+        self.metrics_label = QLabel("")
+        right_layout.addWidget(self.metrics_label)
         
         splitter.addWidget(right_panel)
 
@@ -92,51 +187,66 @@ class MainWindow(QMainWindow):
         self.status_bar.showMessage("System Ready")
 
     def connect_signals(self):
-        self.agent_thread.signals.log_updated.connect(self.add_journal_entry)
-        self.agent_thread.signals.status_changed.connect(self.update_status)
-        self.agent_thread.signals.confirmation_required.connect(self.add_confirmation)
-        self.agent_thread.signals.goal_updated.connect(self.handle_goal_update)
+        # Agent events are coalesced and delivered every UI_UPDATE_INTERVAL_MS rather than one by one
+        self.signal_bridge = CoalescingSignalBridge(self.agent_thread.signals, parent=self)
+        self.signal_bridge.log_batch.connect(self.add_journal_entries)
+        self.signal_bridge.status_changed.connect(self.update_status)
+        self.signal_bridge.confirmation_required.connect(self.add_confirmation)
+        self.signal_bridge.goal_updated.connect(self.handle_goal_update)
+        self.signal_bridge.tool_progress.connect(self.update_tool_progress)
 
     @pyqtSlot()
     def handle_start(self):
-        if self.agent_thread.isRunning():
-            self.status_bar.showMessage("Agent is already running...")
-            return
-
         goal_text = self.goal_input.toPlainText().strip()
-        if not goal_text:
+        active_goals = db.fetch_all("SELECT id, description FROM goals WHERE status = 'active'")
+        if not goal_text and not active_goals:
             QMessageBox.warning(self, "Input Error", "Please enter a goal.")
             return
 
-        # Check for existing active goal or create new
-        existing_goal = db.fetch_one("SELECT * FROM goals WHERE status = 'active'")
-        if not existing_goal:
-            db.execute_query("INSERT INTO goals (description, status) VALUES (?, ?)", (goal_text, "active"))
+        # Goals run concurrently, so a new objective is added alongside the active ones.
+        # Re-submitting the text of an active goal just resumes it.
+        if goal_text and goal_text not in {g['description'] for g in active_goals}:
+            self.agent_thread.add_goal(goal_text, self.priority_input.value())
             self.status_bar.showMessage("New Goal Started")
-        else:
-             # Optionally update description if changed? 
-             # For now, we assume resuming the active goal.
-             pass
+
+        if self.agent_thread.isRunning():
+            # Resume any goals parked waiting for approval and wake the loop for the new goal
+            self.agent_thread.resume_goal()
+            return
 
         self.agent_thread.start()
 
-    @pyqtSlot(dict)
+    @pyqtSlot(list)
+    def add_journal_entries(self, entries):
+        self.journal_model.append_entries(entries)
+
     def add_journal_entry(self, entry):
-        row = self.journal_table.rowCount()
-        self.journal_table.insertRow(row)
-        self.journal_table.setItem(row, 0, QTableWidgetItem(entry['timestamp']))
-        self.journal_table.setItem(row, 1, QTableWidgetItem(entry['action']))
-        self.journal_table.setItem(row, 2, QTableWidgetItem(entry['tool']))
-        self.journal_table.setItem(row, 3, QTableWidgetItem(entry['result']))
-        self.journal_table.setItem(row, 4, QTableWidgetItem(entry['status']))
-        self.journal_table.scrollToBottom()
+        self.add_journal_entries([entry])
+
+    def _remember_scroll_position(self, *args):
+        scrollbar = self.journal_table.verticalScrollBar()
+        self._journal_at_bottom = scrollbar.value() >= scrollbar.maximum() - 2
+
+    def _follow_journal_tail(self, *args):
+        # Only auto-scroll (once per batch) if the user was already looking at the newest entries
+        if self._journal_at_bottom:
+            self.journal_table.scrollToBottom()
 
     @pyqtSlot(str)
     def update_status(self, message):
         self.status_bar.showMessage(message)
 
+    @pyqtSlot(dict)
+    def update_tool_progress(self, progress):
+        self.status_bar.showMessage(f"Goal {progress['goal_id']} - {progress['tool']}: {progress['message']}")
+
     @pyqtSlot(dict)
     def add_confirmation(self, details):
+        key = (details['goal_id'], action_hash(details['tool_name'], details['tool_args']))
+        for row in range(self.confirmations_list.count()):
+            existing = self.confirmations_list.item(row).data(Qt.ItemDataRole.UserRole)
+            if (existing['goal_id'], action_hash(existing['tool_name'], existing['tool_args'])) == key:
+                return # Already waiting for this decision
         item_text = f"""Tool: {details['tool_name']}
 Reason: {details['reasoning']}
 Args: {json.dumps(details['tool_args'], indent=2)}"""
@@ -152,18 +262,17 @@ Args: {json.dumps(details['tool_args'], indent=2)}"""
             return
         
         details = item.data(Qt.ItemDataRole.UserRole)
-        action_desc = f"{details['tool_name']}:{json.dumps(details['tool_args'], sort_keys=True)}"
-        action_hash = hashlib.sha256(action_desc.encode()).hexdigest()
-        
-        # Store in DB
-        db.execute_query(
-            "INSERT OR REPLACE INTO confirmations (action_hash, goal_id, action_description, approved, expiry) VALUES (?, ?, ?, ?, ?)",
-            (action_hash, details['goal_id'], action_desc, True, None) # No expiry for now
-        )
+        # Stored in DB and in the agent's in-memory cache; valid for CONFIRMATION_TTL
+        confirmation_store.approve(details['goal_id'], details['tool_name'], details['tool_args'])
         
         # Remove from list
         self.confirmations_list.takeItem(self.confirmations_list.row(item))
-        self.status_bar.showMessage("Action Approved. Click 'Start/Resume' to continue.")
+        if self.agent_thread.isRunning():
+            # Once all its calls are approved the goal runs the stored action without re-planning
+            self.agent_thread.resume_goal(details['goal_id'])
+            self.status_bar.showMessage("Action Approved. Goal resumed.")
+        else:
+            self.status_bar.showMessage("Action Approved. Click 'Start/Resume' to continue.")
 
     @pyqtSlot()
     def handle_reject(self):
@@ -172,23 +281,16 @@ Args: {json.dumps(details['tool_args'], indent=2)}"""
             return
         
         details = item.data(Qt.ItemDataRole.UserRole)
-        action_desc = f"{details['tool_name']}:{json.dumps(details['tool_args'], sort_keys=True)}"
-        action_hash = hashlib.sha256(action_desc.encode()).hexdigest()
-        
-        # Store in DB
-        db.execute_query(
-            "INSERT OR REPLACE INTO confirmations (action_hash, goal_id, action_description, approved, expiry) VALUES (?, ?, ?, ?, ?)",
-            (action_hash, details['goal_id'], action_desc, False, None)
-        )
+        confirmation_store.reject(details['goal_id'], details['tool_name'], details['tool_args'])
 
         # Log to Journal so LLM knows
-        db.execute_query(
-            "INSERT INTO journal (goal_id, action, tool_used, result, status) VALUES (?, ?, ?, ?, ?)",
-            (details['goal_id'], "User Rejected Action", details['tool_name'], "Action explicitly rejected by user", "failed")
+        seq = journal_writer.write(
+            details['goal_id'], "User Rejected Action", details['tool_name'], "Action explicitly rejected by user", "failed"
         )
         
         # Update UI Journal
         entry = {
+            "seq": seq,
             "timestamp": datetime.now().strftime("%H:%M:%S"),
             "action": "User Rejected Action",
             "tool": details['tool_name'],
@@ -197,8 +299,13 @@ Args: {json.dumps(details['tool_args'], indent=2)}"""
         }
         self.add_journal_entry(entry)
         
-        # Remove from list
-        self.confirmations_list.takeItem(self.confirmations_list.row(item))
+        # The goal re-plans, so its other pending confirmations are moot
+        for row in reversed(range(self.confirmations_list.count())):
+            if self.confirmations_list.item(row).data(Qt.ItemDataRole.UserRole)['goal_id'] == details['goal_id']:
+                self.confirmations_list.takeItem(row)
+        if self.agent_thread.isRunning():
+            # Let the planner see the rejection and choose another action
+            self.agent_thread.resume_goal(details['goal_id'])
         self.status_bar.showMessage("Action Rejected.")
 
     @pyqtSlot(dict)
@@ -209,26 +316,168 @@ Args: {json.dumps(details['tool_args'], indent=2)}"""
         elif data['status'] == 'failed':
             QMessageBox.critical(self, "Failure", "Goal Failed.")
 
+    @pyqtSlot()
+    def handle_search(self):
+        self.search_query = self.search_input.text().strip()
+        if not self.search_query:
+            self.search_results.clear()
+            self.search_results.hide()
+            self.search_detail.hide()
+            self.search_total = 0
+            self.search_label.setText("")
+            self.update_search_buttons()
+            return
+        self.search_label.setText("Searching...")
+        query = self.search_query
+        QThreadPool.globalInstance().start(lambda: self._count_search(query))
+
+    def _count_search(self, query):
+        """Runs in a pool thread: the flush commits a batch and the count can scan the index."""
+        try:
+            # Entries still in the write-behind buffer should be searchable too
+            journal_writer.flush()
+            total = journal_search.count_matches(query)
+        except Exception as e:
+            logger.error(f"Journal search failed: {e}")
+            total = 0
+        self.search_counted.emit(query, total)
+
+    @pyqtSlot(str, int)
+    def handle_search_counted(self, query, total):
+        if query != self.search_query:
+            return # Superseded by a newer search
+        self.search_total = total
+        self.show_search_page(0)
+
+    def show_search_page(self, offset):
+        offset = max(0, min(offset, max(self.search_total - 1, 0)))
+        hits = journal_search.search_journal(self.search_query, limit=self.SEARCH_PAGE_SIZE, offset=offset)
+        self.search_offset = offset
+        self.search_results.clear()
+        for hit in hits:
+            item = QListWidgetItem(f"[{hit['timestamp']}] {hit['action']} ({hit['tool_used']}): {hit['snippet']}")
+            item.setData(Qt.ItemDataRole.UserRole, hit['id'])
+            self.search_results.addItem(item)
+        self.search_results.show()
+        if self.search_total:
+            self.search_label.setText(f"{offset + 1}-{offset + len(hits)} of {self.search_total}")
+        else:
+            self.search_label.setText("No matches")
+        self.update_search_buttons()
+
+    def update_search_buttons(self):
+        self.search_prev_btn.setEnabled(self.search_offset > 0)
+        self.search_next_btn.setEnabled(self.search_offset + self.SEARCH_PAGE_SIZE < self.search_total)
+
+    def show_search_detail(self, item, previous=None):
+        if item is None:
+            self.search_detail.hide()
+            return
+        journal_id = item.data(Qt.ItemDataRole.UserRole)
+        self.search_detail.setPlainText(f"Loading entry #{journal_id}...")
+        self.search_detail.show()
+        QThreadPool.globalInstance().start(lambda: self._load_search_detail(journal_id))
+
+    def _load_search_detail(self, journal_id):
+        """Runs in a pool thread: archived entries mean an archive read and decompression."""
+        try:
+            entry = load_entry(journal_id)
+        except Exception as e:
+            logger.error(f"Failed to load journal entry {journal_id}: {e}")
+            entry = None
+        self.search_detail_loaded.emit(journal_id, entry)
+
+    @pyqtSlot(int, object)
+    def handle_search_detail_loaded(self, journal_id, entry):
+        item = self.search_results.currentItem()
+        if item is None or item.data(Qt.ItemDataRole.UserRole) != journal_id:
+            return # The selection moved on while this was loading
+        if entry is None:
+            self.search_detail.setPlainText("Entry no longer exists.")
+        else:
+            archived = " (archived)" if entry['archived'] else ""
+            self.search_detail.setPlainText(
+                f"#{entry['id']} [{entry['timestamp']}] {entry['action']} ({entry['tool_used']}, {entry['status']}){archived}\n\n"
+                f"{entry['result'] or ''}"
+            )
+        self.search_detail.show()
+
+    def show_search_hit(self, item):
+        row = self.journal_model.row_for_id(item.data(Qt.ItemDataRole.UserRole))
+        if row < 0:
+            # Newer than the current snapshot
+            self.refresh_journal()
+            row = self.journal_model.row_for_id(item.data(Qt.ItemDataRole.UserRole))
+        if row >= 0:
+            index = self.journal_model.index(row, 0)
+            self.journal_table.scrollTo(index, QTableView.ScrollHint.PositionAtCenter)
+            self.journal_table.selectRow(row)
+
+    @pyqtSlot(dict)
+    def handle_retention_finished(self, report):
+        self.refresh_journal()
+        self.status_bar.showMessage(
+            f"Journal compacted: {report['archived']} entries archived, {report['deleted']} deleted."
+        )
+
+    def refresh_metrics(self):
+        snapshot = metrics.snapshot()
+        histograms = snapshot["histograms"]
+        self.metrics_table.setRowCount(len(histograms))
+        for row, h in enumerate(histograms):
+            label = ",".join(h["labels"].values())
+            cells = [f"{h['name']}{f' [{label}]' if label else ''}", str(h["count"])]
+            cells += ["-" if h[key] is None else f"{h[key] * 1000:.1f}" for key in ("p50", "p95", "p99")]
+            for column, text in enumerate(cells):
+                item = self.metrics_table.item(row, column)
+                if item is None:
+                    self.metrics_table.setItem(row, column, QTableWidgetItem(text))
+                elif item.text() != text:
+                    item.setText(text)
+        gauges = {g["name"]: g["value"] for g in snapshot["gauges"] if not g["labels"]}
+        buckets = {g["labels"]["bucket"]: g["value"] for g in snapshot["gauges"] if g["name"] == "llm_bucket_available"}
+        breaker = {code: name for name, code in BREAKER_STATES.items()}.get(gauges.get("llm_breaker_state", 0), "?")
+        limits = {"requests_per_minute": Config.LLM_REQUESTS_PER_MINUTE, "tokens_per_minute": Config.LLM_TOKENS_PER_MINUTE}
+        left = {
+            name: "unlimited" if limit <= 0 else f"{buckets[name]:.0f}/min" if name in buckets else "-"
+            for name, limit in limits.items()
+        }
+        self.metrics_label.setText(
+            f"Steps/sec: {gauges.get('agent_steps_per_second', 0):.2f} | "
+            f"Running steps: {gauges.get('running_steps', 0):.0f} | "
+            f"Parked: {gauges.get('parked_goals', 0):.0f} | "
+            f"Journal queue: {gauges.get('journal_queue_depth', 0):.0f}\n"
+            f"LLM breaker: {breaker} | "
+            f"Requests left: {left['requests_per_minute']} | "
+            f"Tokens left: {left['tokens_per_minute']} | "
+            f"Retries: {gauges.get('llm_retries', 0):.0f}"
+        )
+
     def refresh_journal(self):
-        # Load last 50 entries
-        entries = db.fetch_all("SELECT * FROM journal ORDER BY timestamp DESC LIMIT 50")
-        self.journal_table.setRowCount(0)
-        for entry in reversed(entries): # Show oldest to newest
-            row = self.journal_table.rowCount()
-            self.journal_table.insertRow(row)
-            self.journal_table.setItem(row, 0, QTableWidgetItem(str(entry['timestamp'])))
-            self.journal_table.setItem(row, 1, QTableWidgetItem(entry['action']))
-            self.journal_table.setItem(row, 2, QTableWidgetItem(entry['tool_used']))
-            self.journal_table.setItem(row, 3, QTableWidgetItem(entry['result'][:100]))
-            self.journal_table.setItem(row, 4, QTableWidgetItem(entry['status']))
+        self.journal_model.reload()
+        self.journal_table.scrollToBottom()
 
     def refresh_confirmations(self):
-        # We don't persist pending confirmations in a "queue" table, 
-        # so this is mostly for valid session restore if we added that. 
-        # For now, list is empty on restart until agent hits them again.
-        pass
+        # Actions that were waiting for approval when the app last ran
+        for pending in confirmation_store.all_pending():
+            if confirmation_store.pending_state(pending) == "rejected":
+                continue # The goal will re-plan
+            for call in confirmation_store.waiting_calls(pending):
+                self.add_confirmation({
+                    "goal_id": pending['goal_id'],
+                    "tool_name": call['tool_name'],
+                    "tool_args": call['tool_args'],
+                    "reasoning": pending['reasoning']
+                })
 
     def closeEvent(self, event):
         self.agent_thread.stop()
         self.agent_thread.wait()
+        self.signal_bridge.stop()
+        retention_job.stop()
+        self.metrics_timer.stop()
+        metrics_recorder.stop()
+        QThreadPool.globalInstance().waitForDone() # Searches and detail loads in flight
+        journal_writer.close()
+        db.close_all()
         event.accept()
@@ -0,0 +1,103 @@
+import threading
+from typing import Dict, List, Optional
+from PyQt6.QtCore import Qt, QObject, QTimer, pyqtSignal
+
+from src.utils.config import Config
+
+class CoalescingSignalBridge(QObject):
+    """
+    Buffers AgentSignals in the agent thread and re-emits them in the GUI
+    thread in batches, at most once every UI_UPDATE_INTERVAL_MS.
+
+    Journal entries are delivered as one list per batch. Status and progress
+    messages only keep the latest value, since every update supersedes the
+    previous one. Confirmations and goal updates are rare and always
+    delivered, after the journal entries that preceded them.
+    """
+
+    log_batch = pyqtSignal(list) # Journal entries, oldest first
+    status_changed = pyqtSignal(str) # Latest status message
+    tool_progress = pyqtSignal(dict) # Latest tool progress
+    confirmation_required = pyqtSignal(dict)
+    goal_updated = pyqtSignal(dict)
+
+    def __init__(self, signals, interval_ms: Optional[int] = None, parent=None):
+        super().__init__(parent)
+        self._lock = threading.Lock()
+        self._entries: List[dict] = []
+        self._status: Optional[tuple] = None # (sequence, message)
+        self._progress: Optional[tuple] = None # (sequence, progress)
+        self._sequence = 0 # Both end up in the status bar; replay them in arrival order
+        self._events: List[tuple] = [] # (signal name, payload) for undroppable events
+        self.stats = {"received": 0, "batches": 0}
+
+        # Direct connections run in the emitting (agent) thread: no queued call per event
+        direct = Qt.ConnectionType.DirectConnection
+        signals.log_updated.connect(self._on_log, direct)
+        signals.status_changed.connect(self._on_status, direct)
+        signals.tool_progress.connect(self._on_progress, direct)
+        signals.confirmation_required.connect(self._on_confirmation, direct)
+        signals.goal_updated.connect(self._on_goal_update, direct)
+
+        # Created in the GUI thread, so the flush (and every re-emit) happens there
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval_ms if interval_ms is not None else Config.UI_UPDATE_INTERVAL_MS)
+        self._timer.timeout.connect(self.flush)
+        self._timer.start()
+
+    # --- Agent thread side ---
+
+    def _on_log(self, entry: dict):
+        with self._lock:
+            self._entries.append(entry)
+            self.stats["received"] += 1
+
+    def _on_status(self, message: str):
+        with self._lock:
+            self._sequence += 1
+            self._status = (self._sequence, message)
+            self.stats["received"] += 1
+
+    def _on_progress(self, progress: dict):
+        with self._lock:
+            self._sequence += 1
+            self._progress = (self._sequence, progress)
+            self.stats["received"] += 1
+
+    def _on_confirmation(self, details: dict):
+        with self._lock:
+            self._events.append(("confirmation_required", details))
+            self.stats["received"] += 1
+
+    def _on_goal_update(self, data: dict):
+        with self._lock:
+            self._events.append(("goal_updated", data))
+            self.stats["received"] += 1
+
+    # --- GUI thread side ---
+
+    def flush(self):
+        """Deliver everything buffered since the last flush. Called by the timer; safe to call directly."""
+        with self._lock:
+            if not (self._entries or self._status is not None or self._progress is not None or self._events):
+                return
+            entries, self._entries = self._entries, []
+            status, self._status = self._status, None
+            progress, self._progress = self._progress, None
+            events, self._events = self._events, []
+            self.stats["batches"] += 1
+
+        if entries:
+            self.log_batch.emit(entries)
+        latest = sorted(
+            item for item in ((status, self.status_changed), (progress, self.tool_progress)) if item[0] is not None
+        )
+        for (_, payload), signal in latest:
+            signal.emit(payload)
+        for name, payload in events:
+            getattr(self, name).emit(payload)
+
+    def stop(self):
+        """Stop the timer and deliver whatever is still buffered."""
+        self._timer.stop()
+        self.flush()
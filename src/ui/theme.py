@@ -45,7 +45,7 @@ class CyberTheme:
         color: {TEXT_COLOR};
         selection-background-color: {FOREGROUND};
     }}
-    QTableWidget {{
+    QTableView {{
         gridline-color: {ACCENT};
         selection-background-color: {ACCENT};
     }}
@@ -14,17 +14,136 @@ class Config:
     
     # Database
     DB_PATH = Path("njoro_ai.db")
+    DB_JOURNAL_MODE = os.getenv("DB_JOURNAL_MODE", "WAL")
+    DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL")
+    DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "20000"))
+    DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+    DB_BUSY_TIMEOUT = float(os.getenv("DB_BUSY_TIMEOUT", "5.0")) # Seconds
+
+    # Journal
+    JOURNAL_BATCH_SIZE = int(os.getenv("JOURNAL_BATCH_SIZE", "50"))
+    JOURNAL_FLUSH_INTERVAL = float(os.getenv("JOURNAL_FLUSH_INTERVAL", "0.5")) # Seconds
+
+    # Retention (background compaction job); 0 disables a limit
+    RETENTION_ENABLED = os.getenv("RETENTION_ENABLED", "true").lower() in ("1", "true", "yes")
+    RETENTION_INTERVAL = float(os.getenv("RETENTION_INTERVAL", "3600.0")) # Seconds between runs
+    RETENTION_INITIAL_DELAY = float(os.getenv("RETENTION_INITIAL_DELAY", "60.0")) # Keep startup free
+    RETENTION_MAX_AGE_DAYS = float(os.getenv("RETENTION_MAX_AGE_DAYS", "0"))
+    RETENTION_MAX_ROWS_PER_GOAL = int(os.getenv("RETENTION_MAX_ROWS_PER_GOAL", "0"))
+    RETENTION_MAX_DB_BYTES = int(os.getenv("RETENTION_MAX_DB_BYTES", "0"))
+    RETENTION_ARCHIVE_AFTER_DAYS = float(os.getenv("RETENTION_ARCHIVE_AFTER_DAYS", "7")) # Finished goals
+    RETENTION_ARCHIVE_PATH = os.getenv("RETENTION_ARCHIVE_PATH", "njoro_ai_archive.db") # Empty = delete instead
+    RETENTION_COMPRESS_MIN_BYTES = int(os.getenv("RETENTION_COMPRESS_MIN_BYTES", str(8 * 1024)))
+    RETENTION_COMPRESS_AFTER = float(os.getenv("RETENTION_COMPRESS_AFTER", "3600.0")) # Seconds since written
+    RETENTION_PREVIEW_CHARS = int(os.getenv("RETENTION_PREVIEW_CHARS", "2000")) # Kept inline (and indexed)
+    RETENTION_SIDE_FILE_BYTES = int(os.getenv("RETENTION_SIDE_FILE_BYTES", str(1024 * 1024))) # Compressed size
+    RETENTION_BLOB_DIR = Path(os.getenv("RETENTION_BLOB_DIR", ".njoro_cache/blobs"))
+    RETENTION_BATCH_ROWS = int(os.getenv("RETENTION_BATCH_ROWS", "500")) # Rows per short transaction
+    RETENTION_VACUUM_PAGES = int(os.getenv("RETENTION_VACUUM_PAGES", "1000")) # Pages freed per step
+
+    # Tools
+    TOOL_CACHE_CHECK_INTERVAL = float(os.getenv("TOOL_CACHE_CHECK_INTERVAL", "5.0")) # Seconds between data_version checks
+    MAX_PARALLEL_TOOL_CALLS = int(os.getenv("MAX_PARALLEL_TOOL_CALLS", "4"))
+    DEFAULT_TOOL_CONCURRENCY = int(os.getenv("DEFAULT_TOOL_CONCURRENCY", "4"))
+    # Per-tool overrides, e.g. "run_command=1,web_get=8"
+    TOOL_CONCURRENCY_LIMITS = os.getenv("TOOL_CONCURRENCY_LIMITS", "run_command=1,write_file=1")
+    # Memoized results of read-only tools (per goal, across goals in total)
+    TOOL_MEMO_ENABLED = os.getenv("TOOL_MEMO_ENABLED", "true").lower() in ("1", "true", "yes")
+    TOOL_MEMO_MAX_ENTRIES = int(os.getenv("TOOL_MEMO_MAX_ENTRIES", "256"))
+
+    CONFIRMATION_TTL = float(os.getenv("CONFIRMATION_TTL", str(24 * 3600))) # Seconds an approval stays valid; 0 = forever
+
+    # Files (read_file)
+    READ_FILE_MAX_BYTES = int(os.getenv("READ_FILE_MAX_BYTES", str(64 * 1024)))
+    READ_FILE_MMAP_THRESHOLD = int(os.getenv("READ_FILE_MMAP_THRESHOLD", str(1024 * 1024)))
+
+    # Commands (run_command)
+    COMMAND_TIMEOUT = float(os.getenv("COMMAND_TIMEOUT", "300.0")) # Seconds
+    COMMAND_OUTPUT_HEAD_BYTES = int(os.getenv("COMMAND_OUTPUT_HEAD_BYTES", str(16 * 1024)))
+    COMMAND_OUTPUT_TAIL_BYTES = int(os.getenv("COMMAND_OUTPUT_TAIL_BYTES", str(48 * 1024)))
+    COMMAND_PROGRESS_INTERVAL = float(os.getenv("COMMAND_PROGRESS_INTERVAL", "0.5")) # Seconds between progress updates
+
+    # HTTP (web_get)
+    HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+    HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "4"))
+    HTTP_TOTAL_TIMEOUT = float(os.getenv("HTTP_TOTAL_TIMEOUT", "30.0")) # Seconds
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10.0"))
+    HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "15.0"))
+    HTTP_MAX_BODY_BYTES = int(os.getenv("HTTP_MAX_BODY_BYTES", str(2 * 1024 * 1024)))
+    HTTP_CACHE_ENABLED = os.getenv("HTTP_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    HTTP_CACHE_DIR = Path(os.getenv("HTTP_CACHE_DIR", ".njoro_cache/http"))
+
+    # Scheduling
+    MAX_CONCURRENT_GOALS = int(os.getenv("MAX_CONCURRENT_GOALS", "3"))
+    LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "2"))
+    STEP_THROTTLE_MIN = float(os.getenv("STEP_THROTTLE_MIN", "0.0")) # Seconds between steps of one goal
+    STEP_THROTTLE_MAX = float(os.getenv("STEP_THROTTLE_MAX", "30.0")) # Backoff cap after repeated errors
+    IDLE_POLL_INTERVAL = float(os.getenv("IDLE_POLL_INTERVAL", "30.0")) # Safety net for goals added outside the UI
     
     # Gemini API
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
     GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "gemini-2.0-flash")
+    LLM_STREAMING = os.getenv("LLM_STREAMING", "true").lower() in ("1", "true", "yes")
+
+    # LLM backend: "gemini" or "scripted" (offline, deterministic)
+    LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+    LLM_SCRIPT_PATH = os.getenv("LLM_SCRIPT_PATH") # JSONL responses for the scripted backend
+    LLM_SCRIPTED_LATENCY = float(os.getenv("LLM_SCRIPTED_LATENCY", "0.0")) # Simulated seconds per call
+    LLM_BATCH_WINDOW = float(os.getenv("LLM_BATCH_WINDOW", "0.0")) # Seconds to collect prompts into a batch
+
+    # LLM rate limiting and retries (a per-minute limit of 0 turns that limit off)
+    LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "60"))
+    LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "1000000"))
+    LLM_EXPECTED_OUTPUT_TOKENS = int(os.getenv("LLM_EXPECTED_OUTPUT_TOKENS", "300"))
+    LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "4"))
+    LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "1.0")) # Seconds
+    LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "30.0"))
+    LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5")) # Consecutive failures
+    LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "60.0")) # Seconds the breaker stays open
+
+    # Prompt
+    PROMPT_RECENT_ENTRIES = int(os.getenv("PROMPT_RECENT_ENTRIES", "5"))
+    PROMPT_RESULT_TOKENS = int(os.getenv("PROMPT_RESULT_TOKENS", "500")) # Per journal result
+    PROMPT_SUMMARY_TOKENS = int(os.getenv("PROMPT_SUMMARY_TOKENS", "400"))
+    PROMPT_CHARS_PER_TOKEN = 4
+
+    # Plan cache
+    PLAN_CACHE_ENABLED = os.getenv("PLAN_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    PLAN_CACHE_TTL = float(os.getenv("PLAN_CACHE_TTL", str(24 * 3600))) # Seconds
+    PLAN_CACHE_MAX_ENTRIES = int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "1000"))
+
+    # Metrics
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+    METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", "1024")) # Recent samples per histogram
+    METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "15.0")) # Seconds
+    METRICS_RETENTION = float(os.getenv("METRICS_RETENTION", str(24 * 3600))) # Seconds of history kept
+    METRICS_EXPORT_PATH = os.getenv("METRICS_EXPORT_PATH", ".njoro_cache/metrics.prom") # Empty = no export
+
+    # UI
+    UI_UPDATE_INTERVAL_MS = int(os.getenv("UI_UPDATE_INTERVAL_MS", "50")) # Batch window for agent events
+    METRICS_PANEL_INTERVAL_MS = int(os.getenv("METRICS_PANEL_INTERVAL_MS", "1000"))
     
     # Logging
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
     LOG_FILE = Path("njoro_ai.log")
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "text") # "text" or "json" (one JSON object per line)
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000")) # Records waiting for the writer thread; more are dropped
+    LOG_MAX_VALUE_CHARS = int(os.getenv("LOG_MAX_VALUE_CHARS", "200")) # Per logged argument/result value
+    LOG_RATE_LIMIT = int(os.getenv("LOG_RATE_LIMIT", "50")) # Records per call site per window; 0 = unlimited
+    LOG_RATE_WINDOW = float(os.getenv("LOG_RATE_WINDOW", "10.0")) # Seconds
+
+    @classmethod
+    def tool_concurrency_limits(cls) -> dict:
+        """Parse TOOL_CONCURRENCY_LIMITS into a {tool_name: limit} dict."""
+        limits = {}
+        for item in cls.TOOL_CONCURRENCY_LIMITS.split(","):
+            if "=" in item:
+                name, value = item.split("=", 1)
+                limits[name.strip()] = int(value)
+        return limits
 
     @classmethod
     def validate(cls):
         """Validate critical configuration."""
-        if not cls.GEMINI_API_KEY:
+        if cls.LLM_BACKEND == "gemini" and not cls.GEMINI_API_KEY:
             raise ValueError("GEMINI_API_KEY environment variable is not set.")
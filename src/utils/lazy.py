@@ -0,0 +1,40 @@
+import threading
+from typing import Any, Callable
+
+class LazyProxy:
+    """
+    Stands in for a module-level singleton and builds it on first use.
+
+    `from module import instance` keeps working everywhere, but the real
+    object (and whatever heavy imports or I/O its constructor does) is only
+    created the first time an attribute is read or set.
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _resolve(self) -> Any:
+        instance = object.__getattribute__(self, "_instance")
+        if instance is None:
+            with object.__getattribute__(self, "_lock"):
+                instance = object.__getattribute__(self, "_instance")
+                if instance is None:
+                    instance = object.__getattribute__(self, "_factory")()
+                    object.__setattr__(self, "_instance", instance)
+        return instance
+
+    def is_initialized(self) -> bool:
+        return object.__getattribute__(self, "_instance") is not None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._resolve(), name)
+
+    def __setattr__(self, name: str, value: Any):
+        setattr(self._resolve(), name, value)
+
+    def __repr__(self) -> str:
+        if self.is_initialized():
+            return repr(self._resolve())
+        return f"<LazyProxy for {object.__getattribute__(self, '_factory')!r} (not initialized)>"
@@ -1,49 +1,171 @@
+import atexit
+import json
 import logging
+import queue
 import sys
-from pathlib import Path
-from logging.handlers import RotatingFileHandler
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, Optional
+from src.utils.config import Config
 
-def setup_logger(name: str = "njoro_ai", log_file: str = "njoro_ai.log", level: str = "INFO") -> logging.Logger:
+# LogRecord attributes that are not `extra` fields
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+def truncate(value: Any, limit: Optional[int] = None) -> str:
+    """Render `value` for a log line, cut to `limit` characters (LOG_MAX_VALUE_CHARS by default)."""
+    limit = Config.LOG_MAX_VALUE_CHARS if limit is None else limit
+    text = value if isinstance(value, str) else repr(value)
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text) - limit} more chars]"
+
+def format_args(kwargs: Dict[str, Any], limit: Optional[int] = None) -> str:
+    """Tool arguments for a log line, each value truncated (file bodies can be megabytes)."""
+    return "{" + ", ".join(f"{key!r}: {truncate(value, limit)}" for key, value in kwargs.items()) + "}"
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, thread, plus any `extra` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets at most `limit` records per call site through every `window` seconds.
+
+    Messages are built with f-strings, so repeats are recognised by where they
+    are logged from rather than by their text. When a window with suppressed
+    records ends, the next record from that site notes how many were dropped.
+    """
+
+    def __init__(self, limit: int, window: float):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self._lock = threading.Lock()
+        self._sites: Dict[tuple, list] = {} # (path, line) -> [window start, count, suppressed]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.limit <= 0:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None or now - site[0] >= self.window:
+                suppressed = site[2] if site else 0
+                self._sites[key] = [now, 1, 0]
+                if suppressed:
+                    record.msg = f"{record.getMessage()} [{suppressed} similar messages suppressed]"
+                    record.args = None
+                return True
+            site[1] += 1
+            if site[1] <= self.limit:
+                return True
+            site[2] += 1
+            return False
+
+class _DroppingQueueHandler(QueueHandler):
+    """Never blocks the caller: if the listener falls behind and the queue is full, the record is dropped."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel) # Wait for room rather than fail on a full queue at shutdown
+
+_listener: Optional[QueueListener] = None
+
+def setup_logger(name: str = "njoro_ai", log_file: str = "njoro_ai.log", level: str = "INFO",
+                 fmt: str = "text") -> logging.Logger:
     """
     Sets up a logger with both console and file handlers.
-    
+
+    Records are put on a bounded queue and written by a background listener
+    thread, so logging calls never do I/O on the calling thread (e.g. the agent
+    event loop). The listener is flushed and stopped at interpreter exit.
+
     Args:
         name: Name of the logger.
         log_file: Path to the log file.
         level: Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL).
-        
+        fmt: "text" for the classic line format, "json" for JSON lines.
+
     Returns:
         Configured logger instance.
     """
+    global _listener
     logger = logging.getLogger(name)
     logger.setLevel(level)
-    
+
     # Avoid duplicate handlers if logger is already configured
     if logger.handlers:
         return logger
 
     # Formatter
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
+    if fmt == "json":
+        formatter = JsonFormatter(datefmt='%Y-%m-%dT%H:%M:%S')
+    else:
+        formatter = logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        )
 
     # File Handler (Rotating)
     file_handler = RotatingFileHandler(
-        log_file, 
+        log_file,
         maxBytes=5*1024*1024, # 5MB
         backupCount=3,
         encoding='utf-8'
     )
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
 
     # Console Handler
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+
+    # Both handlers run on the listener thread
+    queue_handler = _DroppingQueueHandler(queue.Queue(Config.LOG_QUEUE_SIZE))
+    queue_handler.addFilter(RateLimitFilter(Config.LOG_RATE_LIMIT, Config.LOG_RATE_WINDOW))
+    logger.addHandler(queue_handler)
+
+    _listener = _Listener(queue_handler.queue, file_handler, console_handler)
+    _listener.start()
+    atexit.register(stop_logging)
 
     return logger
 
+def stop_logging():
+    """Write out queued records and stop the listener thread. Safe to call more than once."""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
 # Default logger instance
-logger = setup_logger()
+logger = setup_logger(log_file=str(Config.LOG_FILE), level=Config.LOG_LEVEL, fmt=Config.LOG_FORMAT)
@@ -0,0 +1,247 @@
+import json
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from src.utils.config import Config
+from src.utils.logger import logger
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+class Histogram:
+    """Latency samples: lifetime count/sum plus the last METRICS_WINDOW samples for percentiles."""
+
+    def __init__(self, window: int):
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.samples.append(value)
+        self.count += 1
+        self.sum += value
+
+    def percentiles(self, *quantiles: float) -> List[Optional[float]]:
+        ordered = sorted(self.samples)
+        if not ordered:
+            return [None] * len(quantiles)
+        # Nearest-rank
+        return [ordered[max(0, math.ceil(q * len(ordered)) - 1)] for q in quantiles]
+
+class Metrics:
+    """
+    In-process metrics for the agent: histograms (seconds), counters and gauges, each keyed by
+    name and labels. Recording is a dict lookup under a lock, so it is cheap enough for every
+    step and tool call.
+    """
+
+    QUANTILES = (0.5, 0.95, 0.99)
+    RATE_WINDOW = 60.0 # Seconds of step completions used for steps/sec
+
+    def __init__(self, window: int = Config.METRICS_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._gauges: Dict[Tuple[str, Labels], float] = {}
+        self._events: Dict[str, Deque[float]] = {} # Name -> recent event times, for rates
+        self._first_event: Dict[str, float] = {}
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.window)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Observe the wall time of the block under `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[(name, _labels(labels))] = value
+
+    def mark(self, name: str):
+        """Record an event for rate(): e.g. one completed agent step."""
+        now = time.monotonic()
+        with self._lock:
+            events = self._events.setdefault(name, deque())
+            self._first_event.setdefault(name, now)
+            events.append(now)
+            while events and now - events[0] > self.RATE_WINDOW:
+                events.popleft()
+
+    def rate(self, name: str) -> float:
+        """Events per second over the last RATE_WINDOW seconds."""
+        now = time.monotonic()
+        with self._lock:
+            events = self._events.get(name)
+            if not events:
+                return 0.0
+            while events and now - events[0] > self.RATE_WINDOW:
+                events.popleft()
+            # Until a full window has passed, average over the time since the first event
+            span = min(self.RATE_WINDOW, max(now - self._first_event[name], 1.0))
+            return len(events) / span
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._gauges.clear()
+            self._events.clear()
+            self._first_event.clear()
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Current values: histograms with p50/p95/p99, counters, and gauges (including rates)."""
+        with self._lock:
+            histograms = [(key, h.count, h.sum, list(h.samples)) for key, h in self._histograms.items()]
+            counters = list(self._counters.items())
+            gauges = list(self._gauges.items())
+            rate_names = list(self._events)
+
+        result = {"histograms": [], "counters": [], "gauges": []}
+        for (name, labels), count, total, samples in sorted(histograms):
+            window = Histogram(self.window)
+            window.samples.extend(samples)
+            p50, p95, p99 = window.percentiles(*self.QUANTILES)
+            result["histograms"].append({
+                "name": name, "labels": dict(labels), "count": count, "sum": total, "p50": p50, "p95": p95, "p99": p99
+            })
+        for (name, labels), value in sorted(counters):
+            result["counters"].append({"name": name, "labels": dict(labels), "value": value})
+        for (name, labels), value in sorted(gauges):
+            result["gauges"].append({"name": name, "labels": dict(labels), "value": value})
+        for name in sorted(rate_names):
+            result["gauges"].append({"name": f"{name}_per_second", "labels": {}, "value": self.rate(name)})
+        return result
+
+    def to_prometheus(self, snapshot: Optional[Dict[str, Any]] = None, prefix: str = "njoro_") -> str:
+        """Render a snapshot in the Prometheus text exposition format (histograms as summaries)."""
+        snapshot = snapshot or self.snapshot()
+        lines: List[str] = []
+        typed = set()
+
+        def declare(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        def render(labels, **extra):
+            items = {**labels, **extra}
+            if not items:
+                return ""
+            escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in items.values())
+            return "{" + ",".join(f'{k}="{v}"' for k, v in zip(items, escaped)) + "}"
+
+        for h in snapshot["histograms"]:
+            name = prefix + h["name"]
+            declare(name, "summary")
+            for quantile, key in zip(self.QUANTILES, ("p50", "p95", "p99")):
+                if h[key] is not None:
+                    lines.append(f"{name}{render(h['labels'], quantile=quantile)} {h[key]:.6f}")
+            lines.append(f"{name}_sum{render(h['labels'])} {h['sum']:.6f}")
+            lines.append(f"{name}_count{render(h['labels'])} {h['count']}")
+        for c in snapshot["counters"]:
+            name = prefix + c["name"]
+            declare(name, "counter")
+            lines.append(f"{name}{render(c['labels'])} {c['value']}")
+        for g in snapshot["gauges"]:
+            name = prefix + g["name"]
+            declare(name, "gauge")
+            lines.append(f"{name}{render(g['labels'])} {g['value']}")
+        return "\n".join(lines) + "\n"
+
+class MetricsRecorder:
+    """
+    Background thread that every METRICS_FLUSH_INTERVAL seconds stores a snapshot in the rolling
+    `metrics` table (rows older than METRICS_RETENTION are dropped) and rewrites the Prometheus
+    text file at METRICS_EXPORT_PATH.
+    """
+
+    def __init__(self, source: Metrics):
+        self.metrics = source
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def start(self):
+        if not Config.METRICS_ENABLED or (self._thread and self._thread.is_alive()):
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="MetricsRecorder", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the thread after a final flush."""
+        self._stop_event.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(5.0)
+        self._thread = None
+
+    def _run(self):
+        from src.persistence.database import db
+        try:
+            while not self._stop_event.wait(Config.METRICS_FLUSH_INTERVAL):
+                self.flush()
+            self.flush()
+        finally:
+            db.close_connection()
+
+    def flush(self):
+        snapshot = self.metrics.snapshot()
+        try:
+            self.persist(snapshot)
+        except Exception as e:
+            logger.error(f"Failed to store metrics: {e}")
+        if Config.METRICS_EXPORT_PATH:
+            try:
+                self.export(snapshot)
+            except OSError as e:
+                logger.error(f"Failed to export metrics: {e}")
+
+    def persist(self, snapshot: Dict[str, Any]):
+        from src.persistence.database import db
+        now = time.time()
+        rows = []
+        for h in snapshot["histograms"]:
+            rows.append((now, h["name"], json.dumps(h["labels"], sort_keys=True), "histogram",
+                         h["count"], h["sum"], h["p50"], h["p95"], h["p99"]))
+        for kind in ("counters", "gauges"):
+            for m in snapshot[kind]:
+                rows.append((now, m["name"], json.dumps(m["labels"], sort_keys=True), kind[:-1],
+                             None, m["value"], None, None, None))
+        if rows:
+            db.execute_many(
+                "INSERT INTO metrics (ts, name, labels, kind, count, value, p50, p95, p99) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+        db.execute_query("DELETE FROM metrics WHERE ts < ?", (now - Config.METRICS_RETENTION,))
+
+    def export(self, snapshot: Dict[str, Any]):
+        path = Path(Config.METRICS_EXPORT_PATH)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(self.metrics.to_prometheus(snapshot), encoding="utf-8")
+        tmp.replace(path) # Scrapers never see a half-written file
+
+# Global metrics registry and its recorder (started by the main window)
+metrics = Metrics()
+metrics_recorder = MetricsRecorder(metrics)
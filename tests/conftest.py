@@ -0,0 +1,24 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.utils.config import Config
+
+@pytest.fixture
+def scratch_db(tmp_path, monkeypatch):
+    """Point the global DatabaseManager at an empty database for the test."""
+    from src.persistence.database import db
+    from src.persistence.journal import journal_writer
+
+    monkeypatch.setattr(Config, "DB_PATH", tmp_path / "njoro_ai.db")
+    monkeypatch.setattr(Config, "RETENTION_ENABLED", False)
+    monkeypatch.setattr(Config, "METRICS_ENABLED", False)
+    db.close_all()
+    db.db_path = Config.DB_PATH
+    db.init_db()
+    yield db
+    journal_writer.close()
+    db.close_all()
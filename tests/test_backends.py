@@ -0,0 +1,79 @@
+"""CoalescingBackend sharing identical in-flight prompts on both paths."""
+import asyncio
+
+import pytest
+
+from src.agent.backends import CoalescingBackend, ScriptedBackend
+
+class Trickle(ScriptedBackend):
+    """Streams its chunks with a pause between each, like a slow upstream."""
+
+    async def stream(self, prompt):
+        async for chunk in super().stream(prompt):
+            await asyncio.sleep(0.01)
+            yield chunk
+
+async def _collect(backend, prompt):
+    return [chunk async for chunk in backend.stream(prompt)]
+
+def test_identical_streams_share_one_upstream_call():
+    inner = ScriptedBackend(["first answer", "second answer"], latency=0.05, chunk_size=4)
+    backend = CoalescingBackend(inner)
+    assert backend.supports_streaming
+
+    async def run():
+        return await asyncio.gather(*(_collect(backend, "same prompt") for _ in range(3)))
+
+    results = asyncio.run(run())
+    assert inner.calls == 1
+    assert all("".join(chunks) == "first answer" for chunks in results)
+    assert backend.stats["coalesced"] == 2
+
+def test_late_follower_replays_buffered_chunks():
+    inner = Trickle(["abcdefghijkl"], chunk_size=3)
+    backend = CoalescingBackend(inner)
+
+    async def run():
+        first = backend.stream("p")
+        head = [await first.__anext__()]
+        late = asyncio.ensure_future(_collect(backend, "p"))
+        head += [chunk async for chunk in first]
+        return head, await late
+
+    head, late = asyncio.run(run())
+    assert inner.calls == 1
+    assert head == late == ["abc", "def", "ghi", "jkl"]
+
+def test_stream_error_reaches_every_caller_and_is_not_cached():
+    class Failing(ScriptedBackend):
+        async def stream(self, prompt):
+            self.calls += 1
+            await asyncio.sleep(0.01)
+            raise TimeoutError("upstream timed out")
+            yield
+
+    inner = Failing(["unused"])
+    backend = CoalescingBackend(inner)
+
+    async def run():
+        return await asyncio.gather(_collect(backend, "p"), _collect(backend, "p"), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert inner.calls == 1 and all(isinstance(r, TimeoutError) for r in results)
+    with pytest.raises(TimeoutError):
+        asyncio.run(_collect(backend, "p"))
+    assert inner.calls == 2
+
+def test_abandoned_reader_does_not_cut_off_the_others():
+    inner = ScriptedBackend(["abcdefghijkl"], latency=0.02, chunk_size=3)
+    backend = CoalescingBackend(inner)
+
+    async def run():
+        quitter = asyncio.ensure_future(_collect(backend, "p"))
+        stayer = asyncio.ensure_future(_collect(backend, "p"))
+        await asyncio.sleep(0)
+        quitter.cancel()
+        return await stayer
+
+    assert "".join(asyncio.run(run())) == "abcdefghijkl"
+    assert inner.calls == 1
@@ -0,0 +1,92 @@
+"""JournalTableModel keyset paging returns the same rows as plain OFFSET paging."""
+import random
+
+from src.ui.journal_model import JournalTableModel
+
+def _fill(db, n):
+    db.execute_query("INSERT INTO goals (description, status) VALUES ('g', 'active')")
+    db.execute_many(
+        "INSERT INTO journal (goal_id, action, tool_used, result, status) VALUES (1, ?, 't', 'r', 'success')",
+        [(f"step {i}",) for i in range(n)]
+    )
+    # Retention leaves gaps in the ids
+    db.execute_query("DELETE FROM journal WHERE id % 7 = 0 OR id BETWEEN 300 AND 650")
+
+def test_pages_match_offset_order_in_any_access_order(scratch_db):
+    _fill(scratch_db, 3000)
+    expected = [r['action'] for r in scratch_db.fetch_all("SELECT action FROM journal ORDER BY id")]
+    model = JournalTableModel()
+    assert model.rowCount() == len(expected)
+
+    rows = list(range(len(expected)))
+    random.Random(7).shuffle(rows)
+    # Tail first (as after refresh_journal), then random jumps, with pages evicted along the way
+    for row in [len(expected) - 1, 0] + rows:
+        assert model.data(model.index(row, 1)) == expected[row]
+
+def test_tail_page_does_not_depend_on_offset(scratch_db):
+    _fill(scratch_db, 1000)
+    model = JournalTableModel()
+    last = model.rowCount() - 1
+    statements = []
+    with scratch_db.get_connection() as conn:
+        conn.set_trace_callback(statements.append)
+        model.data(model.index(last, 1))
+        conn.set_trace_callback(None)
+    assert any("ORDER BY id DESC LIMIT" in s and s.rstrip().endswith("OFFSET 0") for s in statements)
+
+def _write(n, start=0):
+    from src.persistence.journal import journal_writer
+    entries = []
+    for i in range(start, start + n):
+        seq = journal_writer.write(1, f"live {i}", "t", "r", "success")
+        entries.append({"seq": seq, "timestamp": "00:00:00", "action": f"live {i}", "tool": "t", "result": "r", "status": "success"})
+    return entries
+
+def _actions(model):
+    return [model.data(model.index(row, 1)) for row in range(model.rowCount())]
+
+def test_entries_already_in_the_snapshot_are_not_added_twice(scratch_db):
+    from src.persistence.journal import journal_writer
+
+    _fill(scratch_db, 20)
+    model = JournalTableModel()
+    entries = _write(3)
+    model.append_entries(entries[:1]) # Delivered before the reload
+    journal_writer.flush()
+    model.reload() # Snapshot includes all three; two are still in the signal bridge
+    model.append_entries(entries[1:])
+    expected = [r['action'] for r in scratch_db.fetch_all("SELECT action FROM journal ORDER BY id")]
+    assert _actions(model) == expected
+
+def test_unpersisted_live_rows_survive_a_reload(scratch_db):
+    from src.persistence.journal import journal_writer
+
+    model = JournalTableModel()
+    ahead = {"seq": journal_writer.persisted_seq + 1000, "timestamp": "00:00:00", "action": "not written yet",
+             "tool": "t", "result": "r", "status": "success"}
+    model.append_entries([ahead])
+    model.reload()
+    assert _actions(model)[-1] == "not written yet"
+
+def test_folding_live_rows_keeps_a_running_count(scratch_db):
+    from src.persistence.journal import journal_writer
+
+    _fill(scratch_db, 1000)
+    model = JournalTableModel()
+    model.MAX_LIVE_ROWS = 5
+    model.data(model.index(model.rowCount() - 1, 1)) # Cache the tail page
+    entries = _write(23)
+    journal_writer.flush()
+
+    statements = []
+    with scratch_db.get_connection() as conn:
+        conn.set_trace_callback(statements.append)
+        for i in range(0, len(entries), 4):
+            model.append_entries(entries[i:i + 4])
+        conn.set_trace_callback(None)
+    assert not any("COUNT(" in s for s in statements)
+    assert len(model._live) <= model.MAX_LIVE_ROWS
+
+    expected = [r['action'] for r in scratch_db.fetch_all("SELECT action FROM journal ORDER BY id")]
+    assert _actions(model) == expected
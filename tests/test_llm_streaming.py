@@ -0,0 +1,149 @@
+"""Streaming planner against a fake streaming model (ScriptedBackend with small chunks)."""
+import asyncio
+
+from src.agent.backends import ScriptedBackend
+from src.agent.llm_client import LLMClient
+
+def _client(response, chunk_size=7):
+    client = LLMClient(ScriptedBackend([response], chunk_size=chunk_size))
+    client.plan_cache = None
+    return client
+
+def _plan(client, events):
+    async def run():
+        plan = await client.plan_action(
+            "goal", [], {}, on_reasoning=lambda text: events.append(("reasoning", text))
+        )
+        events.append(("dispatch", dict(plan)))
+        await asyncio.gather(*client._background) # Let the drained stream finish
+        return plan
+    return asyncio.run(run())
+
+def test_reasoning_streams_before_dispatch():
+    events = []
+    plan = _plan(_client({
+        "reasoning": "Write the report first.",
+        "action": "tool_use",
+        "tool_calls": [{"tool_name": "write_file", "tool_args": {"path": "r.txt", "content": "x"}}],
+    }), events)
+
+    kinds = [kind for kind, _ in events]
+    assert kinds.index("reasoning") < kinds.index("dispatch")
+    assert len([k for k in kinds if k == "reasoning"]) > 1 # Streamed in several updates
+    assert plan["reasoning"] == "Write the report first."
+
+def test_confirmed_call_waits_for_reasoning_even_if_it_comes_last():
+    events = []
+    _plan(_client({
+        "action": "tool_use",
+        "tool_calls": [{"tool_name": "write_file", "tool_args": {"path": "r.txt", "content": "x"}}],
+        "reasoning": "Reasoning sent after the calls.",
+    }), events)
+
+    dispatched = next(plan for kind, plan in events if kind == "dispatch")
+    assert dispatched["reasoning"] == "Reasoning sent after the calls."
+
+def test_safe_call_dispatches_before_trailing_reasoning():
+    events = []
+    _plan(_client({
+        "action": "tool_use",
+        "tool_calls": [{"tool_name": "read_file", "tool_args": {"path": "r.txt"}}],
+        "reasoning": "A long explanation that arrives after the call. " * 20,
+    }), events)
+
+    dispatched = next(plan for kind, plan in events if kind == "dispatch")
+    assert "reasoning" not in dispatched # Read-only calls do not wait for it
+
+def test_prompt_asks_for_reasoning_first():
+    prompt = _client({"action": "finish", "reasoning": "done"})._construct_prompt("goal", [], {})
+    schema = prompt[prompt.index("The JSON schema is:"):]
+    assert schema.index('"reasoning"') < schema.index('"action"') < schema.index('"tool_calls"')
+
+def test_confirmation_payload_and_pending_row_carry_reasoning(scratch_db, monkeypatch):
+    from src.agent import loop
+    from src.agent.confirmations import confirmation_store
+
+    client = _client({
+        "action": "tool_use",
+        "tool_calls": [{"tool_name": "write_file", "tool_args": {"path": "r.txt", "content": "x"}}],
+        "reasoning": "Needs a report file.",
+    })
+    monkeypatch.setattr(loop, "llm_client", client)
+    scratch_db.execute_query("INSERT INTO goals (description, status) VALUES ('write a report', 'active')")
+    goal = scratch_db.fetch_one("SELECT * FROM goals")
+
+    agent = loop.AgentThread()
+    requested = []
+    agent.signals.confirmation_required.connect(requested.append)
+
+    async def step():
+        agent._loop = asyncio.get_running_loop()
+        await agent._run_goal_step(goal)
+    asyncio.run(step())
+
+    assert [r["reasoning"] for r in requested] == ["Needs a report file."]
+    assert confirmation_store.load_pending(goal["id"])["reasoning"] == "Needs a report file."
+
+class SlowStream(ScriptedBackend):
+    """Streams small chunks with a pause between them and records when the response is over."""
+
+    def __init__(self, response):
+        super().__init__([response], chunk_size=16)
+        self.finished = False
+
+    async def stream(self, prompt):
+        chunks = [chunk async for chunk in super().stream(prompt)]
+        for i, chunk in enumerate(chunks):
+            await asyncio.sleep(0.002)
+            self.finished = i == len(chunks) - 1
+            yield chunk
+
+TWO_READS = {
+    "reasoning": "Read both files.",
+    "action": "tool_use",
+    "tool_calls": [
+        {"tool_name": "read_file", "tool_args": {"path": "a.txt"}, "independent": True},
+        {"tool_name": "read_file", "tool_args": {"path": "b.txt" + " " * 200}, "independent": True},
+    ],
+}
+
+def test_first_call_dispatches_before_the_stream_ends():
+    backend = SlowStream(TWO_READS)
+    client = LLMClient(backend)
+    client.plan_cache = None
+
+    async def run():
+        plan = await client.plan_action("goal", [], {})
+        at_dispatch = (backend.finished, len(plan["tool_calls"]))
+        calls = [call async for call in client.iter_tool_calls(plan)]
+        return at_dispatch, calls, backend.finished
+
+    (finished, dispatched), calls, finished_after = asyncio.run(run())
+    assert not finished and dispatched == 1
+    assert [c["tool_args"]["path"].strip() for c in calls] == ["a.txt", "b.txt"]
+    assert finished_after
+
+def test_agent_runs_first_call_while_later_calls_stream(scratch_db, monkeypatch):
+    from src.agent import loop
+
+    backend = SlowStream(TWO_READS)
+    client = LLMClient(backend)
+    client.plan_cache = None
+    monkeypatch.setattr(loop, "llm_client", client)
+    scratch_db.execute_query("INSERT INTO goals (description, status) VALUES ('read', 'active')")
+    goal = scratch_db.fetch_one("SELECT * FROM goals")
+
+    agent = loop.AgentThread()
+    started = []
+    async def fake_run(goal_id, call, semaphore):
+        started.append((call["tool_args"]["path"].strip(), backend.finished))
+        return "success"
+    monkeypatch.setattr(agent, "_run_tool_call", fake_run)
+
+    async def step():
+        agent._loop = asyncio.get_running_loop()
+        await agent._run_goal_step(goal)
+    asyncio.run(step())
+
+    # Each call starts as soon as its element is complete, before the response is over
+    assert started == [("a.txt", False), ("b.txt", False)]
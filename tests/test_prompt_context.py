@@ -0,0 +1,41 @@
+"""PromptBuilder.context_for stays an index range scan however long the goal's journal is."""
+from src.agent.prompt import prompt_builder
+
+def test_context_query_uses_goal_id_index(scratch_db):
+    with scratch_db.get_connection() as conn:
+        plan = " ".join(row[3] for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM journal WHERE goal_id = ? AND id > ? ORDER BY id", (1, 0)
+        ))
+    assert "idx_journal_goal_id" in plan
+    assert "TEMP B-TREE" not in plan
+
+def test_context_only_reads_entries_after_the_summary(scratch_db):
+    scratch_db.execute_query("INSERT INTO goals (description, status) VALUES ('g', 'active')")
+    scratch_db.execute_many(
+        "INSERT INTO journal (goal_id, action, tool_used, result, status) VALUES (1, ?, 't', 'r', 'success')",
+        [(f"step {i}",) for i in range(50)]
+    )
+    first = prompt_builder.context_for(1)
+    again = prompt_builder.context_for(1)
+    assert [e['id'] for e in first.recent] == [e['id'] for e in again.recent]
+    assert first.recent[-1]['action'] == "step 49"
+
+def test_history_sees_queued_entries_without_flushing_on_the_loop(scratch_db, monkeypatch):
+    import asyncio
+    import threading
+
+    from src.agent.loop import AgentThread
+    from src.persistence.journal import journal_writer
+
+    flush_threads = []
+    flush = journal_writer.flush
+    def recording_flush():
+        flush_threads.append(threading.current_thread())
+        return flush()
+    monkeypatch.setattr(journal_writer, "flush", recording_flush)
+
+    scratch_db.execute_query("INSERT INTO goals (description, status) VALUES ('g', 'active')")
+    journal_writer.write(1, "queued step", "t", "r", "success")
+    context = asyncio.run(AgentThread()._get_recent_history(1))
+    assert [e['action'] for e in context.recent] == ["queued step"]
+    assert flush_threads and threading.main_thread() not in flush_threads
@@ -0,0 +1,88 @@
+"""Circuit breaker half-open behaviour and the limiter gauges."""
+import asyncio
+
+from src.agent.backends import LLMBackend
+from src.agent.llm_client import LLMClient
+from src.agent.rate_limit import CircuitBreaker, TokenBucket
+from src.utils.config import Config
+from src.utils.metrics import metrics
+
+class FlakyBackend(LLMBackend):
+    """Fails with a timeout until `healthy` is set; each call takes `latency` seconds."""
+
+    model_name = "flaky"
+    supports_streaming = False
+
+    def __init__(self, latency=0.05):
+        self.latency = latency
+        self.healthy = False
+        self.calls = 0
+
+    async def generate(self, prompt):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if not self.healthy:
+            raise TimeoutError("upstream timed out")
+        return '{"reasoning": "ok", "action": "finish"}'
+
+def test_half_open_admits_a_single_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow() # Trial in flight
+    breaker.end_trial()
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow() and breaker.allow()
+
+def test_concurrent_planners_send_one_trial_call(monkeypatch):
+    monkeypatch.setattr(Config, "LLM_MAX_ATTEMPTS", 1)
+    monkeypatch.setattr(Config, "LLM_BREAKER_THRESHOLD", 1)
+    monkeypatch.setattr(Config, "LLM_BREAKER_RESET", 0.2)
+    backend = FlakyBackend()
+    client = LLMClient(backend)
+    client.plan_cache = None
+
+    async def run():
+        first = await client.plan_action("goal", [], {})
+        assert first["action"] == "wait" and client.guard.breaker.state == "open"
+        await asyncio.sleep(0.25) # Half-open
+        backend.healthy = True
+        calls_before = backend.calls
+        plans = await asyncio.gather(*(client.plan_action(f"goal {i}", [], {}) for i in range(4)))
+        return backend.calls - calls_before, plans
+
+    trial_calls, plans = asyncio.run(run())
+    assert trial_calls == 1
+    assert sorted(p["action"] for p in plans) == ["finish", "wait", "wait", "wait"]
+    assert client.guard.breaker.state == "closed"
+
+def test_limiter_state_is_published_as_gauges():
+    metrics.reset()
+    client = LLMClient(FlakyBackend(latency=0))
+    client.plan_cache = None
+    client.guard.breaker.failure_threshold = 1
+    asyncio.run(client.plan_action("goal", [], {}))
+
+    gauges = {(g["name"], g["labels"].get("bucket")): g["value"] for g in metrics.snapshot()["gauges"]}
+    assert gauges[("llm_breaker_state", None)] == 2 # open
+    assert gauges[("llm_failures", None)] >= 1
+    assert gauges[("llm_bucket_available", "requests_per_minute")] < client.guard.requests.capacity
+    assert ("llm_retries", None) in gauges
+
+def test_zero_rate_means_unlimited(monkeypatch):
+    bucket = TokenBucket(0)
+    async def take_many():
+        for _ in range(1000):
+            await bucket.acquire(500)
+    asyncio.run(asyncio.wait_for(take_many(), timeout=1))
+    assert bucket.state() == {"available": None, "capacity": None, "waited_s": 0.0}
+
+    monkeypatch.setattr(Config, "LLM_REQUESTS_PER_MINUTE", 0)
+    metrics.reset()
+    client = LLMClient(FlakyBackend(latency=0))
+    client.plan_cache = None
+    client.publish_limiter_state()
+    buckets = {g["labels"]["bucket"] for g in metrics.snapshot()["gauges"] if g["name"] == "llm_bucket_available"}
+    assert buckets == {"tokens_per_minute"}
@@ -0,0 +1,34 @@
+"""read_file accepts range arguments as LLM JSON sends them and rejects unusable ranges."""
+import asyncio
+
+import pytest
+
+from src.tools.builtin import read_file
+
+@pytest.fixture
+def lines_file(tmp_path):
+    path = tmp_path / "lines.txt"
+    path.write_text("".join(f"line {i}\n" for i in range(1, 11)))
+    return path
+
+def _read(path, **kwargs):
+    return asyncio.run(read_file(str(path), **kwargs))
+
+def test_string_arguments_are_coerced(lines_file):
+    assert _read(lines_file, start_line="2", end_line="3").endswith("line 2\nline 3\n")
+    assert _read(lines_file, offset="7", length="6").endswith("line 2")
+    assert _read(lines_file, tail="1").endswith("line 10\n")
+    assert _read(lines_file, start_line="2", end_line="3") == _read(lines_file, start_line=2, end_line=3)
+
+@pytest.mark.parametrize("kwargs, message", [
+    ({"start_line": 5, "end_line": 2}, "end_line (2) is before start_line (5)"),
+    ({"offset": -1}, "offset must not be negative"),
+    ({"length": "-5"}, "length must not be negative"),
+    ({"tail": -2}, "tail must not be negative"),
+    ({"start_line": 0}, "start_line is 1-based"),
+    ({"end_line": "ten"}, "end_line must be a whole number"),
+    ({"offset": [1]}, "offset must be a whole number"),
+])
+def test_unusable_ranges_are_reported(lines_file, kwargs, message):
+    result = _read(lines_file, **kwargs)
+    assert result.startswith("Error:") and message in result
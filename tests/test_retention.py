@@ -0,0 +1,56 @@
+"""Compacted and archived journal results stay readable in full."""
+import asyncio
+import random
+import string
+
+from src.persistence.retention import RetentionJob, load_result
+from src.tools.builtin import read_journal_entry
+from src.utils.config import Config
+
+def _text(n):
+    rng = random.Random(n)
+    return "".join(rng.choice(string.ascii_letters + " \n") for _ in range(n))
+
+def _setup(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "RETENTION_COMPRESS_MIN_BYTES", 1000)
+    monkeypatch.setattr(Config, "RETENTION_COMPRESS_AFTER", 60)
+    monkeypatch.setattr(Config, "RETENTION_PREVIEW_CHARS", 100)
+    monkeypatch.setattr(Config, "RETENTION_SIDE_FILE_BYTES", 20000) # The larger result goes to a side file
+    monkeypatch.setattr(Config, "RETENTION_BLOB_DIR", tmp_path / "blobs")
+    monkeypatch.setattr(Config, "RETENTION_ARCHIVE_PATH", str(tmp_path / "archive.db"))
+    db.execute_query("INSERT INTO goals (description, status) VALUES ('done', 'completed')")
+    db.execute_query("INSERT INTO goals (description, status) VALUES ('running', 'active')")
+    results = {1: _text(5000), 2: _text(60000), 3: _text(5000)}
+    for journal_id, (goal_id, days) in {1: (2, 0), 2: (2, 0), 3: (1, 30)}.items():
+        db.execute_query(
+            "INSERT INTO journal (id, timestamp, goal_id, action, tool_used, result, status) "
+            "VALUES (?, datetime('now', '-1 hour', ?), ?, 'Used read_file', 'read_file', ?, 'success')",
+            (journal_id, f"-{days} days", goal_id, results[journal_id])
+        )
+    return results
+
+def test_full_result_survives_compaction_and_archival(scratch_db, tmp_path, monkeypatch):
+    results = _setup(scratch_db, tmp_path, monkeypatch)
+    report = RetentionJob().run_once()
+    assert report["compressed"] == 3 and report["archived"] == 1
+
+    stored = scratch_db.fetch_one("SELECT result, result_ref FROM journal WHERE id = 2")
+    assert len(stored['result']) < 200 and stored['result_ref'] # Preview inline, full text in a side file
+    assert scratch_db.fetch_one("SELECT 1 FROM journal WHERE id = 3") is None # Moved to the archive
+    for journal_id, text in results.items():
+        assert load_result(journal_id) == text
+
+def test_read_journal_entry_pages_through_the_full_result(scratch_db, tmp_path, monkeypatch):
+    results = _setup(scratch_db, tmp_path, monkeypatch)
+    monkeypatch.setattr(Config, "READ_FILE_MAX_BYTES", 4096)
+    RetentionJob().run_once()
+
+    first = asyncio.run(read_journal_entry(2))
+    header, body = first.split("\n", 1)
+    assert "chars 0-4096 of 60000" in header and "offset=4096" in header
+    assert body == results[2][:4096]
+
+    archived = asyncio.run(read_journal_entry("3", offset=4000))
+    assert "archived" in archived.split("\n", 1)[0]
+    assert archived.split("\n", 1)[1] == results[3][4000:]
+    assert asyncio.run(read_journal_entry(99)).startswith("Error")
@@ -0,0 +1,58 @@
+"""run_command timeouts and process-group cleanup."""
+import asyncio
+import os
+import time
+
+import pytest
+
+from src.tools.builtin import run_command
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="uses POSIX process groups")
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    # A killed child of ours may linger as a zombie until reaped; that counts as gone
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().split()[2] != "Z"
+    except OSError:
+        return True
+
+def _wait_for_pid(path, deadline=5.0):
+    start = time.monotonic()
+    while time.monotonic() - start < deadline:
+        if path.exists() and path.read_text().strip():
+            return int(path.read_text())
+        time.sleep(0.02)
+    raise AssertionError("command did not start")
+
+def test_string_timeout_is_honoured_and_kills_the_group(tmp_path):
+    pid_file = tmp_path / "pid"
+    start = time.monotonic()
+    result = asyncio.run(run_command(f"sleep 30 & echo $! > {pid_file}; wait; echo done", timeout="0.5"))
+    assert time.monotonic() - start < 10
+    assert "timed out after 0.5s" in result
+    assert "done" not in result
+    assert not _alive(int(pid_file.read_text()))
+
+def test_invalid_timeout_is_rejected_before_spawning(tmp_path):
+    marker = tmp_path / "ran"
+    result = asyncio.run(run_command(f"touch {marker}", timeout="soon"))
+    assert result.startswith("Error: timeout must be a number")
+    assert not marker.exists()
+
+def test_cancellation_kills_the_command(tmp_path):
+    pid_file = tmp_path / "pid"
+
+    async def cancel_midway():
+        task = asyncio.create_task(run_command(f"sleep 30 & echo $! > {pid_file}; wait"))
+        await asyncio.get_running_loop().run_in_executor(None, _wait_for_pid, pid_file)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_midway())
+    assert not _alive(int(pid_file.read_text()))
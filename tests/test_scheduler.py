@@ -0,0 +1,22 @@
+"""Goal priority set at creation decides which goal the scheduler runs first."""
+from src.agent.loop import AgentThread
+from src.agent.scheduler import GoalScheduler
+
+def test_higher_priority_goal_is_scheduled_first(scratch_db):
+    agent = AgentThread()
+    low = agent.add_goal("tidy the downloads folder")
+    high = agent.add_goal("answer the urgent email", priority=5)
+
+    goals = agent._get_active_goals()
+    assert [g['id'] for g in goals] == [high, low]
+    assert [g['priority'] for g in goals] == [5, 0]
+
+    scheduler = GoalScheduler(max_concurrent_goals=1)
+    assert [g['id'] for g in scheduler.select(goals, [])] == [high]
+    # Once the high-priority goal is running, the next free slot goes to the other one
+    scheduler.max_concurrent_goals = 2
+    assert [g['id'] for g in scheduler.select(goals, [high])] == [low]
+
+def test_priority_from_strings_is_coerced(scratch_db):
+    goal_id = AgentThread().add_goal("g", priority="3")
+    assert scratch_db.fetch_one("SELECT priority FROM goals WHERE id = ?", (goal_id,))['priority'] == 3
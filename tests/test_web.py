@@ -0,0 +1,50 @@
+"""HttpClient body capping and HTTP cache I/O staying off the event loop."""
+import asyncio
+import threading
+
+from src.tools.web import HttpCache, HttpClient, HttpResponse
+from src.utils.config import Config
+
+class FakeContent:
+    def __init__(self, body, chunk=4):
+        self.body = body
+        self.chunk = chunk
+
+    async def iter_chunked(self, size):
+        for i in range(0, len(self.body), self.chunk):
+            yield self.body[i:i + self.chunk]
+
+class FakeResponse:
+    def __init__(self, body):
+        self.content = FakeContent(body)
+
+def _read(body, max_bytes):
+    return asyncio.run(HttpClient._read_capped(FakeResponse(body), max_bytes))
+
+def test_body_of_exactly_max_bytes_is_not_truncated():
+    assert _read(b"x" * 16, 16) == (b"x" * 16, False)
+    assert _read(b"x" * 10, 16) == (b"x" * 10, False)
+
+def test_body_over_max_bytes_is_truncated():
+    assert _read(b"x" * 17, 16) == (b"x" * 16, True)
+    assert _read(b"x" * 18, 15) == (b"x" * 15, True)
+
+def test_fresh_cache_hit_reads_files_off_the_loop(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "HTTP_CACHE_ENABLED", True)
+    monkeypatch.setattr(Config, "HTTP_CACHE_DIR", tmp_path)
+    client = HttpClient()
+    url = "https://example.com/page"
+    client.cache.store(url, HttpResponse(url, 200, "cached body", {"cache-control": "max-age=600"}))
+
+    load_threads = []
+    load = client.cache.load
+    def recording_load(key):
+        load_threads.append(threading.current_thread())
+        return load(key)
+    monkeypatch.setattr(client.cache, "load", recording_load)
+
+    response = asyncio.run(client.get(url))
+    assert response.from_cache and response.text == "cached body"
+    assert load_threads and threading.main_thread() not in load_threads
+    assert client.validity_token(url) is not None
+    assert isinstance(client.cache, HttpCache) and client.cache.hits == 1